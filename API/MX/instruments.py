@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import *
+from a_config import QUOTE_ASSET, INSTRUMENTS_SNAPSHOT_FILE, INSTRUMENTS_MIN_INTERVAL, INSTRUMENTS_MAX_INTERVAL
+from b_context import BotContext
+from c_log import ErrorHandler
+from .mx import MexcClient
+from .mx_bypass.codec import loads
+
+
+# поля /contract/detail, от которых зависит спецификация
+SPEC_FIELDS = ("volScale", "priceScale", "contractSize", "priceUnit", "volUnit", "maxLeverage")
+
+
+def build_spec(symbol_data: dict) -> dict:
+    """
+    Компактная спецификация контракта из строки /contract/detail:
+    {
+        "contract_precision": int,
+        "price_precision": int,
+        "contract_size": float,
+        "price_unit": float,
+        "vol_unit": float,
+        "max_leverage": int | None
+    }
+    """
+    # обработка maxLeverage
+    raw_leverage = symbol_data.get("maxLeverage")
+    try:
+        max_leverage = int(float(raw_leverage)) if raw_leverage is not None else None
+    except (ValueError, TypeError):
+        max_leverage = None
+
+    return {
+        "contract_precision": symbol_data.get("volScale", 3),
+        "price_precision": symbol_data.get("priceScale", 2),
+        "contract_size": float(symbol_data.get("contractSize", 1)),
+        "price_unit": float(symbol_data.get("priceUnit", 0.01)),
+        "vol_unit": float(symbol_data.get("volUnit", 1)),
+        "max_leverage": max_leverage
+    }
+
+
+class InstrumentRegistry:
+    """
+    Индекс инструментов MEXC Futures.
+    Поиск спецификации за O(1) по symbol ("OP_USDT") или по базовой монете (baseCoinName + _QUOTE).
+    Обновление диффовое: спецификация пересобирается только у изменившихся контрактов.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, dict] = {}           # symbol -> spec
+        self._fingerprints: Dict[str, tuple] = {}   # symbol -> значения SPEC_FIELDS
+        self._aliases: Dict[str, str] = {}          # BASE_QUOTE -> symbol
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def __contains__(self, symbol: str) -> bool:
+        return self.resolve(symbol) is not None
+
+    def resolve(self, symbol: str) -> Optional[str]:
+        """Реальный символ контракта для symbol (точное совпадение приоритетнее алиаса)."""
+        if symbol in self._specs:
+            return symbol
+        return self._aliases.get(symbol)
+
+    def get_spec(self, symbol: str) -> Optional[dict]:
+        real_symbol = self.resolve(symbol)
+        if real_symbol is None:
+            return None
+        return self._specs.get(real_symbol)
+
+    def _upsert(self, item: dict) -> Optional[bool]:
+        """Вставка/обновление одной строки. None -- строка невалидна, True -- новый символ."""
+        symbol = item.get("symbol")
+        if not symbol:
+            return None
+
+        fingerprint = tuple(item.get(k) for k in SPEC_FIELDS)
+        is_new = symbol not in self._specs
+        if is_new or self._fingerprints.get(symbol) != fingerprint:
+            self._specs[symbol] = build_spec(item)
+            self._fingerprints[symbol] = fingerprint
+
+        base_coin = item.get("baseCoinName")
+        if base_coin:
+            # как и раньше в parse_precision: выигрывает первый контракт с этой базовой монетой
+            self._aliases.setdefault(f"{base_coin}_{QUOTE_ASSET}", symbol)
+        return is_new
+
+    def update(self, instruments: List[dict], full: bool = True) -> Tuple[int, int, int]:
+        """
+        Применяет список строк /contract/detail.
+        full=True -- это полный каталог: символы, которых в нем нет, удаляются.
+        Возвращает (added, changed, removed).
+        """
+        added = changed = 0
+        seen: Set[str] = set()
+
+        for item in instruments or []:
+            if not isinstance(item, dict):
+                continue
+            old_fingerprint = self._fingerprints.get(item.get("symbol"))
+            is_new = self._upsert(item)
+            if is_new is None:
+                continue
+            symbol = item["symbol"]
+            seen.add(symbol)
+            if is_new:
+                added += 1
+            elif old_fingerprint != self._fingerprints[symbol]:
+                changed += 1
+
+        removed = 0
+        if full and seen:
+            for symbol in [s for s in self._specs if s not in seen]:
+                del self._specs[symbol]
+                self._fingerprints.pop(symbol, None)
+                removed += 1
+            if removed:
+                self._aliases = {k: v for k, v in self._aliases.items() if v in self._specs}
+
+        return added, changed, removed
+
+
+class InstrumentsUpdater:
+    """
+    Планировщик обновления InstrumentRegistry:
+    - условный запрос каталога (ETag) + хэш тела: неизменившийся каталог даже не декодируется;
+    - адаптивный интервал: после изменений -- min_interval, пока тишина -- удваиваем до max_interval;
+    - снапшот на диске для быстрого старта;
+    - точечная подгрузка символа, которого реестр еще не видел.
+    """
+
+    def __init__(
+        self,
+        context: BotContext,
+        registry: InstrumentRegistry,
+        mx_client: MexcClient,
+        info_handler: ErrorHandler,
+        snapshot_path: str = INSTRUMENTS_SNAPSHOT_FILE,
+        min_interval: float = INSTRUMENTS_MIN_INTERVAL,
+        max_interval: float = INSTRUMENTS_MAX_INTERVAL,
+    ):
+        info_handler.wrap_foreign_methods(self)
+        self.context = context
+        self.registry = registry
+        self.mx_client = mx_client
+        self.info_handler = info_handler
+        self.snapshot_path = snapshot_path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+
+        self._etag: Optional[str] = None
+        self._digest: Optional[str] = None
+
+    async def load_snapshot(self) -> bool:
+        """Наполняет реестр из снапшота на диске. True -- если что-то загрузили."""
+        def _load():
+            if not os.path.isfile(self.snapshot_path):
+                return None
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        try:
+            snapshot = await asyncio.to_thread(_load)
+        except Exception as e:
+            self.info_handler.debug_error_notes(f"[INSTRUMENTS] snapshot read error: {e}")
+            return False
+
+        if not snapshot or not isinstance(snapshot.get("data"), list):
+            return False
+
+        self.registry.update(snapshot["data"])
+        self._digest = snapshot.get("digest")
+        return len(self.registry) > 0
+
+    async def _save_snapshot(self, data: List[dict], digest: str):
+        def _write():
+            tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"  # снапшот могут писать несколько процессов-шардов
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"digest": digest, "ts": int(time.time() * 1000), "data": data}, f)
+            os.replace(tmp_path, self.snapshot_path)
+
+        try:
+            await asyncio.to_thread(_write)
+        except Exception as e:
+            self.info_handler.debug_error_notes(f"[INSTRUMENTS] snapshot write error: {e}")
+
+    async def refresh(self) -> Optional[bool]:
+        """
+        Один проход обновления каталога.
+        True -- каталог изменился, False -- без изменений, None -- ошибка запроса.
+        """
+        result = await self.mx_client.get_instruments_raw(etag=self._etag)
+        if not result:
+            return None
+
+        status, etag, body = result
+        if status == 304:
+            return False
+        if status != 200 or not body:
+            self.info_handler.debug_error_notes(f"[INSTRUMENTS] bad response status: {status}")
+            return None
+
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if digest == self._digest:
+            self._etag = etag
+            return False
+
+        payload = loads(body)
+        data = payload.get("data")
+        if not payload.get("success") or not isinstance(data, list) or not data:
+            self.info_handler.debug_error_notes(f"[INSTRUMENTS] invalid payload: code={payload.get('code')}")
+            return None
+
+        added, changed, removed = self.registry.update(data)
+        self._digest, self._etag = digest, etag
+        await self._save_snapshot(data, digest)
+
+        if added or changed or removed:
+            self.info_handler.debug_info_notes(
+                f"[INSTRUMENTS] +{added} ~{changed} -{removed} (total {len(self.registry)})"
+            )
+        return bool(added or changed or removed)
+
+    async def ensure_symbol(self, symbol: str) -> bool:
+        """Гарантирует наличие symbol в реестре: при промахе -- точечный запрос одного контракта."""
+        if symbol in self.registry:
+            return True
+
+        rows = await self.mx_client.get_instrument(symbol)
+        if rows:
+            self.registry.update(rows, full=False)
+        return symbol in self.registry
+
+    async def run(self, initial_delay: float = 0.0):
+        """Фоновый цикл обновления каталога с адаптивным интервалом."""
+        delay = initial_delay
+        while not self.context.stop_bot and not self.context.stop_bot_iteration:
+            await asyncio.sleep(delay)
+            try:
+                changed = await self.refresh()
+            except Exception as e:
+                self.info_handler.debug_error_notes(f"[INSTRUMENTS] refresh error: {e}")
+                changed = None
+
+            if changed:
+                self.interval = self.min_interval
+            elif changed is False:
+                self.interval = min(self.interval * 2, self.max_interval)
+            delay = self.interval
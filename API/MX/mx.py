@@ -6,9 +6,17 @@ import time
 from typing import *
 from b_context import BotContext
 from b_network import NetworkManager
+from b_position import PositionState
+from a_config import (
+    HTTP_POOL_SIZE, HTTP_WARMUP_CONNECTIONS, HTTP_KEEPALIVE_TIMEOUT, HTTP_DNS_CACHE_TTL,
+    RATE_LIMIT_ENDPOINT_RPS, RATE_LIMIT_ENDPOINT_BURST, RATE_LIMIT_ACCOUNT_RPS, RATE_LIMIT_ACCOUNT_BURST,
+    RATE_LIMIT_RESERVE, RATE_LIMIT_PENALTY, REHYDRATE_MAX_PAGES,
+)
 from c_log import ErrorHandler
-from .mx_bypass.mexcTypes import CreateOrderRequest, OpenType, OrderSide, OrderType, PositionMode, ExecuteCycle, TriggerPriceType, TriggerType, TriggerOrderRequest
+from .mx_bypass.mexcTypes import CreateOrderRequest, OpenType, OrderSide, OrderType, PositionMode, PositionType, ExecuteCycle, TriggerPriceType, TriggerType, TriggerOrderRequest
 from .mx_bypass.api import MexcFuturesAPI, ApiResponse
+from .scheduler import RequestScheduler
+from .pnl import PnlService
 
 
 # BASE_URL_MEXC = "https://contract.mexc.com"
@@ -66,6 +74,8 @@ class MexcClient:
             api_key: str = None,
             api_secret: str = None,
             token: str = None,
+            proxy_url: str = None,
+            base_url: str = None,
         ):      
         self.session: Optional[aiohttp.ClientSession] = context.session
         self.info_handler = info_handler
@@ -77,17 +87,56 @@ class MexcClient:
         self.connector = connector
         # info_handler.wrap_foreign_methods(self) # - eval так как перебьет декоратор реконекта
 
-        self.api = MexcFuturesAPI(token, testnet=False)
+        # все запросы аккаунта (ордера, поллинг, стейтменты, инструменты) идут через общий планировщик
+        self.scheduler = RequestScheduler(
+            endpoint_rps=RATE_LIMIT_ENDPOINT_RPS,
+            endpoint_burst=RATE_LIMIT_ENDPOINT_BURST,
+            account_rps=RATE_LIMIT_ACCOUNT_RPS,
+            account_burst=RATE_LIMIT_ACCOUNT_BURST,
+            reserve=RATE_LIMIT_RESERVE,
+            penalty=RATE_LIMIT_PENALTY,
+        )
+        self.api = MexcFuturesAPI(
+            token,
+            testnet=False,
+            proxy_url=proxy_url,
+            pool_size=HTTP_POOL_SIZE,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            dns_cache_ttl=HTTP_DNS_CACHE_TTL,
+            scheduler=self.scheduler,
+            base_url=base_url,
+        )
+        self.pnl = PnlService(fetch_page=self.fetch_history_positions, info_handler=info_handler)
+
+    async def warm_up(self) -> int:
+        """Прогрев пула соединений API (TLS поднят заранее, ордер идет по горячему коннекту)."""
+        return await self.api.warmup(HTTP_WARMUP_CONNECTIONS)
+
+    async def close(self):
+        await self.api.close()
 
     # ----------------------------
     # Публичные методы
     @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
     async def get_instruments(self, session: Optional[aiohttp.ClientSession] = None) -> Optional[List[Dict]]:
-        response = await self.api.get_instruments(session)
+        response = await self.api.get_instruments(session=session)
         if response and response.success and response.data:
             return response.data  # возвращаем сразу список инструментов
         return None
 
+    @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
+    async def get_instruments_raw(self, etag: Optional[str] = None) -> Optional[Tuple[int, Optional[str], Optional[bytes]]]:
+        return await self.api.get_instruments_raw(etag=etag)
+
+    @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
+    async def get_instrument(self, symbol: str) -> Optional[List[Dict]]:
+        """Точечный /contract/detail?symbol=... -- для символа, которого еще нет в реестре."""
+        response = await self.api.get_instruments(symbol=symbol)
+        if response and response.success and response.data:
+            data = response.data
+            return data if isinstance(data, list) else [data]
+        return None
+
     @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
     async def get_fair_price(self, symbol: str, session: Optional[aiohttp.ClientSession] = None) -> Optional[float]:
         response = await self.api.get_fair_price(symbol, session)
@@ -98,12 +147,56 @@ class MexcClient:
     # ----------------------------
     # Приватные методы
     @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
-    async def fetch_positions(self):
+    async def fetch_positions(self, strict: bool = False):
         # path = "/private/position/open_positions"
-        response = await self.api.get_open_positions(symbol=None, session=self.session)
-        if response and getattr(response, "success", False) and response.data:
-            return response.data
-        return []
+        # strict -- ошибка запроса дает None (а не [] -- "позиций нет")
+        response = await self.api.get_open_positions(symbol=None)
+        if response and getattr(response, "success", False):
+            return response.data or []
+        return None if strict else []
+
+    async def _collect_pages(self, request: Callable[..., Awaitable], page_size: int, max_pages: int, **params) -> Optional[List[Dict]]:
+        """Все страницы запроса -- до первой неполной. None -- ошибка запроса или строк больше max_pages страниц."""
+        rows = []
+        for page_num in range(1, max_pages + 1):
+            response = await request(page_num=page_num, page_size=page_size, **params)
+            if not (response and getattr(response, "success", False)):
+                return None
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+        self.info_handler.debug_error_notes(
+            "[%s] %s: more than %d pages, list is incomplete", request.__name__, params.get("symbol"), max_pages
+        )
+        return None
+
+    @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
+    async def fetch_open_orders(self, symbol: Optional[str] = None, page_size: int = 100) -> Optional[List[Dict]]:
+        """Открытые лимитные ордера (TP-лестницы), все страницы. None -- ошибка запроса / список неполный."""
+        return await self._collect_pages(
+            self.api.get_current_pending_orders, page_size, REHYDRATE_MAX_PAGES, symbol=symbol
+        )
+
+    @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
+    async def fetch_trigger_orders(self, symbol: Optional[str] = None, states: str = "1", page_size: int = 100) -> Optional[List[Dict]]:
+        """Триггер-ордера (SL), по умолчанию -- еще не сработавшие (state 1), все страницы. None -- ошибка запроса / список неполный."""
+        return await self._collect_pages(
+            self.api.get_trigger_orders, page_size, REHYDRATE_MAX_PAGES, symbol=symbol, states=states
+        )
+
+    @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
+    async def fetch_filled_orders(
+        self,
+        symbol: Optional[str] = None,
+        start_time: Optional[int] = None,
+        page_size: int = 100
+    ) -> Optional[List[Dict]]:
+        """Исполненные ордера (state 3) с start_time (мс), новые первыми, все страницы. None -- ошибка запроса / история неполная."""
+        return await self._collect_pages(
+            self.api.get_historical_orders, page_size, REHYDRATE_MAX_PAGES,
+            symbol=symbol, states="3", start_time=start_time, end_time=int(time.time() * 1000),
+        )
 
     # /////
     async def get_realized_pnl(
@@ -114,67 +207,36 @@ class MexcClient:
         direction: Optional[int] = None  # 1=LONG, 2=SHORT
     ) -> dict:
         """
-        Считает реализованный PnL за период по символу.
+        Считает реализованный PnL за период по символу (PnlService: постранично до start_time, кэш по positionId).
         Возвращает словарь:
             {"pnl_usdt": float, "pnl_pct": float}
         """
-        try:
-            rows = await self.get_futures_statement(symbol=symbol)
-            if not rows:
-                return {"pnl_usdt": 0.0, "pnl_pct": 0.0}
-        except Exception as e:
-            self.info_handler.debug_error_notes(
-                f"[get_realized_pnl] error fetching data: {e}", is_print=True
-            )
-            return {"pnl_usdt": 0.0, "pnl_pct": 0.0}
-
-        pnl_usdt = 0.0
-        pnl_pct = 0.0
-
-        filter_flag = False
-
-        try:
-
-            for row in rows:
-                try:
-                    # фильтрация по времени
-                    ts = int(row.get("updateTime", 0))  # используем updateTime
-                    # print(ts - start_time)
-                    # print(ts > start_time)
-                    if start_time and ts < start_time:
-                        continue
-
-                    # фильтрация по направлению
-                    if direction and row.get("positionType") != direction:
-                        continue
-
-                    # суммируем реализованный PnL
-                    pnl_usdt += float(row.get("realised", 0.0))
-                    # print(f"pnl_usdt: {pnl_usdt}")
-
-                    # суммируем проценты
-                    if row.get("profitRatio") is not None:
-                        pnl_pct += float(row["profitRatio"]) * 100
-
-                    filter_flag = True
-
-                except Exception:
-                    continue
+        return await self.pnl.realized_pnl(
+            symbol=symbol,
+            start_time=start_time,
+            end_time=end_time,
+            direction=direction
+        )
 
-        
-        finally:
-            if not filter_flag:
-                return {
-                    "pnl_usdt": None,
-                    "pnl_pct": None,  # уже %
-                }
-        
-            return {
-                "pnl_usdt": round(pnl_usdt, 6),
-                "pnl_pct": round(pnl_pct, 4),  # уже %
-            }
+    @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
+    async def fetch_history_positions(
+        self,
+        symbol: str,
+        position_type: Optional[int],
+        page_num: int,
+        page_size: int
+    ) -> Optional[List[Dict]]:
+        """Страница истории закрытых позиций (новые первыми). None -- ошибка запроса."""
+        response = await self.api.get_historical_positions(
+            symbol=symbol,
+            position_type=PositionType(position_type) if position_type else None,
+            page_num=page_num,
+            page_size=page_size,
+        )
+        if response and getattr(response, "success", False):
+            return response.data or []
+        return None
 
-    
     @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
     async def get_futures_statement(
         self,
@@ -184,7 +246,6 @@ class MexcClient:
     ):
         response = await self.api.get_historical_orders_report(
             symbol=symbol,
-            session=self.session
         )
         # print(response)
         if response and getattr(response, "success", False) and response.data:
@@ -199,7 +260,7 @@ class MexcClient:
         ):
         # Hedge = 1
         # OneWay = 2       
-        await self.api.change_position_mode(position_mode=PositionMode(pos_mode), session=self.session)
+        await self.api.change_position_mode(position_mode=PositionMode(pos_mode))
 
     @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")
     async def make_order(
@@ -272,7 +333,6 @@ class MexcClient:
                 stopLossPrice=stopLossPrice,
                 takeProfitPrice=takeProfitPrice
             ),
-            session=self.session
         )
 
     @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")        
@@ -295,7 +355,7 @@ class MexcClient:
         #     )
 
         # формируем список словарей для API
-        return await self.api.cancel_all_orders(symbol=symbol, session=self.session) 
+        return await self.api.cancel_all_orders(symbol=symbol) 
     
     @async_reconnector(debug=True, stop_attr="stop_bot", stop_iter_attr="stop_bot_iteration")       
     async def cancel_order(
@@ -320,21 +380,21 @@ class MexcClient:
 
         # формируем список словарей для API
         order_list = [{"orderId": oid, "symbol": symbol} for oid in order_id_list]
-        return await self.api.cancel_trigger_orders(orders=order_list, session=self.session) 
+        return await self.api.cancel_trigger_orders(orders=order_list) 
 
     async def cancel_order_template(
             self,
             symbol: str,
-            pos_data: Dict,
+            pos_data: PositionState,
             key_list: List
         ) -> None:
         """
         Отменяет текущий алгоритмический ордер, если он существует (order_id).
-        После попытки отмены сбрасывает pos_data['order_id'] в None.
+        После попытки отмены сбрасывает pos_data.<label>_id в None.
         """
         order_id_list = []
         for order_label in key_list:      # order_label in ["tp", "sl"]
-            order_id = pos_data.get(f"{order_label}_id", None)
+            order_id = getattr(pos_data, f"{order_label}_id", None)
             if order_id:
                 # print(f"if order_id: {order_id[0]}")
                 order_id_list.append(order_id[0])
@@ -356,7 +416,7 @@ class MexcClient:
             for order_label in key_list:
                 try:
                     # async with self.bloc_async:
-                    pos_data[f"{order_label}_id"] = None
+                    setattr(pos_data, f"{order_label}_id", None)
                 except Exception:
                     pass
 
@@ -456,4 +516,4 @@ class MexcClient:
             triggerPrice=price,
             triggerType=trigger_type,
         )
-        return await self.api.create_trigger_order(trigger_order_request=trigger_request, session=self.session)
\ No newline at end of file
+        return await self.api.create_trigger_order(trigger_order_request=trigger_request)
\ No newline at end of file
@@ -1,11 +1,14 @@
+import asyncio
 import dataclasses
 from enum import Enum
 from dataclasses import asdict, dataclass
+import functools
 import types
-from typing import Any, Dict, List, Optional, Type, TypeVar, Generic, Union
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Type, TypeVar, Generic, Union
 import aiohttp
 
-from .sign import get_data
+from .sign import FastSigner
+from .codec import loads
 from .mexcTypes import (
     AssetInfo, OrderId, TransferRecords, PositionInfo, FundingRecords, Order, Transaction,
     TriggerOrder, StopLimitOrder, RiskLimit, TradingFeeInfo, Leverage, PositionMode,
@@ -22,6 +25,42 @@ def asdict_factory_with_enum_support(data):
 
 T = TypeVar('T')
 
+# коды ответа MEXC "слишком часто"
+THROTTLE_CODES = (429, 510)
+
+
+@functools.lru_cache(maxsize=None)
+def _field_names(data_type: type) -> FrozenSet[str]:
+    """Имена полей dataclass (считаются один раз на тип)."""
+    return frozenset(f.name for f in dataclasses.fields(data_type))
+
+
+def _decode_item(item: Dict[str, Any], data_type: Type[T], is_list_item: bool = False) -> Any:
+    """Одна строка ответа -> SimpleNamespace / dataclass / data_type(**item)."""
+    if data_type is dict or data_type is Any:
+        return types.SimpleNamespace(**item)
+
+    if dataclasses.is_dataclass(data_type):
+        expected_keys = _field_names(data_type)
+        filtered_item = {k: v for k, v in item.items() if k in expected_keys}
+        try:
+            return data_type(**filtered_item) # type: ignore
+        except TypeError as e:
+            # Handle potential errors even after filtering (e.g., type mismatch)
+            what = "list item " if is_list_item else ""
+            print(f"Warning: Could not instantiate {what}{data_type} even after filtering: {e}")
+            return filtered_item # Fallback to filtered dict
+
+    try:
+        return data_type(**item) # type: ignore
+    except TypeError as e:
+        if 'unexpected keyword argument' in str(e):
+            what = "list item " if is_list_item else "non-dataclass "
+            print(f"Warning: Ignoring extra fields for {what}{data_type}. Error: {e}")
+            return item
+        raise e
+
+
 @dataclass
 class ApiResponse(Generic[T]):
     """A generic API response structure."""
@@ -36,61 +75,15 @@ class ApiResponse(Generic[T]):
         Creates an ApiResponse instance from a dictionary, ignoring extra fields
         when instantiating known dataclasses.
         """
-        processed_data: Any = None
         raw_data = data_dict.get('data')
 
-        if raw_data is None:
-            processed_data = None
-        elif isinstance(raw_data, dict):
-            if data_type is dict or data_type is Any:
-                processed_data = types.SimpleNamespace(**raw_data)
-            else:
-                if dataclasses.is_dataclass(data_type):
-                    expected_keys = {f.name for f in dataclasses.fields(data_type)}
-                    filtered_data = {
-                        k: v for k, v in raw_data.items() if k in expected_keys
-                    }
-                    try:
-                        processed_data = data_type(**filtered_data) # type: ignore
-                    except TypeError as e:
-                        # Handle potential errors even after filtering (e.g., type mismatch)
-                        print(f"Warning: Could not instantiate {data_type} even after filtering: {e}")
-                        processed_data = filtered_data # Fallback to filtered dict
-                else:
-                    try:
-                        processed_data = data_type(**raw_data) # type: ignore
-                    except TypeError as e:
-                        if 'unexpected keyword argument' in str(e):
-                             print(f"Warning: Ignoring extra fields for non-dataclass {data_type}. Error: {e}")
-                             processed_data = raw_data
-                        else:
-                             raise e
+        if isinstance(raw_data, dict):
+            processed_data = _decode_item(raw_data, data_type)
         elif isinstance(raw_data, list):
-            processed_data = []
-            for item in raw_data:
-                if isinstance(item, dict):
-                    if data_type is dict or data_type is Any:
-                        processed_data.append(types.SimpleNamespace(**item))
-                    else:
-                        if dataclasses.is_dataclass(data_type):
-                            expected_keys = {f.name for f in dataclasses.fields(data_type)}
-                            filtered_item = {k: v for k, v in item.items() if k in expected_keys}
-                            try:
-                                processed_data.append(data_type(**filtered_item)) # type: ignore
-                            except TypeError as e:
-                                print(f"Warning: Could not instantiate list item {data_type}: {e}")
-                                processed_data.append(filtered_item)
-                        else:
-                             try:
-                                  processed_data.append(data_type(**item)) # type: ignore
-                             except TypeError as e:
-                                  if 'unexpected keyword argument' in str(e):
-                                       print(f"Warning: Ignoring extra fields for list item {data_type}. Error: {e}")
-                                       processed_data.append(item)
-                                  else:
-                                       raise e
-                else:
-                    processed_data.append(item)
+            processed_data = [
+                _decode_item(item, data_type, is_list_item=True) if isinstance(item, dict) else item
+                for item in raw_data
+            ]
         else:
             processed_data = raw_data
 
@@ -102,10 +95,28 @@ class ApiResponse(Generic[T]):
         )
 
 class MexcFuturesAPI:
-    def __init__(self, token: str, testnet: bool = False, proxy_url: str = None):
+    def __init__(
+        self,
+        token: str,
+        testnet: bool = False,
+        proxy_url: str = None,
+        pool_size: int = 20,
+        keepalive_timeout: float = 60.0,
+        dns_cache_ttl: int = 300,
+        scheduler: Any = None,
+        base_url: Optional[str] = None,
+    ):
         self.token = token
+        # опциональный планировщик запросов (acquire(endpoint) / penalize(endpoint)), см. API/MX/scheduler.py
+        self.scheduler = scheduler
         self.proxy_url = proxy_url
-        self.base_url = (
+        # долгоживущий пул соединений (keep-alive + DNS-кэш), см. _get_session
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        # base_url переопределяется, например, для локального симулятора (SIM/exchange.py)
+        self.base_url = base_url or (
             "https://futures.testnet.mexc.com/api/v1" 
             if testnet 
             else "https://futures.mexc.com/api/v1"
@@ -128,6 +139,48 @@ class MexcFuturesAPI:
             "Sec-Fetch-Site": "same-origin",
             "TE": "trailers",
         }
+        # подпись и заголовки готовим один раз на токен; на запрос -- копия шаблона + sign/nonce
+        self.signer = FastSigner(token or "")
+        self._headers_template = {k: v for k, v in self.user_agent.items() if v is not None}
+        self._headers_template["Authorization"] = token
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает собственную сессию API, пересоздавая пул при необходимости."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=False if self.proxy_url else True,  # как и в NetworkManager: через прокси без проверки SSL
+            )
+            self._session = aiohttp.ClientSession(connector=connector, trust_env=False)
+        return self._session
+
+    async def warmup(self, connections: int = 2) -> int:
+        """
+        Параллельно открывает connections соединений к API через публичный ping,
+        чтобы ордера шли по уже установленному TLS. Возвращает число удачных пингов.
+        """
+        session = self._get_session()
+
+        async def _ping() -> bool:
+            kwargs = {"proxy": self.proxy_url} if self.proxy_url else {}
+            try:
+                async with session.get(f"{self.base_url}/contract/ping", **kwargs) as response:
+                    await response.read()
+                    return response.status == 200
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return False
+
+        results = await asyncio.gather(*(_ping() for _ in range(max(1, connections))))
+        return sum(results)
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     async def _make_request(
         self,
@@ -137,32 +190,50 @@ class MexcFuturesAPI:
         data: Optional[Union[Dict[str, Any], List[Any]]] = None,
         response_type: Optional[Type[T]] = None,        
     ) -> ApiResponse[T]:
-        """Выполняет HTTP-запрос. Если session не передана, создается временная."""
+        """Выполняет HTTP-запрос. Если session не передана, используется собственный пул API."""
         
-        url_params = f"?{self._dict_to_url_params(data)}" if method.upper() == "GET" and data else ""
-        signed_data, sign, ts = get_data(data, self.token)
-        body_data = signed_data if isinstance(data, dict) and data else data
-
-        headers = {
-            **self.user_agent,
-            "x-mxc-sign": sign,
-            "x-mxc-nonce": ts,
-            "Authorization": self.token,
-        }
+        method = method.upper()
+        url_params = f"?{self._dict_to_url_params(data)}" if method == "GET" and data else ""
 
         # Функция, выполняющая фактический запрос
         async def do_request(s: aiohttp.ClientSession) -> ApiResponse[T]:
+            # сначала очередь планировщика, потом подпись: nonce не стареет, пока запрос ждет токен
+            if self.scheduler is not None:
+                await self.scheduler.acquire(endpoint)
+            # тело сериализуется один раз: подписываются ровно те байты, что уходят в запрос
+            body, sign, ts = self.signer.prepare(data, with_body=method == "POST")
+            headers = self._headers_template.copy()
+            headers["x-mxc-sign"] = sign
+            headers["x-mxc-nonce"] = ts
             kwargs = {
-                "method": method.upper(),
+                "method": method,
                 "url": f"{self.base_url}{endpoint}{url_params}",
                 "headers": headers,
-                "json": body_data if method.upper() == "POST" else None,
+                "data": body,
             }
             if self.proxy_url:  # только если реально нужен прокси
                 kwargs["proxy"] = self.proxy_url
 
             async with s.request(**kwargs) as response:
-                response_data = await response.json()
+                # троттлинг по HTTP-статусу -- до разбора тела (у 429 оно бывает HTML или пустым)
+                throttled = response.status in THROTTLE_CODES
+                if throttled and self.scheduler is not None:
+                    self.scheduler.penalize(endpoint)
+                # сырые байты + быстрый декодер (orjson, если есть) вместо response.json()
+                raw = await response.read()
+                try:
+                    response_data = loads(raw)
+                except ValueError:
+                    response_data = None
+                if not isinstance(response_data, dict):
+                    return ApiResponse(
+                        success=False,
+                        code=response.status,
+                        data=None,
+                        message=f"HTTP {response.status}: non-JSON response {raw[:200]!r}",
+                    )
+                if not throttled and self.scheduler is not None and response_data.get("code") in THROTTLE_CODES:
+                    self.scheduler.penalize(endpoint)
                 # print(response_data)
                 if response_type:
                     return ApiResponse.from_dict(response_data, response_type)
@@ -173,20 +244,41 @@ class MexcFuturesAPI:
                     message=response_data.get("message"),
                 )
 
-        # Используем переданную сессию или временную
-        if session:
-            return await do_request(session)
-        else:
-            async with aiohttp.ClientSession() as temp_session:
-                return await do_request(temp_session)
+        # Используем переданную сессию или собственный прогретый пул
+        return await do_request(session or self._get_session())
 
     def _dict_to_url_params(self, params: Dict[str, Any]) -> str:
         return "&".join(f"{k}={v}" for k, v in params.items() if v is not None)
     
     # public:   
     # В MexcFuturesAPI
-    async def get_instruments(self, session: Optional[aiohttp.ClientSession] = None) -> ApiResponse[List[Dict]]:
-        return await self._make_request(session, "GET", "/contract/detail")
+    async def get_instruments(self, symbol: Optional[str] = None, session: Optional[aiohttp.ClientSession] = None) -> ApiResponse[List[Dict]]:
+        params = {"symbol": symbol} if symbol else None
+        return await self._make_request(session, "GET", "/contract/detail", params)
+
+    async def get_instruments_raw(
+        self, etag: Optional[str] = None, session: Optional[aiohttp.ClientSession] = None
+    ) -> Tuple[int, Optional[str], Optional[bytes]]:
+        """
+        Сырой /contract/detail без декодирования JSON (для условного обновления каталога).
+        Возвращает (status, etag, body); при 304 body = None.
+        """
+        headers = {k: v for k, v in self.user_agent.items() if v is not None}
+        if etag:
+            headers["If-None-Match"] = etag
+        kwargs = {"proxy": self.proxy_url} if self.proxy_url else {}
+        if self.scheduler is not None:
+            await self.scheduler.acquire("/contract/detail")
+
+        async with (session or self._get_session()).get(
+            f"{self.base_url}/contract/detail", headers=headers, **kwargs
+        ) as response:
+            if response.status in THROTTLE_CODES and self.scheduler is not None:
+                self.scheduler.penalize("/contract/detail")
+            if response.status == 304:
+                return response.status, etag, None
+            body = await response.read()
+            return response.status, response.headers.get("ETag"), body
 
     async def get_fair_price(self, symbol: str, session: Optional[aiohttp.ClientSession] = None) -> ApiResponse[Dict[str, Any]]:
         return await self._make_request(session, "GET", f"/contract/fair_price/{symbol}")
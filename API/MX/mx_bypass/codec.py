@@ -0,0 +1,21 @@
+"""Компактный JSON-кодек: orjson, если установлен, иначе stdlib json без пробелов."""
+import json
+
+try:
+    import orjson  # опционально: pip install orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+if orjson is not None:
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+    def dumps(obj) -> bytes:
+        return _encoder.encode(obj).encode("utf-8")
+
+    loads = json.loads
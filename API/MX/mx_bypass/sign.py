@@ -3,6 +3,8 @@ import hashlib
 from time import time
 import os
 
+from .codec import dumps
+
 def get_data(info, auth):
     ts = str(int(time() * 1000))
     chash = os.urandom(16).hex()
@@ -27,4 +29,41 @@ def get_g(auth, ts):
 
 def get_sign(auth, formdata, ts):
     g, current_ts = get_g(auth, ts)
-    return get_md5(current_ts + formdata + g)
\ No newline at end of file
+    return get_md5(current_ts + formdata + g)
+
+
+class FastSigner:
+    """
+    Подпись запроса за один проход сериализации:
+    - payload кодируется один раз компактным энкодером, и ровно эти байты уходят телом запроса;
+    - md5-состояние токена посчитано заранее, на запрос дописывается только ts.
+    Алгоритм подписи тот же, что у get_sign: md5(ts + body + md5(auth + ts)[7:]).
+    """
+    __slots__ = ("_auth_md5",)
+
+    def __init__(self, auth: str):
+        self._auth_md5 = hashlib.md5(auth.encode("utf-8"))
+
+    def sign(self, payload: bytes, ts: bytes) -> str:
+        inner = self._auth_md5.copy()
+        inner.update(ts)
+        outer = hashlib.md5(ts)
+        outer.update(payload)
+        outer.update(inner.hexdigest()[7:].encode("ascii"))
+        return outer.hexdigest()
+
+    def prepare(self, info, with_body: bool = True):
+        """
+        Аналог get_data. Возвращает (body, sign, ts):
+        body -- байты тела для POST (None, если тела нет или with_body=False).
+        """
+        ts = str(int(time() * 1000))
+        ts_b = ts.encode("ascii")
+        if isinstance(info, list):
+            payload = dumps(info)
+            body = payload
+        else:
+            payload = dumps({**(info or {}), "chash": os.urandom(16).hex(), "ts": ts})
+            # как в get_data: пустой/None payload уходит без chash/ts
+            body = payload if info else (dumps(info) if info is not None else None)
+        return (body if with_body else None), self.sign(payload, ts_b), ts
@@ -0,0 +1,139 @@
+import asyncio
+from typing import *
+from a_config import PNL_PAGE_SIZE, PNL_INCREMENTAL_PAGE_SIZE, PNL_PAGE_FANOUT, PNL_MAX_PAGES, PNL_CACHE_MAX
+from c_log import ErrorHandler
+
+# fetch_page(symbol, position_type, page_num, page_size) -> строки history_positions (новые первыми) | None -- ошибка
+FetchPage = Callable[[str, Optional[int], int, int], Awaitable[Optional[List[Dict]]]]
+
+
+class _ClosedPositions:
+    """Закрытые позиции одного (symbol, positionType): positionId -> (updateTime, realised, profitRatio)."""
+    __slots__ = ("rows", "covered_from", "lock")
+
+    def __init__(self):
+        self.rows: Dict[str, Tuple[int, float, Optional[float]]] = {}
+        self.covered_from: Optional[int] = None  # с этого updateTime (мс) история выкачана без пропусков
+        self.lock = asyncio.Lock()
+
+
+class PnlService:
+    """
+    Реализованный PnL по /private/position/list/history_positions.
+    Эндпоинт не умеет фильтр по времени -- только symbol/type и страницы (новые первыми), поэтому граница
+    start_time соблюдается листанием: страницы запрашиваются, пока не пройдена start_time.
+    Закрытые позиции неизменны и кэшируются по positionId; когда история уже выкачана, отчет стоит
+    одного маленького запроса первой страницы (до первой известной позиции).
+    """
+
+    def __init__(
+        self,
+        fetch_page: FetchPage,
+        info_handler: ErrorHandler,
+        page_size: int = PNL_PAGE_SIZE,
+        incremental_page_size: int = PNL_INCREMENTAL_PAGE_SIZE,
+        fanout: int = PNL_PAGE_FANOUT,
+        max_pages: int = PNL_MAX_PAGES,
+        cache_max: int = PNL_CACHE_MAX,
+    ):
+        self.fetch_page = fetch_page
+        self.info_handler = info_handler
+        self.page_size = page_size
+        self.incremental_page_size = incremental_page_size
+        self.fanout = max(1, fanout)
+        self.max_pages = max_pages
+        self.cache_max = cache_max
+        self._books: Dict[Tuple[str, Optional[int]], _ClosedPositions] = {}
+        info_handler.wrap_foreign_methods(self)
+
+    async def realized_pnl(
+        self,
+        symbol: str,
+        start_time: Optional[int],
+        end_time: Optional[int] = None,
+        direction: Optional[int] = None  # 1=LONG, 2=SHORT
+    ) -> Optional[dict]:
+        """
+        {"pnl_usdt": float, "pnl_pct": float} по позициям, закрытым с start_time; pnl_pct -- сумма profitRatio в %.
+        Ни одной позиции -- значения None. end_time не фильтрует: закрытие, пришедшее чуть позже
+        локальных часов, все равно относится к отчету.
+        """
+        book = self._books.get((symbol, direction))
+        if book is None:
+            book = self._books[(symbol, direction)] = _ClosedPositions()
+
+        async with book.lock:
+            if not await self._sync(book, symbol, direction, start_time or 0):
+                return {"pnl_usdt": None, "pnl_pct": None}
+
+        pnl_usdt, pnl_pct, matched = 0.0, 0.0, False
+        for update_time, realised, profit_ratio in book.rows.values():
+            if start_time and update_time < start_time:
+                continue
+            pnl_usdt += realised
+            if profit_ratio is not None:
+                pnl_pct += profit_ratio * 100
+            matched = True
+
+        if not matched:
+            return {"pnl_usdt": None, "pnl_pct": None}
+        return {"pnl_usdt": round(pnl_usdt, 6), "pnl_pct": round(pnl_pct, 4)}
+
+    async def _sync(self, book: _ClosedPositions, symbol: str, direction: Optional[int], start_time: int) -> bool:
+        """Докачивает в book историю до start_time. False -- биржа не ответила."""
+        incremental = book.covered_from is not None and start_time >= book.covered_from
+        page_size = self.incremental_page_size if incremental else self.page_size
+        # инкрементально -- по одной странице (обычно хватает первой); глубокий проход -- пачками по fanout
+        batch = 1
+        page_num = 1
+        while page_num <= self.max_pages:
+            pages = range(page_num, min(page_num + batch, self.max_pages + 1))
+            results = await asyncio.gather(*(self.fetch_page(symbol, direction, num, page_size) for num in pages))
+            page_num = pages[-1] + 1
+            if not incremental:
+                batch = self.fanout
+
+            for rows in results:
+                if rows is None:
+                    return False
+                done = self._absorb(book, rows, start_time, stop_at_known=incremental)
+                if done or len(rows) < page_size:
+                    # история до start_time (или вся) выкачана
+                    oldest = 0 if len(rows) < page_size and not done else start_time
+                    book.covered_from = oldest if book.covered_from is None else min(book.covered_from, oldest)
+                    return True
+
+        self.info_handler.debug_error_notes(
+            "[PNL] %s: history deeper than %d pages, report may be partial", symbol, self.max_pages
+        )
+        return True
+
+    def _absorb(self, book: _ClosedPositions, rows: List[Dict], start_time: int, stop_at_known: bool) -> bool:
+        """Кладет строки страницы в кэш. True -- дальше листать не нужно (пройдена start_time / встречена известная позиция)."""
+        done = False
+        for row in rows:
+            position_id = str(row.get("positionId"))
+            try:
+                update_time = int(row.get("updateTime") or 0)
+            except (TypeError, ValueError):
+                continue
+            if position_id in book.rows:
+                done = done or stop_at_known
+                continue
+            if update_time < start_time:
+                done = True
+            try:
+                realised = float(row.get("realised") or 0.0)
+                profit_ratio = float(row["profitRatio"]) if row.get("profitRatio") is not None else None
+            except (TypeError, ValueError):
+                continue
+            book.rows[position_id] = (update_time, realised, profit_ratio)
+
+        # потолок кэша: вытесняем самые старые закрытия (и сдвигаем границу выкачанной истории)
+        if len(book.rows) > self.cache_max:
+            ordered = sorted(book.rows.items(), key=lambda item: item[1][0])
+            for position_id, _ in ordered[:len(book.rows) - self.cache_max]:
+                del book.rows[position_id]
+            if book.covered_from is not None:
+                book.covered_from = max(book.covered_from, ordered[len(ordered) - self.cache_max][1][0])
+        return done
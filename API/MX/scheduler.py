@@ -0,0 +1,139 @@
+import asyncio
+import time
+from typing import *
+
+
+# классы приоритета (меньше -- важнее)
+PRIORITY_ORDER = 0        # создание/отмена ордеров, стопы, плечо
+PRIORITY_POSITION = 1     # поллинг позиций/открытых ордеров, fair price
+PRIORITY_BACKGROUND = 2   # стейтменты, история, инструменты, ассеты
+
+# prefix эндпоинта -> класс приоритета; prefix же служит ключом bucket
+# (порядок важен: первое совпадение выигрывает)
+ENDPOINT_RULES: Tuple[Tuple[str, int], ...] = (
+    ("/private/order/create", PRIORITY_ORDER),
+    ("/private/order/cancel", PRIORITY_ORDER),
+    ("/private/planorder/place", PRIORITY_ORDER),
+    ("/private/planorder/cancel", PRIORITY_ORDER),
+    ("/private/stoporder/", PRIORITY_ORDER),
+    ("/private/position/change_leverage", PRIORITY_ORDER),
+    ("/private/position/change_margin", PRIORITY_ORDER),
+    ("/private/position/open_positions", PRIORITY_POSITION),
+    ("/private/order/list/open_orders", PRIORITY_POSITION),
+    ("/private/order/get", PRIORITY_POSITION),
+    ("/private/planorder/list/orders", PRIORITY_POSITION),
+    ("/contract/fair_price", PRIORITY_POSITION),
+    ("/private/position/list/history_positions", PRIORITY_BACKGROUND),
+    ("/private/order/list/history_orders", PRIORITY_BACKGROUND),
+    ("/contract/detail", PRIORITY_BACKGROUND),
+)
+DEFAULT_BUCKET = "*"
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, need: float, now: float) -> float:
+        """Сколько ждать, пока в bucket будет need токенов (0 -- можно брать сейчас)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= need:
+            return 0.0
+        return (need - self.tokens) / self.rate
+
+
+class RequestScheduler:
+    """
+    Общий планировщик REST-запросов одного аккаунта MEXC:
+    - token bucket на эндпоинт + общий bucket аккаунта;
+    - классы приоритета: ордера > позиции > фон. Пока ждет более важный запрос, менее важные не берут токены;
+    - фоновые запросы не опускают общий bucket ниже reserve (запас под ордера);
+    - ответ биржи 429/510 ставит эндпоинт на паузу (penalize).
+    """
+
+    def __init__(
+        self,
+        endpoint_rps: float,
+        endpoint_burst: int,
+        account_rps: float,
+        account_burst: int,
+        reserve: float = 0.3,
+        penalty: float = 2.0,
+    ):
+        self.endpoint_rps = endpoint_rps
+        self.endpoint_burst = endpoint_burst
+        self.account = TokenBucket(account_rps, account_burst)
+        self.reserve_tokens = account_burst * reserve
+        self.penalty = penalty
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._waiting: List[int] = [0, 0, 0]  # число ожидающих по классам приоритета
+        self.throttled: int = 0               # сколько раз биржа ответила троттлингом
+
+    @staticmethod
+    def classify(endpoint: str) -> Tuple[str, int]:
+        """(ключ bucket, класс приоритета) для эндпоинта."""
+        for prefix, priority in ENDPOINT_RULES:
+            if endpoint.startswith(prefix):
+                return prefix, priority
+        return DEFAULT_BUCKET, PRIORITY_BACKGROUND
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.endpoint_rps, self.endpoint_burst)
+        return bucket
+
+    def _try_take(self, key: str, priority: int, now: float) -> float:
+        bucket = self._bucket(key)
+        bucket.refill(now)
+        self.account.refill(now)
+
+        floor = 0.0 if priority == PRIORITY_ORDER else self.reserve_tokens
+        wait = max(bucket.wait_time(1, now), self.account.wait_time(1 + floor, now))
+        if wait <= 0:
+            bucket.tokens -= 1
+            self.account.tokens -= 1
+        return wait
+
+    async def acquire(self, endpoint: str, priority: Optional[int] = None):
+        """Ждет разрешения на запрос к endpoint. priority переопределяет класс по умолчанию."""
+        key, default_priority = self.classify(endpoint)
+        priority = default_priority if priority is None else priority
+
+        # быстрый путь: никто важнее не ждет и токены есть
+        if not any(self._waiting[:priority]) and self._try_take(key, priority, time.monotonic()) <= 0:
+            return
+
+        self._waiting[priority] += 1
+        try:
+            while True:
+                if any(self._waiting[:priority]):
+                    wait = 1 / self.account.rate
+                else:
+                    wait = self._try_take(key, priority, time.monotonic())
+                    if wait <= 0:
+                        return
+                await asyncio.sleep(wait)
+        finally:
+            self._waiting[priority] -= 1
+
+    def penalize(self, endpoint: str):
+        """Биржа ответила троттлингом: обнуляем bucket эндпоинта и ставим его на паузу."""
+        key, _ = self.classify(endpoint)
+        bucket = self._bucket(key)
+        bucket.tokens = 0.0
+        bucket.blocked_until = time.monotonic() + self.penalty
+        self.throttled += 1
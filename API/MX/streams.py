@@ -39,6 +39,8 @@ class MxFuturesOrderWS:
         self.is_connected = False
         self.is_running = False
         self.callback = None
+        self.position_handler: Optional[Callable[[Dict[str, Any]], None]] = None  # push.personal.position
+        self.deal_handler: Optional[Callable[[Dict[str, Any]], None]] = None      # push.personal.order.deal
         self.reconnect_attempts = 0
         self.ping_interval = 10
         self.ping_task = None
@@ -49,6 +51,13 @@ class MxFuturesOrderWS:
 
         info_handler.wrap_foreign_methods(self) if hasattr(info_handler, "wrap_foreign_methods") else None
 
+        # канал -> обработчик push-сообщений (после обертки, чтобы брать обернутые методы)
+        self.channel_handlers: Dict[str, Callable] = {
+            "push.personal.order": self.parse_msg,
+            "push.personal.position": self.parse_position,
+            "push.personal.order.deal": self.parse_deal,
+        }
+
     def generate_signature(self, timestamp: int) -> str:
         signature_string = f"{self.api_key}{timestamp}"
         signature = hmac.new(
@@ -63,7 +72,7 @@ class MxFuturesOrderWS:
             try:
                 await self.websocket.send_json({"method": "ping"})
             except Exception as e:
-                self.info_handler.debug_error_notes(f"Ping failed: {e}")
+                self.info_handler.debug_error_notes("Ping failed: %s", e)
 
     async def ping_loop(self):
         while self.is_running and self.is_connected and not self.stop_bot and not self.context.stop_bot_iteration:
@@ -84,7 +93,7 @@ class MxFuturesOrderWS:
             self.info_handler.debug_error_notes("WebSocket connected successfully")
             return True
         except Exception as e:
-            self.info_handler.debug_error_notes(f"WebSocket connection failed: {e}")
+            self.info_handler.debug_error_notes("WebSocket connection failed: %s", e)
             self.is_connected = False
             return False
 
@@ -107,26 +116,32 @@ class MxFuturesOrderWS:
                 self.info_handler.debug_info_notes("Login successful")
                 return True
             else:
-                self.info_handler.debug_error_notes(f"Login failed: {data}")
+                self.info_handler.debug_error_notes("Login failed: %s", data)
                 return False
         except asyncio.TimeoutError:
             self.info_handler.debug_error_notes("Login timeout - no response received")
             return False
 
-    async def subscribe_to_orders(self) -> bool:
+    async def subscribe_to_private(self) -> bool:
         subscribe_payload = {
-            "method": "sub.personal",
-            "param": {"channel": "push.personal.order"}
+            "method": "personal.filter",
+            "param": {
+                "filters": [
+                    {"filter": "order"},
+                    {"filter": "order.deal"},
+                    {"filter": "position"},
+                ]
+            }
         }
         await self.websocket.send_json(subscribe_payload)
-        self.info_handler.debug_info_notes("Subscribed to order channel")
+        self.info_handler.debug_info_notes("Subscribed to order/deal/position channels")
         return True
 
     async def authenticate_and_subscribe(self) -> bool:
         if not await self.login():
             self.info_handler.debug_error_notes("Authentication failed")
             return False
-        if not await self.subscribe_to_orders():
+        if not await self.subscribe_to_private():
             self.info_handler.debug_error_notes("Subscription failed")
             return False
         return True
@@ -137,19 +152,20 @@ class MxFuturesOrderWS:
                 try:
                     data = json.loads(msg.data)
                 except Exception as e:
-                    self.info_handler.debug_error_notes(f"JSON parse error: {e}")
+                    self.info_handler.debug_error_notes("JSON parse error: %s", e)
                     continue
 
                 if data.get("method") == "ping":
                     await self.websocket.send_json({"method": "pong"})
                     continue
 
-                if data.get("channel") == "push.personal.order":
-                    await self.parse_msg(data.get("data", {}))
+                handler = self.channel_handlers.get(data.get("channel"))
+                if handler:
+                    await handler(data.get("data", {}))
                     continue
 
                 if data.get("channel") == "rs.error":
-                    self.info_handler.debug_error_notes(f"Error: {data}")
+                    self.info_handler.debug_error_notes("Error: %s", data)
                     continue
 
             elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
@@ -160,7 +176,7 @@ class MxFuturesOrderWS:
     async def reconnect(self):
         self.reconnect_attempts += 1
         delay = random.uniform(0.8, 1.2)
-        self.info_handler.debug_error_notes(f"Reconnecting attempt {self.reconnect_attempts} in {delay:.1f}s")
+        self.info_handler.debug_error_notes("Reconnecting attempt %d in %.1fs", self.reconnect_attempts, delay)
         await asyncio.sleep(delay)
 
     async def disconnect(self):
@@ -172,12 +188,16 @@ class MxFuturesOrderWS:
                 await self.session.close()
                 self.info_handler.debug_error_notes("Client session closed")
         except Exception as e:
-            self.info_handler.debug_error_notes(f"Error during disconnect: {e}")
+            self.info_handler.debug_error_notes("Error during disconnect: %s", e)
         finally:
             self.is_connected = False
             self.websocket = None
             self.session = None
 
+    def mark_ready(self):
+        """Сигнал Core, что стрим ордеров поднят и подписан."""
+        self.context.orders_updated_event.set()
+
     def stop(self):
         self.is_running = False
         self.info_handler.debug_error_notes("Stopping stream...")
@@ -203,7 +223,7 @@ class MxFuturesOrderWS:
                     self.ping_task.cancel()
                 self.ping_task = asyncio.create_task(self.ping_loop())
 
-                self.context.orders_updated_event.set()
+                self.mark_ready()
                 await self.handle_messages()
 
             except Exception as e:
@@ -248,10 +268,69 @@ class MxFuturesOrderWS:
         category = msg.get("category")
 
         pos_data = self.context.position_vars[order_symbol][order_pos_side]
-        order_data = pos_data["order_stream_data"]
 
         if category == 1:  # лимитные ордера                         
-            # async with self.context.bloc_async:
-            order_data.setdefault(order_id, {})
-            order_data[order_id].update({"state": msg.get('state')})
-            pos_data["pending"] = True
\ No newline at end of file
+            pos_data.orders.on_state(order_id, msg.get('state'))
+            pos_data.pending = True
+            self.context.wake_symbol(order_symbol)
+
+    async def parse_position(self, msg: Dict[str, Any]):
+        """Пуш состояния позиции -> Synchronizer (без ожидания REST-поллинга)."""
+        if self.position_handler and isinstance(msg, dict):
+            self.position_handler(msg)
+
+    async def parse_deal(self, msg: Dict[str, Any]):
+        """Пуш исполнения (fill) -> Synchronizer запрашивает быструю сверку."""
+        if self.deal_handler and isinstance(msg, dict):
+            self.deal_handler(msg)
+
+
+# --------------------------------------------------
+class MxTickerWS(MxFuturesOrderWS):
+    def __init__(
+        self,
+        context: BotContext,
+        info_handler: ErrorHandler,
+        proxy_url: str = None,
+        ws_url: str = "wss://contract.mexc.com/edge"
+    ):
+        """
+        Публичный стрим тикеров MEXC Futures. Держит context.price_cache актуальным,
+        чтобы вход не ждал REST-запроса fair_price.
+        """
+        super().__init__(
+            api_key=None,
+            api_secret=None,
+            context=context,
+            info_handler=info_handler,
+            proxy_url=proxy_url,
+            ws_url=ws_url
+        )
+        self.channel_handlers = {"push.tickers": self.parse_tickers}
+
+    async def authenticate_and_subscribe(self) -> bool:
+        # публичный канал -- логин не нужен
+        await self.websocket.send_json({"method": "sub.tickers", "param": {}})
+        self.info_handler.debug_info_notes("Subscribed to tickers channel")
+        return True
+
+    def mark_ready(self):
+        # готовность стрима ордеров сигналит только приватный стрим
+        pass
+
+    async def parse_tickers(self, data: List[Dict[str, Any]]):
+        """Обновляет кэш цен: symbol -> (fairPrice | lastPrice, monotonic ts)"""
+        if not isinstance(data, list):
+            data = [data]
+
+        now = time.monotonic()
+        price_cache = self.context.price_cache
+        for item in data:
+            symbol = item.get("symbol")
+            price = item.get("fairPrice") or item.get("lastPrice")
+            if not symbol or not price:
+                continue
+            try:
+                price_cache[symbol] = (float(price), now)
+            except (TypeError, ValueError):
+                continue
\ No newline at end of file
@@ -125,6 +125,7 @@ class TelegramUserInterface:
 
         # ===== Регистрация хендлеров =====
         self.dp.message.register(self.start_handler, Command("start"))
+        self.dp.message.register(self.metrics_cmd, Command("metrics"))
         self.dp.message.register(self.settings_cmd, self._text_contains(["настройки"]))
         self.dp.message.register(self.status_cmd, self._text_contains(["статус"]))
         self.dp.message.register(self.start_cmd, self._text_contains(["старт"]))
@@ -251,18 +252,18 @@ class TelegramUserInterface:
             reply_markup=self.main_menu
         )
 
+    async def metrics_cmd(self, message: types.Message):
+        """Перцентили латентности сигнального пути (context.tracer)."""
+        self.ensure_user_config(message.chat.id)
+        await message.answer(self.context.tracer.report(), reply_markup=self.main_menu)
+
     async def start_cmd(self, message: types.Message):
         chat_id = message.chat.id
         self.ensure_user_config(chat_id)
 
         async with self.bot_iteration_lock:
             # Если уже идёт итерация или есть открытые позиции
-            if self.context.start_bot_iteration or any(
-                pos.get("in_position", False)
-                for symbol_data in self.context.position_vars.values()
-                for side, pos in symbol_data.items()
-                if side != "spec"
-            ):
+            if self.context.start_bot_iteration or self.context.has_open_positions():
                 await message.answer("Бот уже работает либо есть открытые позиции", reply_markup=self.main_menu)
                 return
 
@@ -280,12 +281,7 @@ class TelegramUserInterface:
 
         async with self.bot_iteration_lock:
             # Если есть открытые позиции — стоп невозможен
-            if any(
-                pos.get("in_position", False)
-                for symbol_data in self.context.position_vars.values()
-                for side, pos in symbol_data.items()
-                if side != "spec"
-            ):
+            if self.context.has_open_positions():
                 await message.answer("Сперва закройте все позиции.", reply_markup=self.main_menu)
                 return
 
@@ -333,7 +329,8 @@ class TelegramUserInterface:
         field_info = cfg["_await_field"]
         section, field = field_info["section"], field_info["field"]
         raw = (message.text or "").strip()
-        fs = cfg["config"].setdefault(section, {})
+        # правим копию секции и подменяем ее целиком ниже: живые сделки держат свой снимок (TradingParams)
+        fs = copy.deepcopy(cfg["config"].setdefault(section, {}))
 
         try:
             if section == "fin_settings":
@@ -367,9 +364,6 @@ class TelegramUserInterface:
                     # === сохраняем в конфиг ===
                     fs["tp_levels"][range_key] = levels
 
-                    # 🔑 тут сразу же обновляем дефолт динамически
-                    cfg["config"]["fin_settings"]["tp_levels"][range_key] = levels
-
                     # # Проверка равенства длин
                     # lengths = [len(v) for v in fs["tp_levels"].values() if v]
                     # if lengths and len(set(lengths)) > 1:
@@ -431,6 +425,11 @@ class TelegramUserInterface:
             await message.answer(f"Ошибка: {e}")
             return
 
+        # атомарная подмена секции; новая версия fin_settings уйдет в TradingParams следующего сигнала
+        cfg["config"][section] = fs
+        if section == "fin_settings":
+            cfg["_fin_version"] = cfg.get("_fin_version", 0) + 1
+
         cfg["_await_field"] = None
         await message.answer(f"✅ Значение для {field} сохранено!", reply_markup=self.main_menu)
 
@@ -596,12 +595,7 @@ class TelegramUserInterface:
             await callback.message.answer("❗ Сначала настройте конфиг полностью", reply_markup=self.main_menu)
 
     async def stop_button(self, callback: types.CallbackQuery):
-        if any(
-            pos.get("in_position", False)
-            for symbol_data in self.context.position_vars.values()
-            for side, pos in symbol_data.items()
-            if side != "spec"
-        ):
+        if self.context.has_open_positions():
             await callback.message.answer("Сперва закройте все позиции.", reply_markup=self.main_menu)
             return
         user_id = callback.from_user.id
@@ -1,8 +1,11 @@
 from a_config import *
 from b_context import BotContext
 from c_log import ErrorHandler, log_time
+from c_dedup import DedupCache
 from typing import *
 import re
+import time
+from dataclasses import dataclass
 from aiogram import Dispatcher, types
 
 
@@ -17,18 +20,33 @@ LATIN_TO_CYR = CHAR_PAIRS
 CYR_TO_LATIN = {v: k for k, v in CHAR_PAIRS.items()}
 
 
+# таблица для str.translate: кириллические двойники -> латиница, "широкие" скобки/двоеточие -> ascii
+HOMOGLYPH_TABLE = str.maketrans({**CYR_TO_LATIN, "（": "(", "）": ")", "：": ":"})
+
+# [^\S\n] -- пробельный символ, кроме перевода строки (капа, как и раньше, не переносится через строку)
+_CAP_PATTERN = (
+    r"(?:market[^\S\n]*cap|marketcap|mcap|cap)[^\S\n]*[:\-–]?[^\S\n]*\$?[^\S\n]*"
+    r"(?P<cap>[\d.,](?:[\d.,]|[^\S\n])*)(?P<suffix>[kmbм])?"
+)
+# один проход по тексту: тикер ($op) или капа (market cap: $1.2m) -- что встретится раньше
+SIGNAL_RE = re.compile(r"\$(?P<symbol>[a-z0-9]+)|" + _CAP_PATTERN)
+CAP_RE = re.compile(_CAP_PATTERN)
+
+CAP_MULTIPLIERS = {"k": 1_000, "m": 1_000_000, "м": 1_000_000, "b": 1_000_000_000}
+
+
 def normalize_text(text: str) -> str:
     """Приводим всё к латинице и lowercase"""
-    res = []
-    for ch in text:
-        if ch in CYR_TO_LATIN:
-            res.append(CYR_TO_LATIN[ch])  # кириллицу в латиницу
-        else:
-            res.append(ch)
-    normalized = "".join(res).lower()
-    # нормализуем скобки (китайские, корейские и пр.)
-    normalized = normalized.replace("（", "(").replace("）", ")")
-    return normalized
+    return text.translate(HOMOGLYPH_TABLE).lower()
+
+
+def cap_from_match(m_cap: "re.Match") -> Optional[float]:
+    """Число капы из совпадения CAP_RE/SIGNAL_RE (суффикс k/m/b необязателен)."""
+    num = TgParser.to_float(m_cap.group("cap"))
+    if num is None:
+        return None
+    suffix = m_cap.group("suffix")
+    return num * CAP_MULTIPLIERS[suffix] if suffix else num
 
 
 class TgParser:
@@ -48,7 +66,8 @@ class TgParser:
             else:
                 raw_num = raw_num.replace(",", "")
         elif "," in raw_num:
-            raw_num = raw_num.replace(",", ".")
+            # "480,000,000" -- разделители тысяч, "2,5" -- десятичная запятая
+            raw_num = raw_num.replace(",", "") if raw_num.count(",") > 1 else raw_num.replace(",", ".")
 
         try:
             return float(raw_num)
@@ -56,63 +75,42 @@ class TgParser:
             return None
 
     def parse_marketcap(self, line: str) -> Optional[float]:
-        line_norm = normalize_text(line)
-
-        # m_cap = re.search(
-        #     r"marketcap\s*[:\-–]?\s*\$?\s*([\d.,\s]+)\s*([kmbм]?)",
-        #     line_norm
-        # )
-        m_cap = re.search(
-            r"(?:market\s*cap|marketcap|mcap|cap)\s*[:\-–]?\s*\$?\s*([\d.,\s]+)\s*([kmbм])?",
-            line_norm
-        )
-
+        m_cap = CAP_RE.search(normalize_text(line))
         if not m_cap:
             return None
-
-        num_str = m_cap.group(1)
-        suffix = m_cap.group(2).lower()
-
-        num = self.to_float(num_str)
-        if num is None:
-            return None
-
-        if suffix == "k":
-            num *= 1_000
-        elif suffix in ("m", "м"):  # поддержим лат и кир
-            num *= 1_000_000
-        elif suffix == "b":
-            num *= 1_000_000_000
-
-        return num
+        return cap_from_match(m_cap)
 
     def parse_tg_message(self, message: str) -> Tuple[dict, bool]:
-        text = normalize_text(message.strip())
-        lines = [l.strip() for l in text.split("\n") if l.strip()]
-
+        """Один проход скомпилированным SIGNAL_RE по нормализованному тексту: первый тикер и первая валидная капа."""
         result = {"symbol": "", "cap": ""}
 
-        for line in lines:
-            # символ токена
-            if not result["symbol"]:
-                # m_symbol = re.search(r"\$([a-z0-9]+)\b", line)
-                m_symbol = re.search(r"\$([a-z0-9]+)", line)
-                if m_symbol:
-                    result["symbol"] = m_symbol.group(1).upper() + "_USDT"
-
-            # MarketCap
-            if not result["cap"]:
-                cap = self.parse_marketcap(line)
-                if cap is not None:
+        for match in SIGNAL_RE.finditer(normalize_text(message)):
+            symbol = match.group("symbol")
+            if symbol is not None:
+                if not result["symbol"]:
+                    result["symbol"] = symbol.upper() + "_USDT"
+            elif not result["cap"]:
+                cap = cap_from_match(match)
+                if cap:
                     result["cap"] = cap
 
-            if all(v for v in result.values()):
+            if result["symbol"] and result["cap"]:
                 break
 
         all_present = all(v for v in result.values())
         return result, all_present
 
 
+@dataclass(frozen=True, slots=True)
+class Signal:
+    """Сигнал из канала, разобранный один раз на входе. Дальше по пайплайну сырой текст не ходит."""
+    symbol: str                     # "OP_USDT"
+    cap: float
+    ts_ms: int                      # время сообщения в TG, мс
+    message_id: int
+    trace_id: Optional[str] = None  # LatencyTracer
+
+
 class TgBotWatcherAiogram(TgParser):
     """
     Отслеживает сообщения из канала через aiogram хендлеры.
@@ -123,8 +121,10 @@ class TgBotWatcherAiogram(TgParser):
         self.dp = dp
         self.channel_id = channel_id
         self.message_cache = context.message_cache
+        self.signal_queue = context.signal_queue
+        self.tracer = context.tracer
         self.stop_bot = context.stop_bot
-        self._seen_messages: Set[int] = set()
+        self._seen_messages = DedupCache(SIGNAL_DEDUP_TTL, SIGNAL_DEDUP_MAX)
 
     def register_handler(self, tag: str, max_cache: int = 20):
         """
@@ -134,6 +134,7 @@ class TgBotWatcherAiogram(TgParser):
         @self.dp.channel_post()
         async def channel_post_handler(message: types.Message):
             # print("Получено сообщение:", message.chat.id, message.text)
+            t0 = time.perf_counter()
             try:
                 # # # Проверяем ID канала
                 # if message.chat.id != self.channel_id:
@@ -153,16 +154,39 @@ class TgBotWatcherAiogram(TgParser):
                 # print(ts_ms)
 
                 # Уникальность
-                if ts_ms in self._seen_messages:
+                if not self._seen_messages.add(message.message_id):
+                    return
+
+                # Актуальность
+                if time.time() - ts_ms / 1000 >= SIGNAL_TIMEOUT:
+                    print(f"[DEBUG] Stale signal, skipping: message_id={message.message_id} {log_time()}")
                     return
 
-                self._seen_messages.add(ts_ms)
-                self.message_cache.append((message.text, ts_ms))
+                # Парсим один раз здесь -- дальше идет только Signal
+                parsed_msg, all_present = self.parse_tg_message(message.text)
+                if not all_present:
+                    print(f"[DEBUG] Parse error: {parsed_msg}")
+                    return
 
-                # Обрезаем кэш
+                symbol = parsed_msg["symbol"]
+                trace_id = self.tracer.start(t0)
+                self.tracer.bind(trace_id, symbol)
+                self.tracer.mark(symbol, "parse")
+
+                signal = Signal(
+                    symbol=symbol,
+                    cap=parsed_msg["cap"],
+                    ts_ms=ts_ms,
+                    message_id=message.message_id,
+                    trace_id=trace_id,
+                )
+                self.message_cache.append(signal)
+                # сразу будим Core -- без ожидания следующего прохода цикла
+                self.signal_queue.put_nowait(signal)
+
+                # Обрезаем кэш (на месте, чтобы не потерять ссылку на context.message_cache)
                 if len(self.message_cache) > max_cache:
-                    self.message_cache = self.message_cache[-max_cache:]
-                    self._seen_messages.clear()
+                    del self.message_cache[:-max_cache]
 
                 # print(f"[WATCHER] Новое сообщение с тегом {tag}: {message.text}")
 
@@ -0,0 +1,50 @@
+"""
+Микро-бенчмарк декодирования ответа (тело -> ApiResponse).
+    python -m BENCH.bench_decode
+legacy -- json.loads(str) + поля dataclass на каждую строку + SimpleNamespace;
+fast   -- codec.loads(bytes) + ApiResponse.from_dict (кэш полей dataclass).
+"""
+import dataclasses
+import json
+import timeit
+import types
+
+from API.MX.mx_bypass.api import ApiResponse
+from API.MX.mx_bypass.codec import loads
+from API.MX.mx_bypass.mexcTypes import AssetInfo
+
+
+ROW = {
+    "currency": "USDT", "positionMargin": 12.5, "frozenBalance": 0, "availableBalance": 1000.1,
+    "cashBalance": 1012.6, "equity": 1013.2, "unrealized": 0.6, "bonus": 0, "availableCash": 1000.1,
+    "availableOpen": 1000.1, "extra1": "x", "extra2": [1, 2, 3],
+}
+BODY_DICT = json.dumps({"success": True, "code": 0, "data": [dict(ROW) for _ in range(200)]}).encode()
+N = 300
+
+
+def legacy_decode(body: bytes, data_type):
+    payload = json.loads(body.decode("utf-8"))
+    out = []
+    for item in payload["data"]:
+        if data_type is dict:
+            out.append(types.SimpleNamespace(**item))
+        else:
+            expected_keys = {f.name for f in dataclasses.fields(data_type)}
+            filtered = {k: v for k, v in item.items() if k in expected_keys}
+            try:
+                out.append(data_type(**filtered))
+            except TypeError:
+                out.append(filtered)
+    return out
+
+
+def main():
+    for label, data_type in (("dict rows", dict), ("AssetInfo rows", AssetInfo)):
+        legacy = min(timeit.repeat(lambda: legacy_decode(BODY_DICT, data_type), number=N, repeat=5))
+        fast = min(timeit.repeat(lambda: ApiResponse.from_dict(loads(BODY_DICT), data_type), number=N, repeat=5))
+        print(f"{label:>15}: legacy {legacy / N * 1e3:.3f} ms, fast {fast / N * 1e3:.3f} ms, x{legacy / fast:.2f}")
+
+
+if __name__ == "__main__":
+    main()
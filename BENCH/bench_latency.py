@@ -0,0 +1,249 @@
+"""
+E2E-замер латентности торгового пути против локального симулятора (SIM/exchange.py).
+    python -m BENCH.bench_latency --trials 20 --rest-latency 0.005 --ws-latency 0.002
+
+Собирает те же компоненты, что AccountRuntime.start (MexcClient, MxFuturesOrderWS, MxTickerWS,
+InstrumentsUpdater, EntryControl, TPControl, Synchronizer), только REST/ws смотрят в симулятор.
+Каждый прогон -- свой символ. Метрики (по часам симулятора, time.perf_counter):
+    signal -> order     : сигнал принят -> рыночный ордер дошел до биржи
+    fill -> TP armed    : рыночный fill -> последняя TP-лимитка лестницы дошла до биржи
+    TP fill -> SL moved : fill TP1 -> новый SL (план-ордер) дошел до биржи
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from copy import deepcopy
+from typing import *
+
+from a_config import INIT_USER_CONFIG, POSITIONS_UPDATE_FREQUENCY, POSITIONS_RECONCILE_FREQUENCY, TP_CONTROL_TIMEOUT
+from b_context import BotContext
+from b_constructor import PositionVarsSetup
+from b_network import NetworkManager
+from c_log import ErrorHandler
+from c_sync import Synchronizer
+from c_utils import Utils
+from b_params import build_trading_params
+from API.MX.mx import MexcClient
+from API.MX.streams import MxFuturesOrderWS, MxTickerWS
+from API.MX.instruments import InstrumentRegistry, InstrumentsUpdater
+from TRADING.entry import EntryControl
+from TRADING.exit import ExitControl
+from TRADING.tp import TPControl
+from SIM.exchange import SimExchange, SimConfig
+
+
+CHAT_ID = 1
+DIRECTION = "LONG"
+CAP = 300  # диапазон "0-500" -> TP-отступы 10/25/50/75/100 %
+
+
+def percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return (
+        f"p50 {pct(50):7.2f} ms | p90 {pct(90):7.2f} ms | p99 {pct(99):7.2f} ms | "
+        f"max {ordered[-1] * 1000:7.2f} ms | n={len(ordered)}"
+    )
+
+
+async def wait_for(predicate: Callable[[], Any], timeout: float = 10.0, step: float = 0.002):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = predicate()
+        if result:
+            return result
+        await asyncio.sleep(step)
+    raise asyncio.TimeoutError
+
+
+class Harness:
+    def __init__(self, sim: SimExchange, snapshot_path: str):
+        self.sim = sim
+        self.context = BotContext()
+        self.info_handler = ErrorHandler()
+        self.context.users_configs[CHAT_ID] = deepcopy(INIT_USER_CONFIG)
+        self.context.queues_msg[CHAT_ID] = []
+        self.snapshot_path = snapshot_path
+        self.messages: List[Tuple[float, str, dict]] = []
+        self.tasks: List[asyncio.Task] = []
+
+    def preform_message(self, chat_id, marker: str, body: dict, is_print: bool = True):
+        self.messages.append((time.perf_counter(), marker, body))
+
+    async def setup(self):
+        ctx, ih = self.context, self.info_handler
+        self.connector = NetworkManager(context=ctx, info_handler=ih)
+        await self.connector.initialize_session()
+
+        self.mx_client = MexcClient(
+            context=ctx, connector=self.connector, info_handler=ih,
+            api_key="sim", api_secret="sim", token="WEBsim", base_url=self.sim.rest_url,
+        )
+        await self.mx_client.warm_up()
+
+        self.order_stream = MxFuturesOrderWS(
+            api_key="sim", api_secret="sim", context=ctx, info_handler=ih, ws_url=self.sim.ws_url
+        )
+        self.price_stream = MxTickerWS(context=ctx, info_handler=ih, ws_url=self.sim.ws_url)
+
+        self.registry = InstrumentRegistry()
+        self.updater = InstrumentsUpdater(
+            context=ctx, registry=self.registry, mx_client=self.mx_client,
+            info_handler=ih, snapshot_path=self.snapshot_path,
+        )
+        self.utils = Utils(
+            context=ctx, info_handler=ih, preform_message=self.preform_message,
+            get_realized_pnl=self.mx_client.get_realized_pnl, chat_id=CHAT_ID,
+        )
+        self.pos_setup = PositionVarsSetup(context=ctx, info_handler=ih)
+        common = dict(
+            context=ctx, info_handler=ih, mx_client=self.mx_client,
+            preform_message=self.preform_message, direction=DIRECTION, chat_id=CHAT_ID,
+        )
+        self.entry = EntryControl(utils=self.utils, **common)
+        self.exit = ExitControl(**common)
+        self.tp_control = TPControl(utils=self.utils, tp_control_timeout=TP_CONTROL_TIMEOUT, **common)
+        self.sync = Synchronizer(
+            context=ctx, info_handler=ih, set_pos_defaults=self.pos_setup.set_pos_defaults,
+            pnl_report=self.utils.pnl_report, mx_client=self.mx_client,
+            preform_message=self.preform_message,
+            positions_update_frequency=POSITIONS_UPDATE_FREQUENCY,
+            reconcile_frequency=POSITIONS_RECONCILE_FREQUENCY,
+            exit=self.exit, use_cache=False, chat_id=CHAT_ID,
+        )
+        self.sync.position_stream = self.order_stream
+        self.order_stream.position_handler = self.sync.on_position_push
+        self.order_stream.deal_handler = self.sync.on_deal_push
+
+        self.tasks += [
+            asyncio.create_task(self.order_stream.start(debug=False)),
+            asyncio.create_task(self.price_stream.start(debug=False)),
+            asyncio.create_task(self.sync.positions_flow_manager()),
+        ]
+        await asyncio.wait_for(ctx.orders_updated_event.wait(), timeout=10)
+        await self.updater.refresh()
+
+    async def trial(self, symbol: str) -> Dict[str, float]:
+        sim = self.sim
+        entry_price = sim.prices[symbol]
+
+        # === сигнал (тот же путь, что AccountRuntime.handle_signal) ===
+        t_signal = time.perf_counter()
+        tracer = self.context.tracer
+        tracer.bind(tracer.start(t_signal), symbol)
+        params = build_trading_params(self.context.users_configs[CHAT_ID], cap=CAP)
+        await self.updater.ensure_symbol(symbol)
+        self.pos_setup.set_pos_defaults(symbol, DIRECTION, self.registry)
+        tracer.mark(symbol, "set_pos_defaults")
+        if not self.sync._first_update_done:
+            self.sync.request_refresh()
+        self.context.position_vars[symbol][DIRECTION].params = params
+        await self.entry.entry_template(symbol=symbol, cap=CAP, debug_label=f"bench_{symbol}", params=params)
+        tp_task = asyncio.create_task(self.tp_control.tp_control_flow(
+            symbol=symbol, symbol_data=self.context.position_vars[symbol], sign=1, debug_label=f"bench_{symbol}",
+            params=params,
+        ))
+
+        try:
+            ladder_len = len(params.tp_levels)
+            t_order = (await wait_for(lambda: sim.events_of("order_create", symbol=symbol, order_type=5)))[0][0]
+            t_fill = (await wait_for(lambda: sim.events_of("fill", symbol=symbol, order_type=5, side=1)))[0][0]
+            tp_orders = await wait_for(
+                lambda: (lambda ev: ev if len(ev) >= ladder_len else None)(
+                    sim.events_of("order_create", symbol=symbol, order_type=1)
+                )
+            )
+            t_tp_armed = max(ts for ts, _ in tp_orders)
+            await wait_for(lambda: sim.events_of("plan_place", symbol=symbol))
+
+            # === TP1 исполняется -> SL должен переехать ===
+            tp1_price = min(p["price"] for _, p in tp_orders)
+            sim.set_price(symbol, tp1_price)
+            t_tp_fill = (await wait_for(lambda: sim.events_of("fill", symbol=symbol, order_type=1)))[0][0]
+            t_sl_moved = (await wait_for(lambda: sim.events_of("plan_place", since=t_tp_fill, symbol=symbol)))[0][0]
+
+            return {
+                "signal_to_order": t_order - t_signal,
+                "fill_to_tp_armed": t_tp_armed - t_fill,
+                "tp_fill_to_sl_moved": t_sl_moved - t_tp_fill,
+            }
+        finally:
+            # закрываем остаток по SL и гасим TP-контроль символа;
+            # ждем сброса позиции, чтобы он (pnl_report + exit) не попал в замер следующего прогона
+            sim.set_price(symbol, entry_price * 0.5)
+            symbol_data = self.context.position_vars[symbol]
+            try:
+                # сброс подменяет PositionState -- читаем текущий
+                await wait_for(lambda: not symbol_data[DIRECTION].in_position and not symbol_data[DIRECTION].reset_in_progress)
+            except asyncio.TimeoutError:
+                pass
+            tp_task.cancel()
+
+    async def shutdown(self):
+        self.context.stop_bot = True
+        self.order_stream.stop()
+        self.price_stream.stop()
+        for task in self.tasks:
+            task.cancel()
+        await self.order_stream.disconnect()
+        await self.price_stream.disconnect()
+        await self.mx_client.close()
+        await self.connector.shutdown_session()
+
+
+async def run(args):
+    symbols = [f"BENCH{i}_USDT" for i in range(args.trials)]
+    sim = SimExchange(SimConfig(
+        rest_latency=args.rest_latency,
+        rest_jitter=args.rest_jitter,
+        ws_latency=args.ws_latency,
+        fill_delay=args.fill_delay,
+        seed=1,
+        prices={s: 1.0 for s in symbols},
+    ))
+    await sim.start()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        harness = Harness(sim, snapshot_path=os.path.join(tmp_dir, "instruments_snapshot.json"))
+        results: Dict[str, List[float]] = {}
+        report = None
+        try:
+            await harness.setup()
+            for symbol in symbols:
+                try:
+                    sample = await harness.trial(symbol)
+                except asyncio.TimeoutError:
+                    print(f"[BENCH] {symbol}: timeout")
+                    continue
+                for key, value in sample.items():
+                    results.setdefault(key, []).append(value)
+            report = harness.context.tracer.report()
+        finally:
+            await harness.shutdown()
+            await sim.stop()
+
+    print(
+        f"\nREST {args.rest_latency * 1000:.1f}(+{args.rest_jitter * 1000:.1f}) ms, "
+        f"ws {args.ws_latency * 1000:.1f} ms, fill {args.fill_delay * 1000:.1f} ms"
+    )
+    for key in ("signal_to_order", "fill_to_tp_armed", "tp_fill_to_sl_moved"):
+        print(f"{key:>20}: {percentiles(results.get(key, []))}")
+    if report:
+        print(f"\n{report}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="E2E latency benchmark against the local MEXC simulator")
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--rest-latency", type=float, default=0.005)
+    parser.add_argument("--rest-jitter", type=float, default=0.0)
+    parser.add_argument("--ws-latency", type=float, default=0.002)
+    parser.add_argument("--fill-delay", type=float, default=0.005)
+    asyncio.run(run(parser.parse_args()))
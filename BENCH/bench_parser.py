@@ -0,0 +1,111 @@
+"""
+Корпус сигналов UPBIT LISTING: проверка корректности TgParser.parse_tg_message и бенчмарк против прежнего парсера.
+    python -m BENCH.bench_parser
+Проверка -- обычные assert'ы (скрипт падает на первом расхождении), бенчмарк -- мкс на сообщение.
+"""
+import re
+import timeit
+from typing import *
+
+from c_log import ErrorHandler
+from API.TG.tg_parser import TgParser, CYR_TO_LATIN
+
+
+# (сообщение, ожидаемый symbol, ожидаемая cap)
+CORPUS: List[Tuple[str, str, Optional[float]]] = [
+    ("UPBIT LISTING\n$OP\nMarket cap: $1.2M", "OP_USDT", 1_200_000),
+    ("UPBIT LISTING 🚀\n\nToken: $WLD\nMarketCap - 850K", "WLD_USDT", 850_000),
+    ("🔥 UPBIT LISTING 🔥\n$ZRO (LayerZero)\nMCAP: $2,5B", "ZRO_USDT", 2_500_000_000),
+    ("UPBIT LISTING\n$ena\nmarket cap $ 730 000", "ENA_USDT", 730_000),                 # без суффикса
+    ("UPBIT LISTING\n$PYTH\nMarket cap: 1,234.5m", "PYTH_USDT", 1_234_500_000),
+    ("UPBIT LISTING\n$STRK\nКапа / Market cap: 3.4М", "STRK_USDT", 3_400_000),          # кириллическая М
+    ("UРBIT LISTING\n$АRB\nМаrkеt сар: 940k", "ARB_USDT", 940_000),                    # кириллица вместо латиницы
+    ("UPBIT LISTING（KRW）\n$JTO\nMarket cap：$310m\nCap: 1b", "JTO_USDT", 310_000_000),
+    ("UPBIT LISTING\n$NOT\ncap 95.5 m", "NOT_USDT", 95_500_000),
+    ("UPBIT LISTING\nMarket cap: $420M\n$TIA", "TIA_USDT", 420_000_000),                # капа раньше тикера
+    ("UPBIT LISTING\n$MEME\nmarket  cap:  $12.75k", "MEME_USDT", 12_750),
+    ("UPBIT LISTING\n$SUI SUI Network\nmcap-2 100 000 000", "SUI_USDT", 2_100_000_000),
+    ("UPBIT LISTING\n$1INCH\nMarket Cap: 480,000,000", "1INCH_USDT", 480_000_000),
+    ("UPBIT LISTING\n$BONK\nMarket cap: 1.1B", "BONK_USDT", 1_100_000_000),
+    ("UPBIT LISTING\n$W\nMarket cap: n/a\nMcap: 600m", "W_USDT", 600_000_000),          # первая капа невалидна
+    ("UPBIT LISTING\nno ticker here\nMarket cap: $10m", "", 10_000_000),
+    ("UPBIT LISTING\n$ALT\nno market data", "ALT_USDT", None),
+    ("UPBIT LISTING", "", None),
+]
+
+
+# ---------------------------------------------------------------- прежняя реализация (для сравнения)
+def legacy_normalize_text(text: str) -> str:
+    res = []
+    for ch in text:
+        if ch in CYR_TO_LATIN:
+            res.append(CYR_TO_LATIN[ch])
+        else:
+            res.append(ch)
+    normalized = "".join(res).lower()
+    normalized = normalized.replace("（", "(").replace("）", ")")
+    return normalized
+
+
+def legacy_parse_marketcap(line: str) -> Optional[float]:
+    line_norm = legacy_normalize_text(line)
+    m_cap = re.search(r"(?:market\s*cap|marketcap|mcap|cap)\s*[:\-–]?\s*\$?\s*([\d.,\s]+)\s*([kmbм])?", line_norm)
+    if not m_cap:
+        return None
+    num = TgParser.to_float(m_cap.group(1))
+    suffix = (m_cap.group(2) or "").lower()  # в боевом коде .lower() на None падал
+    if num is None:
+        return None
+    if suffix == "k":
+        num *= 1_000
+    elif suffix in ("m", "м"):
+        num *= 1_000_000
+    elif suffix == "b":
+        num *= 1_000_000_000
+    return num
+
+
+def legacy_parse_tg_message(message: str) -> Tuple[dict, bool]:
+    text = legacy_normalize_text(message.strip())
+    lines = [l.strip() for l in text.split("\n") if l.strip()]
+    result = {"symbol": "", "cap": ""}
+    for line in lines:
+        if not result["symbol"]:
+            m_symbol = re.search(r"\$([a-z0-9]+)", line)
+            if m_symbol:
+                result["symbol"] = m_symbol.group(1).upper() + "_USDT"
+        if not result["cap"]:
+            cap = legacy_parse_marketcap(line)
+            if cap is not None:
+                result["cap"] = cap
+        if all(v for v in result.values()):
+            break
+    return result, all(v for v in result.values())
+
+
+def check(parser: TgParser):
+    for message, symbol, cap in CORPUS:
+        result, all_present = parser.parse_tg_message(message)
+        got_cap = result["cap"] or None
+        assert result["symbol"] == symbol, f"{message!r}: symbol {result['symbol']!r} != {symbol!r}"
+        assert (got_cap is None and cap is None) or abs(got_cap - cap) < 1e-6, f"{message!r}: cap {got_cap} != {cap}"
+        assert all_present == bool(symbol and cap), f"{message!r}: all_present={all_present}"
+    print(f"correctness: {len(CORPUS)}/{len(CORPUS)} ok")
+
+
+def main():
+    parser = TgParser(ErrorHandler())
+    check(parser)
+
+    messages = [m for m, _, _ in CORPUS]
+    n = 2_000
+    legacy = min(timeit.repeat(lambda: [legacy_parse_tg_message(m) for m in messages], number=n, repeat=5))
+    fast = min(timeit.repeat(lambda: [parser.parse_tg_message(m) for m in messages], number=n, repeat=5))
+    per_msg = n * len(messages)
+    print(f"legacy: {legacy / per_msg * 1e6:.2f} us/msg")
+    print(f"  fast: {fast / per_msg * 1e6:.2f} us/msg")
+    print(f"speedup: x{legacy / fast:.2f}")
+
+
+if __name__ == "__main__":
+    main()
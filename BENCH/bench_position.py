@@ -0,0 +1,68 @@
+"""
+PositionState (slots) против прежнего dict-шаблона позиции: доступ на горячем пути и память.
+    python -m BENCH.bench_position
+"""
+import sys
+import timeit
+import tracemalloc
+
+from b_position import PositionState
+
+
+def legacy_template() -> dict:
+    return {
+        "margin_size": None, "leverage": None, "nominal_vol": None, "entry_price": None, "hold_price": None,
+        "contracts": None, "vol_assets": None, "preexisting": False, "pending_open": False, "in_position": False,
+        "tp_initiated": False, "tp_prices": [], "progress": 0, "sl_initiated": False, "sl_id": None,
+        "c_time": None, "force_reset_flag": False, "set_ids": set(), "order_stream_data": {}, "pending": False,
+    }
+
+
+def legacy_hot_path(pos_data: dict):
+    # как sl_control/tp_orchestrator/update_active_position до PositionState
+    if not pos_data.get("in_position"):
+        return
+    first_sl = not pos_data.get("sl_initiated", False)
+    entry_price = pos_data.get("entry_price", 0.0)
+    progress = pos_data["progress"]
+    pos_data.update({"hold_price": entry_price, "contracts": 10.0, "in_position": True, "leverage": 5})
+    return first_sl, progress, pos_data.get("tp_prices"), pos_data.get("leverage"), pos_data.get("contracts")
+
+
+def state_hot_path(pos_data: PositionState):
+    if not pos_data.in_position:
+        return
+    first_sl = not pos_data.sl_initiated
+    entry_price = pos_data.entry_price
+    progress = pos_data.progress
+    pos_data.hold_price = entry_price
+    pos_data.contracts = 10.0
+    pos_data.in_position = True
+    pos_data.leverage = 5
+    return first_sl, progress, pos_data.tp_prices, pos_data.leverage, pos_data.contracts
+
+
+def allocated(factory, n: int = 10_000) -> float:
+    tracemalloc.start()
+    items = [factory() for _ in range(n)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return size / n
+
+
+def main():
+    legacy = legacy_template()
+    legacy.update({"in_position": True, "entry_price": 1.0})
+    state = PositionState(in_position=True, entry_price=1.0)
+
+    n = 200_000
+    t_legacy = min(timeit.repeat(lambda: legacy_hot_path(legacy), number=n, repeat=5))
+    t_state = min(timeit.repeat(lambda: state_hot_path(state), number=n, repeat=5))
+    print(f"hot path  dict: {t_legacy / n * 1e9:7.1f} ns | PositionState: {t_state / n * 1e9:7.1f} ns | x{t_legacy / t_state:.2f}")
+    print(f"object    dict: {sys.getsizeof(legacy):5d} B  | PositionState: {sys.getsizeof(state):5d} B")
+    print(f"allocated dict: {allocated(legacy_template):7.0f} B | PositionState: {allocated(PositionState):7.0f} B")
+
+
+if __name__ == "__main__":
+    main()
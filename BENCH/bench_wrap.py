@@ -0,0 +1,88 @@
+"""
+Обертка исключений: прежняя (замыкание на каждый метод каждого экземпляра) против
+классовой (ErrorHandler.wrap_foreign_methods) и горячего метода без обертки (_hot_path).
+    python -m BENCH.bench_wrap
+"""
+import asyncio
+import timeit
+from types import FunctionType
+
+from c_log import ErrorHandler
+
+
+def legacy_wrap(handler: ErrorHandler, obj):
+    # как wrap_foreign_methods до классовой обертки
+    for name, attr in obj.__class__.__dict__.items():
+        if name.startswith("__"):
+            continue
+        if isinstance(attr, FunctionType):
+            setattr(obj, name, handler.total_exception_decor(getattr(obj, name)))
+
+
+def make_class():
+    class Target:
+        _hot_path = ("hot",)
+
+        def __init__(self, handler: ErrorHandler, legacy: bool = False):
+            legacy_wrap(handler, self) if legacy else handler.wrap_foreign_methods(self)
+            self.progress = 1
+
+        def hot(self, x):
+            return self.progress + x
+
+        def wrapped(self, x):
+            return self.progress + x
+
+        def boom(self, x):
+            return x / 0
+
+        async def wrapped_async(self, x):
+            return self.progress + x
+
+        def m1(self): pass
+        def m2(self): pass
+        def m3(self): pass
+        def m4(self): pass
+        def m5(self): pass
+        def m6(self): pass
+
+    return Target
+
+
+def per_call_ns(fn, n: int) -> float:
+    return min(timeit.repeat(fn, number=n, repeat=5)) / n * 1e9
+
+
+def main():
+    handler = ErrorHandler()
+    Legacy, Classed = make_class(), make_class()
+    legacy, classed = Legacy(handler, legacy=True), Classed(handler)
+
+    # поведение при исключении то же: None вместо исключения, запись в лог
+    assert legacy.boom(1) is None and classed.boom(1) is None
+
+    n = 500_000
+    print(f"sync call   legacy: {per_call_ns(lambda: legacy.wrapped(1), n):6.1f} ns | "
+          f"class: {per_call_ns(lambda: classed.wrapped(1), n):6.1f} ns | "
+          f"_hot_path: {per_call_ns(lambda: classed.hot(1), n):6.1f} ns")
+
+    loop = asyncio.new_event_loop()
+
+    async def drive(method, n):
+        for _ in range(n):
+            await method(1)
+
+    def async_ns(method, n=100_000):
+        return min(timeit.repeat(lambda: loop.run_until_complete(drive(method, n)), number=1, repeat=5)) / n * 1e9
+
+    print(f"async call  legacy: {async_ns(legacy.wrapped_async):6.1f} ns | class: {async_ns(classed.wrapped_async):6.1f} ns")
+    loop.close()
+
+    n = 20_000
+    print(f"__init__    legacy: {per_call_ns(lambda: Legacy(handler, legacy=True), n):6.0f} ns | "
+          f"class: {per_call_ns(lambda: Classed(handler), n):6.0f} ns")
+    handler.close()
+
+
+if __name__ == "__main__":
+    main()
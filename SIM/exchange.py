@@ -0,0 +1,550 @@
+"""
+Локальный симулятор MEXC Futures (REST + ws edge) для e2e-прогонов и замеров латентности без живого аккаунта.
+
+    python -m SIM.exchange --port 8765 --latency 0.02
+
+REST:  http://127.0.0.1:<port>/api/v1/...   (пути MexcFuturesAPI)
+WS:    ws://127.0.0.1:<port>/edge             (login / personal.filter / sub.tickers / ping)
+
+Модель: хедж-режим, рыночные ордера исполняются целиком через fill_delay по текущей цене (+ slippage),
+лимитки и план-ордера (SL/TP) -- на тиках цены. Цена -- случайное блуждание или set_price() вручную.
+Все значимые события пишутся в events с time.perf_counter() -- по ним считает латентность BENCH/bench_latency.py.
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import *
+
+from aiohttp import web, WSMsgType
+
+
+@dataclass
+class SimConfig:
+    rest_latency: float = 0.0          # sec, задержка ответа REST
+    rest_jitter: float = 0.0           # sec, + random.uniform(0, rest_jitter)
+    ws_latency: float = 0.0            # sec, задержка доставки ws-пушей
+    fill_delay: float = 0.0            # sec, от приема рыночного ордера до fill
+    slippage_bps: float = 0.0          # проскальзывание рыночного ордера, б.п.
+    reject_rate: float = 0.0           # доля ордеров, отклоняемых кодом 510 (троттлинг)
+    tick_interval: float = 0.05        # sec, шаг ценового пути
+    volatility_bps: float = 0.0        # б.п. случайного блуждания на тик (0 -- цена стоит)
+    ticker_interval: float = 0.5       # sec, период push.tickers
+    verify_sign: bool = True           # проверять x-mxc-sign у POST
+    seed: Optional[int] = None
+    prices: Dict[str, float] = field(default_factory=lambda: {"OP_USDT": 1.0})
+
+
+def contract_row(symbol: str, price: float) -> dict:
+    """Строка /contract/detail для символа (спецификация подобрана под цену)."""
+    base_coin = symbol.split("_")[0]
+    price_scale = max(2, min(8, 4 - int(f"{price:e}".split("e")[1])))
+    return {
+        "symbol": symbol, "baseCoin": base_coin, "baseCoinName": base_coin, "quoteCoin": "USDT",
+        "settleCoin": "USDT", "contractSize": 1, "minVol": 1, "maxVol": 10_000_000,
+        "priceScale": price_scale, "volScale": 0, "priceUnit": 10 ** -price_scale, "volUnit": 1,
+        "minLeverage": 1, "maxLeverage": 200, "state": 0,
+    }
+
+
+class SimExchange:
+    def __init__(self, config: SimConfig = None, token: str = None):
+        self.config = config or SimConfig()
+        self.token = token  # None -- принимаем любой Authorization
+        self.rng = random.Random(self.config.seed)
+
+        self.prices: Dict[str, float] = dict(self.config.prices)
+        self.contracts: Dict[str, dict] = {s: contract_row(s, p) for s, p in self.prices.items()}
+        self.positions: Dict[Tuple[str, int], dict] = {}    # (symbol, positionType) -> позиция
+        self.limit_orders: Dict[str, dict] = {}             # orderId -> открытая лимитка
+        self.plan_orders: Dict[str, dict] = {}              # id -> активный план-ордер
+        self.history_orders: List[dict] = []
+        self.history_positions: List[dict] = []
+        self.events: List[Tuple[float, str, dict]] = []     # (perf_counter, kind, payload)
+
+        self._ids = itertools.count(int(time.time()) * 1000)
+        self._clients: Set["_WsClient"] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._runner: Optional[web.AppRunner] = None
+        self.host: str = "127.0.0.1"
+        self.port: Optional[int] = None
+
+    # ------------------------------------------------------------------ запуск
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._latency_middleware])
+        r = app.router
+        r.add_get("/api/v1/contract/ping", self.h_ping)
+        r.add_get("/api/v1/contract/detail", self.h_contract_detail)
+        r.add_get("/api/v1/contract/fair_price/{symbol}", self.h_fair_price)
+        r.add_get("/api/v1/private/position/open_positions", self.h_open_positions)
+        r.add_get("/api/v1/private/position/list/history_positions", self.h_history_positions)
+        r.add_post("/api/v1/private/position/change_position_mode", self.h_ok)
+        r.add_post("/api/v1/private/position/change_leverage", self.h_ok)
+        r.add_get("/api/v1/private/order/list/open_orders", self.h_open_orders)
+        r.add_get("/api/v1/private/order/list/open_orders/{symbol}", self.h_open_orders)
+        r.add_get("/api/v1/private/order/list/history_orders", self.h_history_orders)
+        r.add_post("/api/v1/private/order/create", self.h_order_create)
+        r.add_post("/api/v1/private/order/cancel", self.h_order_cancel)
+        r.add_post("/api/v1/private/order/cancel_all", self.h_order_cancel_all)
+        r.add_get("/api/v1/private/planorder/list/orders", self.h_plan_orders)
+        r.add_post("/api/v1/private/planorder/place", self.h_plan_place)
+        r.add_post("/api/v1/private/planorder/cancel", self.h_plan_cancel)
+        r.add_post("/api/v1/private/planorder/cancel_all", self.h_plan_cancel_all)
+        r.add_get("/edge", self.h_ws)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.host = host
+        self._tasks = [
+            asyncio.create_task(self._price_loop()),
+            asyncio.create_task(self._ticker_loop()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for client in list(self._clients):
+            await client.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    @property
+    def rest_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v1"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/edge"
+
+    # ------------------------------------------------------------------ утилиты
+    def _next_id(self) -> str:
+        return str(next(self._ids))
+
+    def _event(self, kind: str, **payload):
+        self.events.append((time.perf_counter(), kind, payload))
+
+    def events_of(self, kind: str, since: float = 0.0, **match) -> List[Tuple[float, dict]]:
+        return [
+            (ts, p) for ts, k, p in self.events
+            if k == kind and ts >= since and all(p.get(mk) == mv for mk, mv in match.items())
+        ]
+
+    @staticmethod
+    def _ok(data: Any = None) -> web.Response:
+        return web.json_response({"success": True, "code": 0, "data": data})
+
+    @staticmethod
+    def _page(rows: List[dict], query) -> List[dict]:
+        page_num, page_size = int(query.get("page_num", 1)), int(query.get("page_size", 20))
+        return rows[(page_num - 1) * page_size: page_num * page_size]
+
+    @staticmethod
+    def _fail(code: int, message: str) -> web.Response:
+        return web.json_response({"success": False, "code": code, "message": message})
+
+    @web.middleware
+    async def _latency_middleware(self, request: web.Request, handler):
+        delay = self.config.rest_latency + self.rng.uniform(0, self.config.rest_jitter)
+        if delay > 0 and request.path != "/edge":
+            await asyncio.sleep(delay)
+        return await handler(request)
+
+    async def _read_signed(self, request: web.Request) -> Tuple[Any, Optional[web.Response]]:
+        """Тело POST + проверка подписи так же, как ее считает клиент: md5(ts + body + md5(token + ts)[7:])."""
+        raw = await request.read()
+        auth = request.headers.get("Authorization")
+        if not auth or (self.token and auth != self.token):
+            return None, self._fail(401, "Not logged in")
+        if self.config.verify_sign:
+            ts = request.headers.get("x-mxc-nonce", "")
+            inner = hashlib.md5((auth + ts).encode()).hexdigest()[7:]
+            expected = hashlib.md5(ts.encode() + raw + inner.encode()).hexdigest()
+            if request.headers.get("x-mxc-sign") != expected:
+                return None, self._fail(602, "Signature verification failed")
+        return (json.loads(raw) if raw else None), None
+
+    def _throttled(self) -> bool:
+        return self.config.reject_rate > 0 and self.rng.random() < self.config.reject_rate
+
+    # ------------------------------------------------------------------ public REST
+    async def h_ping(self, request):
+        return self._ok(int(time.time() * 1000))
+
+    async def h_contract_detail(self, request):
+        symbol = request.query.get("symbol")
+        if symbol:
+            row = self.contracts.get(symbol)
+            return self._ok(row) if row else self._fail(1001, "contract not exists")
+
+        body = json.dumps({"success": True, "code": 0, "data": list(self.contracts.values())}).encode()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    async def h_fair_price(self, request):
+        symbol = request.match_info["symbol"]
+        if symbol not in self.prices:
+            return self._fail(1001, "contract not exists")
+        return self._ok({"symbol": symbol, "fairPrice": self.prices[symbol], "timestamp": int(time.time() * 1000)})
+
+    # ------------------------------------------------------------------ private REST
+    async def h_ok(self, request):
+        _, error = await self._read_signed(request)
+        return error or self._ok()
+
+    async def h_open_positions(self, request):
+        symbol = request.query.get("symbol")
+        rows = [p for p in self.positions.values() if p["holdVol"] > 0 and (not symbol or p["symbol"] == symbol)]
+        return self._ok(rows)
+
+    async def h_history_positions(self, request):
+        q = request.query
+        rows = [
+            p for p in reversed(self.history_positions)
+            if (not q.get("symbol") or p["symbol"] == q["symbol"])
+            and (not q.get("type") or p["positionType"] == int(q["type"]))
+        ]
+        return self._ok(self._page(rows, q))
+
+    async def h_open_orders(self, request):
+        symbol = request.match_info.get("symbol") or request.query.get("symbol")
+        rows = [o for o in self.limit_orders.values() if not symbol or o["symbol"] == symbol]
+        return self._ok(self._page(rows, request.query))
+
+    async def h_history_orders(self, request):
+        q = request.query
+        rows = [
+            o for o in reversed(self.history_orders)
+            if (not q.get("symbol") or o["symbol"] == q["symbol"])
+            and (not q.get("states") or str(o["state"]) in q["states"].split(","))
+        ]
+        return self._ok(self._page(rows, q))
+
+    async def h_plan_orders(self, request):
+        symbol = request.query.get("symbol")
+        rows = [o for o in self.plan_orders.values() if not symbol or o["symbol"] == symbol]
+        return self._ok(self._page(rows, request.query))
+
+    async def h_order_create(self, request):
+        data, error = await self._read_signed(request)
+        if error:
+            return error
+        if self._throttled():
+            return self._fail(510, "Requests are too frequent")
+        symbol = data.get("symbol")
+        if symbol not in self.prices:
+            return self._fail(1001, "contract not exists")
+
+        now_ms = int(time.time() * 1000)
+        order = {
+            "orderId": self._next_id(), "symbol": symbol, "side": int(data["side"]),
+            "vol": float(data["vol"]), "price": float(data.get("price") or 0), "leverage": data.get("leverage"),
+            "openType": data.get("openType"), "orderType": int(data.get("type", 5)), "category": 1,
+            "state": 2, "dealVol": 0.0, "dealAvgPrice": 0.0, "externalOid": data.get("externalOid"),
+            "createTime": now_ms, "updateTime": now_ms,
+        }
+        self._event("order_create", symbol=symbol, order_id=order["orderId"], side=order["side"],
+                    order_type=order["orderType"], price=order["price"], vol=order["vol"])
+
+        if order["orderType"] == 5:  # рыночный
+            asyncio.create_task(self._fill_market(order))
+        else:
+            self.limit_orders[order["orderId"]] = order
+            self._push_order(order)
+        return self._ok({"orderId": order["orderId"], "ts": now_ms})
+
+    async def h_order_cancel(self, request):
+        data, error = await self._read_signed(request)
+        if error:
+            return error
+        result = []
+        for order_id in data or []:
+            order = self.limit_orders.pop(str(order_id), None)
+            if order:
+                self._cancel(order)
+            result.append({"orderId": order_id, "errorCode": 0 if order else 2040, "errorMsg": "success"})
+        return self._ok(result)
+
+    async def h_order_cancel_all(self, request):
+        data, error = await self._read_signed(request)
+        if error:
+            return error
+        symbol = (data or {}).get("symbol")
+        for order_id in [oid for oid, o in self.limit_orders.items() if not symbol or o["symbol"] == symbol]:
+            self._cancel(self.limit_orders.pop(order_id))
+        return self._ok()
+
+    async def h_plan_place(self, request):
+        data, error = await self._read_signed(request)
+        if error:
+            return error
+        if self._throttled():
+            return self._fail(510, "Requests are too frequent")
+        symbol = data.get("symbol")
+        if symbol not in self.prices:
+            return self._fail(1001, "contract not exists")
+
+        now_ms = int(time.time() * 1000)
+        plan = {
+            "id": self._next_id(), "symbol": symbol, "side": int(data["side"]), "vol": float(data["vol"]),
+            "leverage": data.get("leverage"), "openType": data.get("openType"),
+            "triggerPrice": float(data["triggerPrice"]), "triggerType": int(data["triggerType"]),
+            "executeCycle": data.get("executeCycle"), "trend": data.get("trend"),
+            "orderType": data.get("orderType"), "state": 1, "createTime": now_ms, "updateTime": now_ms,
+        }
+        self.plan_orders[plan["id"]] = plan
+        self._event("plan_place", symbol=symbol, order_id=plan["id"], trigger_price=plan["triggerPrice"])
+        return self._ok(int(plan["id"]))
+
+    async def h_plan_cancel(self, request):
+        data, error = await self._read_signed(request)
+        if error:
+            return error
+        for item in data or []:
+            plan = self.plan_orders.pop(str(item.get("orderId")), None)
+            if plan:
+                self._event("plan_cancel", symbol=plan["symbol"], order_id=plan["id"])
+        return self._ok()
+
+    async def h_plan_cancel_all(self, request):
+        data, error = await self._read_signed(request)
+        if error:
+            return error
+        symbol = (data or {}).get("symbol")
+        for plan_id in [pid for pid, p in self.plan_orders.items() if not symbol or p["symbol"] == symbol]:
+            plan = self.plan_orders.pop(plan_id)
+            self._event("plan_cancel", symbol=plan["symbol"], order_id=plan_id)
+        return self._ok()
+
+    # ------------------------------------------------------------------ матчинг
+    def set_price(self, symbol: str, price: float):
+        """Ручной сдвиг цены (сразу проверяет лимитки и план-ордера)."""
+        self.prices[symbol] = price
+        if symbol not in self.contracts:
+            self.contracts[symbol] = contract_row(symbol, price)
+        self._match(symbol)
+
+    async def _price_loop(self):
+        while True:
+            await asyncio.sleep(self.config.tick_interval)
+            vol = self.config.volatility_bps / 10_000
+            for symbol in list(self.prices):
+                if vol:
+                    self.prices[symbol] *= 1 + self.rng.gauss(0, vol)
+                self._match(symbol)
+
+    async def _ticker_loop(self):
+        while True:
+            await asyncio.sleep(self.config.ticker_interval)
+            data = [
+                {"symbol": s, "lastPrice": p, "fairPrice": p, "indexPrice": p, "timestamp": int(time.time() * 1000)}
+                for s, p in self.prices.items()
+            ]
+            self._broadcast("tickers", {"channel": "push.tickers", "data": data, "ts": int(time.time() * 1000)})
+
+    def _match(self, symbol: str):
+        price = self.prices[symbol]
+        for order in [o for o in self.limit_orders.values() if o["symbol"] == symbol]:
+            side, limit = order["side"], order["price"]
+            # 1 open long / 2 close short -- покупка; 3 open short / 4 close long -- продажа
+            crossed = price <= limit if side in (1, 2) else price >= limit
+            if crossed:
+                self.limit_orders.pop(order["orderId"], None)
+                self._execute(order, limit)
+
+        for plan in [p for p in self.plan_orders.values() if p["symbol"] == symbol]:
+            trigger = plan["triggerPrice"]
+            crossed = price >= trigger if plan["triggerType"] == 1 else price <= trigger
+            if crossed:
+                self.plan_orders.pop(plan["id"], None)
+                self._event("plan_trigger", symbol=symbol, order_id=plan["id"], price=price)
+                order = {
+                    "orderId": self._next_id(), "symbol": symbol, "side": plan["side"], "vol": plan["vol"],
+                    "price": 0.0, "leverage": plan["leverage"], "openType": plan["openType"], "orderType": 5,
+                    "category": 1, "state": 2, "dealVol": 0.0, "dealAvgPrice": 0.0, "externalOid": None,
+                    "createTime": int(time.time() * 1000), "updateTime": int(time.time() * 1000),
+                }
+                self._execute(order, price)
+
+    async def _fill_market(self, order: dict):
+        if self.config.fill_delay > 0:
+            await asyncio.sleep(self.config.fill_delay)
+        price = self.prices[order["symbol"]]
+        slip = self.config.slippage_bps / 10_000
+        price *= 1 + slip if order["side"] in (1, 2) else 1 - slip
+        self._execute(order, price)
+
+    def _execute(self, order: dict, price: float):
+        symbol, side = order["symbol"], order["side"]
+        pos_type = 1 if side in (1, 4) else 2
+        key = (symbol, pos_type)
+        now_ms = int(time.time() * 1000)
+        position = self.positions.get(key)
+
+        vol = order["vol"]
+        realised = 0.0
+        if side in (1, 3):  # открытие / добор
+            if not position or position["holdVol"] <= 0:
+                position = self.positions[key] = {
+                    "positionId": int(self._next_id()), "symbol": symbol, "positionType": pos_type,
+                    "openType": order.get("openType") or 2, "state": 1, "holdVol": 0.0, "frozenVol": 0.0,
+                    "closeVol": 0.0, "holdAvgPrice": 0.0, "openAvgPrice": 0.0, "closeAvgPrice": 0.0,
+                    "realised": 0.0, "leverage": order.get("leverage") or 1,
+                    "createTime": now_ms, "updateTime": now_ms,
+                }
+            total = position["holdVol"] + vol
+            position["holdAvgPrice"] = (position["holdAvgPrice"] * position["holdVol"] + price * vol) / total
+            position["openAvgPrice"] = position["holdAvgPrice"]
+            position["holdVol"] = total
+        else:  # закрытие
+            if not position or position["holdVol"] <= 0:
+                order["state"] = 4
+                self._push_order(order)
+                return
+            vol = min(vol, position["holdVol"])
+            sign = 1 if pos_type == 1 else -1
+            realised = (price - position["holdAvgPrice"]) * vol * sign * self.contracts[symbol]["contractSize"]
+            closed_before = position["closeVol"]
+            position["closeAvgPrice"] = (position["closeAvgPrice"] * closed_before + price * vol) / (closed_before + vol)
+            position["closeVol"] += vol
+            position["holdVol"] -= vol
+            position["realised"] += realised
+        position["updateTime"] = now_ms
+
+        order.update({"state": 3, "dealVol": vol, "dealAvgPrice": price, "updateTime": now_ms})
+        self.history_orders.append(dict(order))
+        self._event("fill", symbol=symbol, order_id=order["orderId"], side=side,
+                    order_type=order["orderType"], price=price, vol=vol)
+
+        self._push_order(order)
+        self._push("personal", {"channel": "push.personal.order.deal", "data": {
+            "id": self._next_id(), "orderId": order["orderId"], "symbol": symbol, "side": side,
+            "vol": vol, "price": price, "profit": realised, "timestamp": now_ms,
+        }})
+
+        if position["holdVol"] <= 1e-12:
+            position["holdVol"] = 0.0
+            position["state"] = 3
+            notional = position["openAvgPrice"] * position["closeVol"] * self.contracts[symbol]["contractSize"]
+            margin = notional / (position["leverage"] or 1)
+            self.history_positions.append({
+                **position, "profitRatio": position["realised"] / margin if margin else 0.0,
+            })
+            self.positions.pop(key, None)
+        self._push("personal", {"channel": "push.personal.position", "data": dict(position)})
+
+    def _cancel(self, order: dict):
+        order["state"] = 4
+        order["updateTime"] = int(time.time() * 1000)
+        self._event("order_cancel", symbol=order["symbol"], order_id=order["orderId"])
+        self._push_order(order)
+
+    # ------------------------------------------------------------------ ws
+    def _push_order(self, order: dict):
+        self._push("personal", {"channel": "push.personal.order", "data": dict(order)})
+
+    def _push(self, topic: str, message: dict):
+        self._broadcast(topic, {**message, "ts": int(time.time() * 1000)})
+
+    def _broadcast(self, topic: str, message: dict):
+        for client in list(self._clients):
+            if topic in client.topics:
+                client.send(message)
+
+    async def h_ws(self, request):
+        ws = web.WebSocketResponse(autoping=False)
+        await ws.prepare(request)
+        client = _WsClient(ws, self.config.ws_latency)
+        self._clients.add(client)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                method = data.get("method")
+                if method == "ping":
+                    client.send({"channel": "pong", "data": int(time.time() * 1000)})
+                elif method == "login":
+                    client.logged_in = True
+                    client.send({"channel": "rs.login", "data": "success"})
+                elif method == "personal.filter":
+                    if client.logged_in:
+                        client.topics.add("personal")
+                    client.send({"channel": "rs.personal.filter", "data": "success" if client.logged_in else "fail"})
+                elif method == "sub.tickers":
+                    client.topics.add("tickers")
+                    client.send({"channel": "rs.sub.tickers", "data": "success"})
+        finally:
+            self._clients.discard(client)
+            await client.close()
+        return ws
+
+
+class _WsClient:
+    """Соединение ws: исходящая очередь с задержкой доставки ws_latency (порядок пушей сохраняется)."""
+
+    def __init__(self, ws: web.WebSocketResponse, latency: float):
+        self.ws = ws
+        self.latency = latency
+        self.topics: Set[str] = set()
+        self.logged_in = False
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.sender = asyncio.create_task(self._send_loop())
+
+    def send(self, message: dict):
+        self.queue.put_nowait((time.monotonic() + self.latency, message))
+
+    async def _send_loop(self):
+        while True:
+            due, message = await self.queue.get()
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.ws.closed:
+                return
+            await self.ws.send_str(json.dumps(message))
+
+    async def close(self):
+        self.sender.cancel()
+        if not self.ws.closed:
+            await self.ws.close()
+
+
+async def _serve(args):
+    config = SimConfig(
+        rest_latency=args.latency, ws_latency=args.ws_latency, fill_delay=args.fill_delay,
+        volatility_bps=args.volatility, prices={s: args.price for s in args.symbols},
+    )
+    sim = SimExchange(config)
+    await sim.start(args.host, args.port)
+    print(f"SIM MEXC: REST {sim.rest_url}  WS {sim.ws_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await sim.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local MEXC Futures simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="REST latency, sec")
+    parser.add_argument("--ws-latency", type=float, default=0.0, help="ws push latency, sec")
+    parser.add_argument("--fill-delay", type=float, default=0.0, help="market fill delay, sec")
+    parser.add_argument("--volatility", type=float, default=0.0, help="random walk, bps per tick")
+    parser.add_argument("--price", type=float, default=1.0)
+    parser.add_argument("--symbols", nargs="+", default=["OP_USDT"])
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
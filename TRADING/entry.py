@@ -1,15 +1,19 @@
-from a_config import MULTIPLITER_TYPE, CAP_DEP, CAP_MULTIPLITER_TRUE
+from a_config import MULTIPLITER_TYPE, CAP_DEP, CAP_MULTIPLITER_TRUE, USE_PRICE_STREAM, PRICE_CACHE_TTL
 from .valide import OrderValidator
 from b_context import BotContext
+from b_params import TradingParams
 from c_log import ErrorHandler
 from c_utils import Utils
 import time
-from typing import Callable
+from typing import Callable, Optional
 from API.MX.mx import MexcClient
 
 
 
 class EntryControl:
+    # горячие методы без обертки total_exception_decor (исключения -- у обернутого вызывающего)
+    _hot_path = ("get_cached_price",)
+
     def __init__(
         self,
         context: BotContext,
@@ -29,15 +33,23 @@ class EntryControl:
         self.contracts_template = utils.contracts_template
         self.direction = direction
         self.chat_id = chat_id
-        self.fin_settings = self.context.users_configs[chat_id].get("config").get("fin_settings")
-        self.margin_size = self.fin_settings.get("margin_size")
-        self.leverage = self.fin_settings.get("leverage")
+
+    def get_cached_price(self, symbol: str) -> Optional[float]:
+        """Цена из ws-кэша тикеров, если она свежая. Иначе None."""
+        cached = self.context.price_cache.get(symbol)
+        if not cached:
+            return None
+        price, ts = cached
+        if time.monotonic() - ts > PRICE_CACHE_TTL:
+            return None
+        return price
 
     async def entry_template(
         self,
         symbol: str,
         cap: float,
-        debug_label: str
+        debug_label: str,
+        params: TradingParams
     ):
         def get_cap_multiplier(cap: float, cap_dep: dict) -> float:
             """
@@ -50,9 +62,9 @@ class EntryControl:
             return 1.0
 
         symbol_data = self.context.position_vars[symbol]
-        margin_size = self.margin_size 
+        margin_size = params.margin_size
         max_leverage = symbol_data.get("spec", {}).get("max_leverage", 20)
-        leverage = min(self.leverage, max_leverage)
+        leverage = min(params.leverage, max_leverage)
 
         if CAP_MULTIPLITER_TRUE:  
             cap_multipliter = get_cap_multiplier(cap=cap, cap_dep=CAP_DEP)
@@ -63,11 +75,15 @@ class EntryControl:
                 leverage = int(leverage)
 
         pos_data = symbol_data[self.direction]
-        pos_data["margin_size"] = margin_size
-        pos_data["nominal_vol"] = margin_size * leverage
-        pos_data["leverage"] = leverage
+        pos_data.margin_size = margin_size
+        pos_data.nominal_vol = margin_size * leverage
+        pos_data.leverage = leverage
 
-        cur_price = await self.mx_client.get_fair_price(symbol)
+        cur_price = self.get_cached_price(symbol) if USE_PRICE_STREAM else None
+        if cur_price is None:
+            # кэш пуст/протух -- fallback на REST
+            cur_price = await self.mx_client.get_fair_price(symbol)
+        self.context.tracer.mark(symbol, "fair_price")
         # print(cur_price)
         # return
         contracts = self.contracts_template(
@@ -82,6 +98,7 @@ class EntryControl:
             key_label="market"
         )
 
+        self.context.tracer.mark(symbol, "order_send")
         place_order_resp = await self.mx_client.make_order(
             symbol=symbol,
             contract=contracts,
@@ -92,11 +109,12 @@ class EntryControl:
             price=None,
             stopLossPrice=None,
             takeProfitPrice=None,
-            open_type=self.context.users_configs[self.chat_id]["config"]["fin_settings"].get("margin_mode", 2),            
+            open_type=params.margin_mode,
             market_type="MARKET",
             debug=True
         )
 
+        self.context.tracer.mark(symbol, "order_response")
         valid_resp = OrderValidator.validate_and_log(place_order_resp, debug_label)
         if isinstance(valid_resp, dict):
             success = valid_resp.get("success", False)
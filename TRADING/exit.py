@@ -35,8 +35,8 @@ class ExitControl:
         try:
             pos_data = self.context.position_vars[symbol][self.direction]
             # /
-            leverage = pos_data.get("leverage")
-            contracts = pos_data.get("contracts")
+            leverage = pos_data.leverage
+            contracts = pos_data.contracts
 
             place_order_resp = await self.mx_client.make_order(
                 symbol=symbol,
@@ -48,7 +48,7 @@ class ExitControl:
                 price=None,
                 stopLossPrice=None,
                 takeProfitPrice=None,
-                open_type=self.context.users_configs[self.chat_id]["config"]["fin_settings"].get("margin_mode", 2),            
+                open_type=pos_data.params.margin_mode if pos_data.params else self.context.users_configs[self.chat_id]["config"]["fin_settings"].get("margin_mode", 2),
                 market_type="MARKET",
                 debug=False
             )
@@ -2,13 +2,19 @@ import asyncio
 import time
 from typing import *
 from b_context import BotContext
+from b_position import PositionState
+from b_params import TradingParams
 from API.MX.mx import MexcClient
 from c_log import ErrorHandler, log_time
-from c_utils import Utils, to_human_digit, calc_next_sl, sleep_generator
+from c_utils import Utils, to_human_digit, calc_next_sl
+from a_config import TP_MAX_CONCURRENCY
 from .valide import OrderValidator
 
 
 class TPControl:
+    # горячие методы без обертки total_exception_decor (исключения -- у обернутого вызывающего)
+    _hot_path = ("find_current_progress",)
+
     def __init__(
         self,
         context: BotContext,
@@ -17,7 +23,7 @@ class TPControl:
         preform_message: Callable,
         utils: Utils,
         direction: str,
-        tp_control_frequency: float,
+        tp_control_timeout: float,
         chat_id: str
     ):
         info_handler.wrap_foreign_methods(self)
@@ -27,23 +33,75 @@ class TPControl:
         self.mx_client = mx_client
         self.preform_message = preform_message
         self.contracts_template = utils.contracts_template
-        self.tp_control_frequency = tp_control_frequency
+        self.tp_control_timeout = tp_control_timeout
         self.direction = direction   
         self.chat_id = chat_id
         # //        
 
+    async def place_tp_level(
+            self,
+            symbol: str,
+            idx: int,
+            contract: float,
+            target_price: str,
+            leverage: int,
+            open_type: int,
+            delay: float,
+            semaphore: asyncio.Semaphore,
+            debug_label: str = ""
+        ) -> dict:
+        """
+        Ставит одну TP-лимитку лестницы. Возвращает результат уровня:
+        {"idx", "price", "success", "order_id", "reason", "ts"}
+        """
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        async with semaphore:
+            order_data = await self.mx_client.make_order(
+                symbol=symbol,
+                contract=contract,
+                side="SELL",           # -- всегда для закрытия
+                position_side=self.direction,
+                leverage=leverage,
+                open_type=open_type,
+                debug_price=target_price,
+                price=target_price,
+                stopLossPrice=None,
+                takeProfitPrice=None,
+                market_type="LIMIT",
+                debug=False   # флаг дебага
+            )
+
+        valid_resp = OrderValidator.validate_and_log(order_data, debug_label)
+        if not isinstance(valid_resp, dict):
+            valid_resp = {}
+        return {
+            "idx": idx,
+            "price": target_price,
+            "success": valid_resp.get("success", False),
+            "order_id": valid_resp.get("order_id"),
+            "reason": valid_resp.get("reason", "N/A"),
+            "ts": valid_resp.get("ts", int(time.time() * 1000)),
+        }
+
     async def tp_factory(
             self,
             symbol: str,
             symbol_data: dict,
             sign: int,
+            params: TradingParams,
             debug_label: str = "",
             debug: bool = True
         ):
         """
-        Фабрика лимиток на закрытие позиции.s
+        Фабрика лимиток на закрытие позиции.
+        Лестница считается целиком заранее и выставляется параллельно (TP_MAX_CONCURRENCY),
+        опционально с разнесением по времени (TP_PACING). Ошибки репортятся по каждому уровню.
         """
         pos_data = symbol_data[self.direction]
+        tp_levels = params.tp_levels
+        open_type = params.margin_mode
 
         # // round values
         spec = symbol_data.get("spec", {})
@@ -51,102 +109,105 @@ class TPControl:
         vol_unit = spec.get("vol_unit")
         contract_precision = spec.get("contract_precision")
 
-        leverage = pos_data.get("leverage")
-        total_contracts = pos_data.get("contracts")
+        leverage = pos_data.leverage
+        total_contracts = pos_data.contracts
 
         # cur_entry = await self.mx_client.get_fair_price(symbol)
-        while not pos_data.get("entry_price"):
+        while not pos_data.entry_price:
             await asyncio.sleep(0.15)
 
-        cur_entry = pos_data.get("entry_price")
+        cur_entry = pos_data.entry_price
 
         if not cur_entry:
             print(f"[ERROR][{debug_label}]: не удалось получить цену для выставления тейк-профитов. {log_time()}")
             return
-        
+
+        # === 1. План лестницы: (idx, contracts, price); пропущенные уровни -- в отчет шага 3 ===
+        ladder = []
+        skipped = {}
         remaining_contracts = total_contracts
-        for idx, (indent, volume) in enumerate(self.context.users_configs[self.chat_id]["config"]["fin_settings"]["tp_levels_gen"], start=1):
-            try:
-                success = False
-                reason = "N/A"
-                cur_time = int(time.time() * 1000)
-                # // set contracts:   
-                if idx < len(self.context.users_configs[self.chat_id]["config"]["fin_settings"]["tp_levels_gen"]):
-                    cur_contract = remaining_contracts * volume / 100
-                else:
-                    cur_contract = remaining_contracts
-
-                # округляем вниз
-                cur_contract = round(cur_contract / vol_unit) * vol_unit
-                cur_contract = round(cur_contract, contract_precision)
-
-                if cur_contract <= 0:
-                    reason = f"Недостаточно контрактов для выставления лимитного ордера. {log_time()}"
-                    print(reason)
-                    continue
-
-                remaining_contracts -= cur_contract
-
-                # // set target price:
-                target_price = cur_entry * (1 + (sign * indent / 100))
-                target_price = to_human_digit(round(target_price, price_precision))
-
-                # // set tp limit order:
-                order_data = await self.mx_client.make_order(                  
+        for idx, (indent, volume) in enumerate(tp_levels, start=1):
+            # // set contracts:
+            if idx < len(tp_levels):
+                cur_contract = remaining_contracts * volume / 100
+            else:
+                cur_contract = remaining_contracts
+
+            # округляем вниз
+            cur_contract = round(cur_contract / vol_unit) * vol_unit
+            cur_contract = round(cur_contract, contract_precision)
+
+            if cur_contract <= 0:
+                skipped[idx] = {
+                    "idx": idx, "price": None, "success": False, "order_id": None,
+                    "reason": f"Недостаточно контрактов для выставления лимитного ордера. {log_time()}",
+                    "ts": int(time.time() * 1000),
+                }
+                continue
+
+            remaining_contracts -= cur_contract
+
+            # // set target price:
+            target_price = cur_entry * (1 + (sign * indent / 100))
+            target_price = to_human_digit(round(target_price, price_precision))
+            ladder.append((idx, cur_contract, target_price))
+
+        # === 2. Параллельная установка ===
+        # задержка -- по номеру уровня: пропущенные уровни не сдвигают паузы остальных
+        delays = [params.tp_delays[idx - 1] for idx, _, _ in ladder]
+        semaphore = asyncio.Semaphore(max(1, TP_MAX_CONCURRENCY))
+        results = await asyncio.gather(
+            *(
+                self.place_tp_level(
                     symbol=symbol,
-                    contract=cur_contract,
-                    side="SELL",           # -- всегда для закрытия
-                    position_side=self.direction,
+                    idx=idx,
+                    contract=contract,
+                    target_price=target_price,
                     leverage=leverage,
-                    open_type=self.context.users_configs[self.chat_id]["config"]["fin_settings"].get("margin_mode", 2),
-                    debug_price=target_price,
-                    price=target_price,
-                    stopLossPrice=None,
-                    takeProfitPrice=None,
-                    market_type="LIMIT",        
-                    debug=False   # флаг дебага
+                    open_type=open_type,
+                    delay=delay,
+                    semaphore=semaphore,
+                    debug_label=debug_label
                 )
-                
-                # // validation and report:
-                valid_resp = OrderValidator.validate_and_log(order_data, debug_label)
-                order_id = None
-                if isinstance(valid_resp, dict):
-                    success = valid_resp.get("success", False)
-                    cur_time = valid_resp.get("ts", int(time.time() * 1000))
-                    order_id = valid_resp.get("order_id")
-                    reason = valid_resp.get("reason", "N/A")
-
-                # async with self.context.bloc_async:
-                if success: 
-                    pos_data["set_ids"].add(order_id)
-                    store_data = pos_data["order_stream_data"]   
-                    store_data.setdefault(order_id, {})     
-                    store_data[order_id].update({
-                        "idx": idx,
-                        "price": target_price,
-                    })
-                    pos_data["tp_prices"].append(target_price)
-                    # if debug: 
-                    #     print(f"[{symbol}] TP лимитка #{idx} установлена. orderId={order_id}, price={target_price}")
-
-            finally:
-                if not success:
-                    self.preform_message(
-                        chat_id=self.chat_id,
-                        marker=f"tp_order_failed",
-                        body={"symbol": symbol, "reason": reason, "cur_time": cur_time},
-                        is_print=True
-                    )
-                # === Pause ===
-                sleep_pause = sleep_generator(tp_len=len(self.context.users_configs[self.chat_id]["config"]["fin_settings"]["tp_levels_gen"]))[idx-1]
-                # print(f"#{idx}: sleep {sleep_pause:.2f} сек")
-                await asyncio.sleep(sleep_pause)
+                for (idx, contract, target_price), delay in zip(ladder, delays)
+            ),
+            return_exceptions=True
+        )
+
+        # === 3. Фиксация результата в порядке уровней (вместе с пропущенными) ===
+        outcomes = dict(skipped)
+        for (idx, _, target_price), result in zip(ladder, results):
+            if not isinstance(result, dict):
+                result = {
+                    "idx": idx, "price": target_price, "success": False, "order_id": None,
+                    "reason": str(result) if result else "N/A", "ts": int(time.time() * 1000),
+                }
+            outcomes[idx] = result
+
+        for idx in sorted(outcomes):
+            result = outcomes[idx]
+            if result["success"]:
+                order_id, target_price = result["order_id"], result["price"]
+                pos_data.orders.placed(order_id, idx, target_price)
+                pos_data.tp_prices.append(target_price)
+                # if debug:
+                #     print(f"[{symbol}] TP лимитка #{idx} установлена. orderId={order_id}, price={target_price}")
+            else:
+                self.preform_message(
+                    chat_id=self.chat_id,
+                    marker=f"tp_order_failed",
+                    body={"symbol": symbol, "reason": f"TP{idx}: {result['reason']}", "cur_time": result["ts"]},
+                    is_print=True
+                )
+
+        self.context.mark_dirty(symbol)
+        self.context.tracer.finish(symbol, "tp_armed" if ladder else None)
 
     async def execute_sl_template(
             self,
             order_params: Dict,
             symbol: str,
-            pos_data: Dict,
+            pos_data: PositionState,
             sl_price: float,
             debug_label: str,
             debug: bool = True
@@ -167,7 +228,8 @@ class TPControl:
             cur_time = valid_resp.get("ts", int(time.time() * 1000))
             order_id = valid_resp.get("order_id")
             reason = valid_resp.get("reason", "N/A")
-            pos_data["sl_id"] = (order_id, sl_price)
+            pos_data.sl_id = (order_id, sl_price)
+            self.context.mark_dirty(symbol)
             if debug: print(f"new sl_id: {order_id}")
             
         else:
@@ -182,63 +244,38 @@ class TPControl:
                 body={"symbol": symbol, "reason": reason, "cur_time": cur_time},
                 is_print=True
             )
-        progress = pos_data["progress"]
+        progress = pos_data.progress
         if progress is not None and progress > 0:
             self.preform_message(
                 chat_id=self.chat_id,
                 marker="progress",
                 body={
                     "symbol": symbol,
-                    "progress": pos_data["progress"],
-                    "cur_sl": pos_data["sl_id"][1] if pos_data["sl_id"] else "N/A",
+                    "progress": pos_data.progress,
+                    "cur_sl": pos_data.sl_id[1] if pos_data.sl_id else "N/A",
                     "cur_time": cur_time,
                 },
                 is_print=True
             )
         # if debug: print(f"[DEBUG][sl_control]: {self.context.position_vars}")
 
-    def find_current_progress(self, pos_data: dict) -> tuple[str, int, float] | None:
+    def find_current_progress(self, pos_data: PositionState) -> tuple[str, int, float] | None:
         """
-        Находит первый ордер для указанного символа, который уже частично или полностью исполнен.
-        Игнорирует отменённые и недействительные ордера.
-        Для LONG возвращает ордер с максимальной ценой, для SHORT — с минимальной.
+        Самый дальний исполненный TP-ордер позиции (книга pos_data.orders): для LONG -- с максимальной ценой,
+        для SHORT -- с минимальной. Активные и отмененные ордера не учитываются.
         Возвращает (order_id, idx, price) или None, если подходящих ордеров нет.
         """
-        orders = pos_data.get("order_stream_data", {})
-        if not orders:
-            # print("find_current_progress: no order_stream_data")
-            return None
-
-        valid_orders = {
-            oid: data
-            for oid, data in orders.items()
-            if data.get("state") is not None and int(data["state"]) not in {2, 4} 
-            and "price" in data and data["price"] is not None
-        }
-
-        if not valid_orders:
+        order = pos_data.orders.filled_front(self.direction)
+        if order is None:
             return None
-
-        # безопасное приведение цены к float
-        if self.direction == "LONG":
-            current_progress = max(
-                valid_orders.items(),
-                key=lambda x: float(x[1]["price"])
-            )
-        else:
-            current_progress = min(
-                valid_orders.items(),
-                key=lambda x: float(x[1]["price"])
-            )
-
-        order_id, data = current_progress
-        return order_id, data.get("idx"), data.get("price")
+        return order.order_id, order.idx, order.price
 
     async def sl_control(
         self,
         symbol: str,
         symbol_data: dict,
         sign: int,
+        params: TradingParams,
         debug_label: str,
         debug: bool = True
     ) -> Optional[bool]:
@@ -246,13 +283,13 @@ class TPControl:
         Подготавливает данные для ордеров (tp/sl) и вызывает их исполнение.
         Возвращает True, если ордера были выставлены, иначе False.
         """
-        pos_data = symbol_data[self.direction]   
-        old_progress = pos_data["progress"]
+        pos_data: PositionState = symbol_data[self.direction]
+        old_progress = pos_data.progress
 
         # --- Проверка: первый SL уже прошёл успешно? ---
-        first_sl = not pos_data.get("sl_initiated", False)
+        first_sl = not pos_data.sl_initiated
 
-        entry_price = pos_data.get("entry_price", 0.0)
+        entry_price = pos_data.entry_price
         if not entry_price:
             if debug:
                 print(f"[{debug_label}] entry_price отсутствует → мониторинг пропущен")
@@ -267,18 +304,18 @@ class TPControl:
             order_id, current_progress, price = progress_data
             is_move_sl = old_progress != current_progress
             # async with self.context.bloc_async:
-            if is_move_sl: pos_data["progress"] = current_progress
+            if is_move_sl: pos_data.progress = current_progress
             # print(f"current_progress: {current_progress}")
 
-            if pos_data["progress"] >= len(self.context.users_configs[self.chat_id]["config"]["fin_settings"]["tp_levels_gen"]):
-                pos_data["force_reset_flag"] = True
+            if pos_data.progress >= len(params.tp_levels):
+                pos_data.force_reset_flag = True
                 print(f"[{debug_label}] все тейк-профит лимитки исполнены. {log_time()}")
                 return True
 
         if not (is_move_sl or first_sl):
             return None
 
-        if pos_data["progress"] > 0:
+        if pos_data.progress > 0:
             # async with self.context.bloc_async:
             await self.mx_client.cancel_order_template(
                 symbol=symbol,
@@ -288,11 +325,11 @@ class TPControl:
 
         price_precision = symbol_data.get("spec", {}).get("price_precision")
         sl_price = calc_next_sl(
-            entry_price = pos_data.get("entry_price"),
-            progress=pos_data.get("progress"),
-            base_sl=self.context.users_configs[self.chat_id]["config"]["fin_settings"].get("sl"),
-            sl_type=self.context.users_configs[self.chat_id]["config"]["fin_settings"].get("sl_type"),
-            tp_prices=pos_data.get("tp_prices"),
+            entry_price = pos_data.entry_price,
+            progress=pos_data.progress,
+            base_sl=params.sl,
+            sl_type=params.sl_type,
+            tp_prices=pos_data.tp_prices,
             sign=sign,
             price_precision=price_precision
         )
@@ -301,11 +338,11 @@ class TPControl:
             move_sl_task = {
                 "symbol": symbol,
                 "position_side": self.direction,
-                "leverage": pos_data.get("leverage"),
-                "open_type": self.context.users_configs[self.chat_id]["config"]["fin_settings"].get("margin_mode", 2),
+                "leverage": pos_data.leverage,
+                "open_type": params.margin_mode,
                 "close_order_type": "sl",
                 "order_type": 1,
-                "contract": pos_data.get("contracts"),
+                "contract": pos_data.contracts,
                 "price": sl_price,
             }
             await self.execute_sl_template(
@@ -318,7 +355,7 @@ class TPControl:
             )
 
             # ✅ отметка, что первый TP реально поставлен
-            if first_sl: pos_data["sl_initiated"] = True   
+            if first_sl: pos_data.sl_initiated = True   
         
         return False
                     
@@ -327,34 +364,37 @@ class TPControl:
         symbol: str,
         symbol_data: dict,
         sign: int, 
+        params: TradingParams,
         debug_label: str
     ):
-        pos_data = symbol_data.get(self.direction, {})
-        if not pos_data.get("in_position"):
+        pos_data: Optional[PositionState] = symbol_data.get(self.direction)
+        if pos_data is None or not pos_data.in_position:
             return False
         
-        if pos_data["preexisting"]:
-            pos_data["tp_initiated"] = True
-            pos_data["sl_initiated"] = True
+        if pos_data.preexisting:
+            pos_data.tp_initiated = True
+            pos_data.sl_initiated = True
 
-        if pos_data["tp_initiated"] and pos_data["sl_initiated"] and not pos_data.get("in_position"):
+        if pos_data.tp_initiated and pos_data.sl_initiated and not pos_data.in_position:
             return True
 
-        if not pos_data.get("tp_initiated", False):
+        if not pos_data.tp_initiated:
             await self.tp_factory(
                 symbol=symbol,
                 symbol_data=symbol_data,
                 sign=sign,
+                params=params,
                 debug_label=debug_label,
                 debug=True
             )            
-            pos_data["tp_initiated"] = True
+            pos_data.tp_initiated = True
 
-        if self.context.users_configs[self.chat_id]["config"]["fin_settings"].get("sl") is not None:
+        if params.sl is not None:
             return await self.sl_control(
                 symbol=symbol,                
                 symbol_data=symbol_data,
                 sign=sign,
+                params=params,
                 debug_label=debug_label,
                 debug=True
             )
@@ -362,14 +402,23 @@ class TPControl:
         return False
 
     async def tp_control_flow(self, symbol: str, symbol_data: Dict,
-                              sign: int, debug_label: str) -> None:
-
+                              sign: int, debug_label: str, params: TradingParams) -> None:
+        """
+        TP/SL контроль символа. Просыпается по событию (стрим ордеров / синхронизация позиций),
+        tp_control_timeout -- только страховочный таймаут. params -- снимок настроек сигнала.
+        """
+        wakeup = self.context.symbol_event(symbol)
         while not self.context.stop_bot and not self.context.stop_bot_iteration:
-            await asyncio.sleep(self.tp_control_frequency)
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=self.tp_control_timeout)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
             if await self.tp_orchestrator(
                 symbol=symbol,
                 symbol_data=symbol_data,
                 sign=sign,
+                params=params,
                 debug_label=debug_label
             ):  
                 print(f"[DEBUG]:задача tp_control_flow завершена. {log_time()}")
@@ -27,20 +27,62 @@ CAP_DEP: dict = {
 TIME_ZONE: str = "UTC"
 SLIPPAGE_PCT: float = 0.05 # % -------------------- поправка для расчетов PnL
 SIGNAL_TIMEOUT: float = 10 # sec ------------------ время в течение которого сиглал актуален
+SIGNAL_DEDUP_TTL: float = 3600 # sec -------------- сколько помним message_id принятых сигналов (не меньше SIGNAL_TIMEOUT)
+SIGNAL_DEDUP_MAX: int = 10_000 # ----------------- потолок размера кэша дедупликации сигналов
 PRECISION: int = 28 # ------------------------------точность расчетов decimal (нужно для особо малых чисел)
+INSTRUMENTS_MIN_INTERVAL: float = 30.0 # sec ------- интервал обновления каталога контрактов после изменений
+INSTRUMENTS_MAX_INTERVAL: float = 600.0 # sec ------ потолок интервала, пока каталог не меняется
+INSTRUMENTS_SNAPSHOT_FILE: str = "instruments_snapshot.json" # снапшот каталога для быстрого старта
+LOG_FILE: Optional[str] = None # ------------------ None -- stdout; иначе путь файла (дозапись JSON-lines)
+LOG_JSON: bool = True # --------------------------- True -- одна JSON-запись на строку; False -- прежний текстовый вид
+LOG_QUEUE_MAX: int = 10_000 # -------------------- потолок очереди логгера; сверх него записи отбрасываются (со счетчиком)
+LOG_REPR_MAX: int = 200 # ------------------------- потолок длины repr аргументов в логе исключений
 
 # --- SYSTEM ---
 TG_UPDATE_FREQUENCY: float = 1.0 # sec
-POSITIONS_UPDATE_FREQUENCY: float = 1.0 # sec
+POSITIONS_UPDATE_FREQUENCY: float = 1.0 # sec ---- REST-поллинг позиций, пока ws-стрим позиций недоступен
+POSITIONS_RECONCILE_FREQUENCY: float = 15.0 # sec - REST-сверка позиций при живом ws-стриме
 MAIN_CYCLE_FREQUENCY: float = 1.0 # sec
-TP_CONTROL_FREQUENCY: float = 0.25 # sec
+TP_CONTROL_TIMEOUT: float = 5.0 # sec ------------- TP/SL контроль будят события ордеров/позиций; это страховочный таймаут
+SHARD_WORKERS: int = 0 # -------------------------- процессов-шардов для аккаунтов (0 -- все аккаунты в основном процессе)
+SHARD_START_TIMEOUT: float = 60.0 # sec ----------- сколько ждем готовности процессов-шардов
 SIGNAL_PROCESSING_LIMIT: int = 5 # ----------------- ограничивает количество одновременной обработки сигналов
+MEXC_REST_URL: Optional[str] = None # ------------- None -- боевой futures.mexc.com; для симулятора: "http://127.0.0.1:8765/api/v1"
+MEXC_WS_URL: str = "wss://contract.mexc.com/edge" # для симулятора: "ws://127.0.0.1:8765/edge"
 PING_URL = "https://contract.mexc.com/api/v1/contract/ping"
 PING_INTERVAL = 10  # сек # -- ping сессии. Дергаем для контроля и оживления
-USE_CACHE = False  # для деплоя лучше False
+HTTP_POOL_SIZE: int = 20 # ------------------------ размер пула соединений MexcFuturesAPI
+HTTP_WARMUP_CONNECTIONS: int = 4 # ---------------- сколько соединений держим прогретыми (ping при старте и каждые PING_INTERVAL)
+HTTP_KEEPALIVE_TIMEOUT: float = 60.0 # sec -------- сколько держим простаивающее соединение
+HTTP_DNS_CACHE_TTL: int = 300 # sec --------------- кэш DNS для futures.mexc.com
+RATE_LIMIT_ENDPOINT_RPS: float = 10.0 # ----------- лимит запросов в сек на один эндпоинт (token bucket)
+RATE_LIMIT_ENDPOINT_BURST: int = 20 # ------------- емкость bucket эндпоинта
+RATE_LIMIT_ACCOUNT_RPS: float = 20.0 # ------------ общий лимит запросов в сек на аккаунт
+RATE_LIMIT_ACCOUNT_BURST: int = 40 # -------------- емкость общего bucket
+RATE_LIMIT_RESERVE: float = 0.3 # ----------------- доля общего bucket, которую фоновые запросы не трогают (запас под ордера)
+RATE_LIMIT_PENALTY: float = 2.0 # sec ------------- пауза эндпоинта после ответа биржи 429/510
+USE_CACHE = False  # журнал позиций pos_journal_{chat_id}.jsonl (восстановление TP/SL после рестарта)
+JOURNAL_FLUSH_INTERVAL: float = 0.2 # sec ------- как часто изменившиеся позиции уходят в журнал
+JOURNAL_SCAN_INTERVAL: float = 5.0 # sec -------- страховочный проход по всем позициям (изменения мимо wake-точек)
+JOURNAL_FSYNC_INTERVAL: float = 0.5 # sec ------- fsync журнала пачкой, не чаще
+JOURNAL_COMPACT_BYTES: int = 1_000_000 # -------- размер журнала, после которого он сжимается в снапшот
+REHYDRATE_HISTORY_WINDOW: float = 72 * 3600 # sec - глубина истории исполненных ордеров, если биржа не отдала createTime позиции
+REHYDRATE_MAX_PAGES: int = 20 # ------------------- потолок страниц (по 100) ордеров символа при восстановлении; глубже -- история неполная
+REHYDRATE_PRICE_TOLERANCE: float = 0.001 # ------ допуск (доля цены) сопоставления ордера биржи с уровнем TP-лестницы
+PNL_PAGE_SIZE: int = 50 # ------------------------ страница history_positions при первом (глубоком) проходе истории
+PNL_INCREMENTAL_PAGE_SIZE: int = 10 # ------------ страница history_positions, когда история уже в кэше
+PNL_PAGE_FANOUT: int = 3 # ----------------------- сколько следующих страниц запрашиваем параллельно при глубоком проходе
+PNL_MAX_PAGES: int = 20 # ------------------------ потолок глубины листания истории
+PNL_CACHE_MAX: int = 1000 # ---------------------- закрытых позиций в кэше на (символ, сторону)
+USE_PRICE_STREAM: bool = True # ------------------ цена для расчета контрактов из ws-кэша тикеров (без REST fair_price)
+PRICE_CACHE_TTL: float = 5.0 # sec --------------- старше -- считаем цену протухшей и идем в REST
 
 # /
-# ----- параметры сонной паузы между установкой лимитных ордеров ------------
+# ----- установка лестницы TP ------------
+TP_MAX_CONCURRENCY: int = 5  # сколько TP-лимиток в полете одновременно
+TP_PACING: bool = False      # True -- разносить уровни по времени паузами ниже (старое поведение), False -- все сразу
+
+# ----- параметры сонной паузы между установкой лимитных ордеров (TP_PACING) ------------
 BASE_PAUSE = 1.0           # стартовая пауза
 NOISE = 0.5                # рандомная добавка от 0 до NOISE
 INCREMENT = 0.5            # прибавка каждые 2 ордера
@@ -1,46 +1,29 @@
-from typing import List, Optional, Callable
+from typing import Optional
 from b_context import BotContext
+from b_position import PositionState
 from c_log import ErrorHandler
+from API.MX.instruments import InstrumentRegistry
 
 
 class PositionVarsSetup:
-    def __init__(self, context: BotContext, info_handler: ErrorHandler, parse_precision: Callable):   
+    # горячие методы без обертки total_exception_decor (исключения -- у обернутого вызывающего)
+    _hot_path = ("pos_vars_root_template",)
+
+    def __init__(self, context: BotContext, info_handler: ErrorHandler):   
         self.context = context
         info_handler.wrap_foreign_methods(self)
         self.info_handler = info_handler
-        self.parse_precision = parse_precision
     
     @staticmethod
-    def pos_vars_root_template():
-        """Базовый шаблон переменных позиции"""
-        return {  
-            "margin_size": None,
-            "leverage": None,
-            "nominal_vol": None, 
-            "entry_price": None,  
-            "hold_price": None,   
-            "contracts": None,
-            "vol_assets": None,
-            "preexisting": False,
-            "pending_open": False,
-            "in_position": False, 
-            "tp_initiated": False,
-            "tp_prices": [],
-            "progress": 0,
-            "sl_initiated": False,
-            "sl_id": None,            
-            "c_time": None,
-            "force_reset_flag": False,
-            "set_ids": set(),
-            "order_stream_data": {},
-            "pending": False
-        }
+    def pos_vars_root_template() -> PositionState:
+        """Базовое состояние позиции"""
+        return PositionState()
             
     def set_pos_defaults(
             self,
             symbol: str,
             pos_side: str,
-            instruments_data: List = None,
+            instruments_data: InstrumentRegistry = None,
             reset_flag: bool = False
         ):
         """Безопасная инициализация структуры данных контроля позиций."""
@@ -49,12 +32,9 @@ class PositionVarsSetup:
         if symbol not in self.context.position_vars:
             self.context.position_vars[symbol] = {}
         specs = None
-        if instruments_data and "spec" not in self.context.position_vars[symbol]:
+        if instruments_data is not None and "spec" not in self.context.position_vars[symbol]:
             try:
-                specs: Optional[dict] = self.parse_precision(
-                    symbols_info=instruments_data,
-                    symbol=symbol
-                )
+                specs: Optional[dict] = instruments_data.get_spec(symbol)
                 if not specs or not all(v is not None for v in specs.values()):                    
                     print(f"Нет нужных инструментов для монеты {symbol}. Возможно токен недоступен для торговли.")
                     return False
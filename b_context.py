@@ -1,13 +1,17 @@
 import asyncio
 import aiohttp
 from typing import *
+from c_trace import LatencyTracer, AccountTracer
+from c_dedup import DedupCache
+from a_config import SIGNAL_DEDUP_TTL, SIGNAL_DEDUP_MAX
 
 class BotContext:
     def __init__(self):
         """ Инициализируем глобальные структуры"""
         # //
-        self.message_cache: list = []  # основной кеш сообщений
-        self.tg_timing_cache: set = set()
+        self.message_cache: list = []  # последние принятые сигналы (Signal)
+        self.signal_queue: asyncio.Queue = asyncio.Queue()  # push-канал Signal из tg-хендлера в Core
+        self.tg_timing_cache = DedupCache(SIGNAL_DEDUP_TTL, SIGNAL_DEDUP_MAX)  # message_id сигналов, принятых Core
         self.stop_bot: bool = False
         self.start_bot_iteration = False 
         self.stop_bot_iteration = False
@@ -17,10 +21,102 @@ class BotContext:
         self.instruments_data: dict = None
         self.position_vars: dict = {}
         self.order_stream_data: dict = {}
+        self.price_cache: Dict[str, tuple] = {}  # symbol -> (price, monotonic ts), наполняет MxTickerWS
         self.users_configs: Dict = {} # --
         self.queues_msg: Dict = {}
         self.session: Optional[aiohttp.ClientSession] = None
         self.position_updated_event = asyncio.Event()
         self.orders_updated_event = asyncio.Event()
         self.bloc_async = asyncio.Lock()
-        self.signal_locks: dict = {}
\ No newline at end of file
+        self.signal_locks: Dict[str, asyncio.Lock] = {}  # symbol -> замок handle_signal (по числу инструментов, не сигналов)
+        self.symbol_events: Dict[str, asyncio.Event] = {}  # symbol -> пробуждение TP/SL контроля
+        self.dirty_symbols: Set[str] = set()  # символы с изменившимся состоянием позиций (c_journal.PositionJournal)
+        self.tracer = LatencyTracer()  # латентность сигнал -> TP-лестница (/metrics)
+        self.accounts: Dict[int, "AccountContext"] = {}  # chat_id -> контекст аккаунта (c_account.AccountRuntime)
+        self.remote_open_positions: Dict[int, bool] = {}  # shard_id -> есть открытые позиции (c_shard.ShardPool)
+
+    def symbol_event(self, symbol: str) -> asyncio.Event:
+        """Событие символа, которого ждет TP/SL контроль."""
+        event = self.symbol_events.get(symbol)
+        if event is None:
+            event = self.symbol_events[symbol] = asyncio.Event()
+        return event
+
+    def signal_lock(self, symbol: str) -> asyncio.Lock:
+        """Замок обработки сигнала по символу: повторный сигнал того же символа ждет первый."""
+        lock = self.signal_locks.get(symbol)
+        if lock is None:
+            lock = self.signal_locks[symbol] = asyncio.Lock()
+        return lock
+
+    def account(self, chat_id: int) -> "AccountContext":
+        """Контекст аккаунта chat_id (создается при первом обращении)."""
+        account = self.accounts.get(chat_id)
+        if account is None:
+            account = self.accounts[chat_id] = AccountContext(self, chat_id)
+        return account
+
+    def has_open_positions(self) -> bool:
+        """Есть ли открытые позиции хотя бы на одном аккаунте (включая аккаунты процессов-шардов)."""
+        return any(self.remote_open_positions.values()) or any(
+            pos.in_position
+            for account in self.accounts.values()
+            for symbol_data in account.position_vars.values()
+            for side, pos in symbol_data.items()
+            if side != "spec"
+        )
+
+    def wake_symbol(self, symbol: str):
+        """
+        Будит TP/SL контроль символа (смена состояния ордеров/позиции).
+        Событие создается и взводится, даже если контроль еще не стартовал: fill может прийти раньше задачи.
+        """
+        self.dirty_symbols.add(symbol)
+        self.symbol_event(symbol).set()
+
+    def mark_dirty(self, symbol: str):
+        """Состояние позиций символа изменилось (в журнал), TP/SL контроль не будим."""
+        self.dirty_symbols.add(symbol)
+
+class AccountContext:
+    """
+    Контекст одного торгового аккаунта. Свое -- состояние позиций, http-сессия, события ордеров/позиций
+    и замки сигналов (ACCOUNT_FIELDS); все остальное (флаги старт/стоп, конфиги, кэш цен, трейсер)
+    читается и пишется в общий BotContext. Компоненты аккаунта получают его вместо BotContext как есть.
+    """
+
+    ACCOUNT_FIELDS = frozenset({
+        "chat_id", "root", "pos_loaded_cache", "position_vars", "order_stream_data", "session",
+        "position_updated_event", "orders_updated_event", "bloc_async", "signal_locks", "symbol_events",
+        "dirty_symbols", "tracer",
+    })
+
+    def __init__(self, root: BotContext, chat_id: int):
+        self.root = root
+        self.chat_id = chat_id
+        self.pos_loaded_cache = None
+        self.position_vars: dict = {}
+        self.order_stream_data: dict = {}
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.position_updated_event = asyncio.Event()
+        self.orders_updated_event = asyncio.Event()
+        self.bloc_async = asyncio.Lock()
+        self.signal_locks: Dict[str, asyncio.Lock] = {}
+        self.symbol_events: Dict[str, asyncio.Event] = {}
+        self.dirty_symbols: Set[str] = set()
+        self.tracer = AccountTracer(root.tracer, chat_id)  # трейсы сигнала этого аккаунта: (chat_id, symbol)
+
+    def __getattr__(self, name: str):
+        # сюда попадаем только за общими полями (свои лежат в __dict__)
+        return getattr(self.__dict__["root"], name)
+
+    def __setattr__(self, name: str, value):
+        if name in self.ACCOUNT_FIELDS:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.root, name, value)
+
+    symbol_event = BotContext.symbol_event
+    signal_lock = BotContext.signal_lock
+    wake_symbol = BotContext.wake_symbol
+    mark_dirty = BotContext.mark_dirty
@@ -1,5 +1,6 @@
 import asyncio
 import aiohttp
+from typing import Awaitable, Callable, List
 from a_config import PING_URL, PING_INTERVAL
 from b_context import BotContext
 from c_log import ErrorHandler
@@ -12,6 +13,11 @@ class NetworkManager:
         self.info_handler = info_handler
         self._ping_task: asyncio.Task | None = None
         self.proxy_url = proxy_url
+        self._warmup_hooks: List[Callable[[], Awaitable]] = []
+
+    def add_warmup_hook(self, hook: Callable[[], Awaitable]):
+        """Корутина, которую пинг-цикл дергает каждые PING_INTERVAL (поддержка прогретых пулов)."""
+        self._warmup_hooks.append(hook)
 
     async def initialize_session(self):
         if not self.context.session or self.context.session.closed:
@@ -51,6 +57,11 @@ class NetworkManager:
                 except Exception as e:
                     self.info_handler.debug_error_notes(f"Ошибка при закрытии сессии: {e}")
                 await self.initialize_session()
+            for hook in self._warmup_hooks:
+                try:
+                    await hook()
+                except Exception as e:
+                    self.info_handler.debug_error_notes(f"Ошибка прогрева соединений: {e}")
             await asyncio.sleep(PING_INTERVAL)
 
     def start_ping_loop(self):
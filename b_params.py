@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from typing import *
+from a_config import TP_PACING
+from c_utils import tp_levels_generator, tp_pacing_delays
+
+
+@dataclass(frozen=True, slots=True)
+class TradingParams:
+    """
+    Неизменяемый снимок fin_settings пользователя на момент сигнала.
+    Строится один раз на сигнал и едет в entry/TP/SL (и в PositionState.params);
+    правка настроек в Telegram дает новую версию и не трогает живые сделки.
+    """
+    version: int
+    margin_size: float
+    margin_mode: int
+    leverage: int
+    sl: Optional[float]
+    sl_type: Optional[int]
+    tp_order_volume: Optional[float]
+    tp_levels: Tuple[Tuple[float, float], ...]  # (отступ %, объем %) -- лестница под капу сигнала
+    tp_delays: Tuple[float, ...]                # задержки старта уровней (TP_PACING), посчитаны заранее
+
+
+def build_trading_params(
+    user_cfg: dict,
+    cap: Optional[float] = None,
+    tp_levels: Optional[Sequence[Tuple[float, float]]] = None
+) -> TradingParams:
+    """
+    Снимок настроек пользователя. cap задан -- лестница TP под капу (tp_levels_generator);
+    tp_levels задан -- готовая лестница (восстановленная по ордерам биржи после рестарта);
+    иначе лестницы нет (позиция открыта не по сигналу).
+    """
+    fin = user_cfg["config"]["fin_settings"]
+    if cap is not None:
+        tp_levels = tp_levels_generator(cap=cap, tp_order_volume=fin.get("tp_order_volume"), tp_cap_dep=fin["tp_levels"])
+    tp_levels = tuple(tuple(level) for level in tp_levels or () if level)
+
+    return TradingParams(
+        version=user_cfg.get("_fin_version", 0),
+        margin_size=fin.get("margin_size"),
+        margin_mode=fin.get("margin_mode", 2),
+        leverage=fin.get("leverage"),
+        sl=fin.get("sl"),
+        sl_type=fin.get("sl_type"),
+        tp_order_volume=fin.get("tp_order_volume"),
+        tp_levels=tp_levels,
+        tp_delays=tuple(tp_pacing_delays(len(tp_levels))) if TP_PACING else (0.0,) * len(tp_levels),
+    )
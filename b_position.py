@@ -0,0 +1,98 @@
+import time
+from dataclasses import dataclass, field
+from typing import *
+
+if TYPE_CHECKING:
+    from b_params import TradingParams
+
+
+# состояния ордера MEXC: 1 -- не информирован, 2 -- активен, 3 -- исполнен, 4 -- отменен, 5 -- недействителен
+ORDER_STATE_ACTIVE = 2
+ORDER_STATE_CANCELED = 4
+
+
+@dataclass(slots=True)
+class MyOrder:
+    """Мой лимитный ордер позиции: уровень TP и цена -- от TPControl, state -- из ws (push.personal.order)."""
+    order_id: str
+    idx: Optional[int] = None
+    price: Optional[float] = None
+    state: Optional[int] = None
+    updated: float = 0.0  # time.monotonic() последнего изменения
+
+
+@dataclass(slots=True)
+class MyOrders:
+    """
+    Книга моих ордеров по позиции (бывшие set_ids + order_stream_data).
+    Пишут двое: TPControl (placed) и MxFuturesOrderWS (on_state) -- оба только через методы книги.
+    """
+    orders: Dict[str, MyOrder] = field(default_factory=dict)
+
+    def _get(self, order_id: str) -> MyOrder:
+        order = self.orders.get(order_id)
+        if order is None:
+            order = self.orders[order_id] = MyOrder(order_id)
+        return order
+
+    def placed(self, order_id: str, idx: int, price: float) -> None:
+        """
+        Ордер выставлен (ответ REST). ws-пуш state мог прийти раньше -- запись уже может быть.
+        price приводится к float: TPControl отдает строку to_human_digit, а filled_front сравнивает цены.
+        """
+        order = self._get(order_id)
+        order.idx = idx
+        order.price = float(price) if price is not None else None
+        order.updated = time.monotonic()
+
+    def on_state(self, order_id: str, state: Optional[int]) -> None:
+        """Пуш состояния ордера из ws."""
+        order = self._get(order_id)
+        order.state = state
+        order.updated = time.monotonic()
+
+    def filled_front(self, direction: str) -> Optional[MyOrder]:
+        """
+        Самый дальний исполненный (не активный и не отмененный) ордер с известной ценой:
+        для LONG -- с максимальной ценой, для SHORT -- с минимальной.
+        """
+        front = None
+        for order in self.orders.values():
+            if order.state is None or order.price is None or int(order.state) in (ORDER_STATE_ACTIVE, ORDER_STATE_CANCELED):
+                continue
+            if front is None or (order.price > front.price if direction == "LONG" else order.price < front.price):
+                front = order
+        return front
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self.orders
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+
+@dataclass(slots=True)
+class PositionState:
+    """Состояние позиции по одной стороне символа (бывший dict из PositionVarsSetup.pos_vars_root_template)."""
+    margin_size: Optional[float] = None
+    leverage: Optional[int] = None
+    nominal_vol: Optional[float] = None
+    entry_price: Optional[float] = None
+    hold_price: Optional[float] = None
+    contracts: Optional[float] = None
+    vol_assets: Optional[float] = None
+    preexisting: bool = False
+    pending_open: bool = False
+    in_position: bool = False
+    tp_initiated: bool = False
+    tp_prices: List[float] = field(default_factory=list)
+    progress: int = 0
+    sl_initiated: bool = False
+    sl_id: Optional[Tuple[str, float]] = None  # (order_id, sl_price)
+    c_time: Optional[int] = None
+    force_reset_flag: bool = False
+    orders: MyOrders = field(default_factory=MyOrders)
+    pending: bool = False
+    reset_in_progress: bool = False
+    last_pnl_ts: int = 0
+    params: Optional["TradingParams"] = None  # снимок настроек сигнала, по которому открыта позиция
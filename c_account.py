@@ -0,0 +1,439 @@
+import asyncio
+import time
+from typing import *
+from a_config import *
+from b_context import BotContext, AccountContext
+from b_constructor import PositionVarsSetup
+from b_network import NetworkManager
+from c_log import ErrorHandler
+from c_sync import Synchronizer
+from c_utils import Utils, safe_float, safe_int
+from c_rehydrate import rebuild_position, position_type
+from c_journal import PositionJournal
+from b_params import TradingParams, build_trading_params
+from API.MX.mx import MexcClient
+from API.MX.streams import MxFuturesOrderWS
+from API.MX.instruments import InstrumentRegistry, InstrumentsUpdater
+from API.TG.tg_parser import Signal
+from TRADING.entry import EntryControl
+from TRADING.exit import ExitControl
+from TRADING.tp import TPControl
+
+
+class AccountRuntime:
+    """
+    Исполнение одного аккаунта: свой connector (сессия), HTTP-пул MEXC, приватный ws ордеров/позиций,
+    состояние позиций (AccountContext) и торговые контролы. Core держит по рантайму на chat_id
+    и раздает им сигнал параллельно.
+    """
+
+    def __init__(
+        self,
+        context: AccountContext,
+        info_handler: ErrorHandler,
+        instruments: InstrumentRegistry,
+        preform_message: Callable,
+        direction: str,
+    ):
+        self.context = context
+        self.info_handler = info_handler
+        self.instruments = instruments
+        self.preform_message = preform_message
+        self.direction = direction
+        self.chat_id = context.chat_id
+
+        self.connector: Optional[NetworkManager] = None
+        self.mx_client: Optional[MexcClient] = None
+        self.order_stream: Optional[MxFuturesOrderWS] = None
+        self.utils: Optional[Utils] = None
+        self.pos_setup: Optional[PositionVarsSetup] = None
+        self.entry: Optional[EntryControl] = None
+        self.exit: Optional[ExitControl] = None
+        self.sync: Optional[Synchronizer] = None
+        self.tp_control: Optional[TPControl] = None
+        self.journal: Optional[PositionJournal] = None
+        self.positions_task: Optional[asyncio.Task] = None
+        self.tp_tasks: Dict[str, asyncio.Task] = {}
+
+        info_handler.wrap_foreign_methods(self)
+
+    @property
+    def started(self) -> bool:
+        """start() дошел до конца (методы обернуты ErrorHandler'ом, исключение наружу не выходит)."""
+        return self.tp_control is not None
+
+    async def start(self):
+        """Сессия, клиент, стрим и контролы аккаунта (бывший Core._start_user_context)."""
+        mexc_cfg = self.context.users_configs[self.chat_id].get("config", {}).get("MEXC", {})
+
+        proxy_url  = mexc_cfg.get("proxy_url")
+        api_key    = mexc_cfg.get("api_key")
+        api_secret = mexc_cfg.get("api_secret")
+        u_id       = mexc_cfg.get("u_id")
+
+        for key in ("api_key", "api_secret", "u_id", "proxy_url"):
+            if mexc_cfg.get(key) is None:
+                print(f"[WARNING] MEXC {key} not set for user {self.chat_id}")
+
+        # --- Connector (своя сессия аккаунта) ---
+        self.connector = NetworkManager(
+            context=self.context,
+            info_handler=self.info_handler,
+            proxy_url=proxy_url
+        )
+        self.connector.start_ping_loop()
+
+        # --- MEXC client ---
+        self.mx_client = MexcClient(
+            context=self.context,
+            connector=self.connector,
+            info_handler=self.info_handler,
+            api_key=api_key,
+            api_secret=api_secret,
+            token=u_id,
+            proxy_url=proxy_url,
+            base_url=MEXC_REST_URL,
+        )
+        # поднимаем TLS к futures.mexc.com заранее и держим пул теплым через пинг-цикл
+        warm = await self.mx_client.warm_up()
+        print(f"[DEBUG] HTTP pool warmed [{self.chat_id}]: {warm}/{HTTP_WARMUP_CONNECTIONS} connections")
+        self.connector.add_warmup_hook(self.mx_client.warm_up)
+
+        # --- Order stream ---
+        self.order_stream = MxFuturesOrderWS(
+            api_key=api_key,
+            api_secret=api_secret,
+            context=self.context,
+            info_handler=self.info_handler,
+            proxy_url=proxy_url,
+            ws_url=MEXC_WS_URL
+        )
+        asyncio.create_task(self.order_stream.start())
+
+        # --- Вспомогалки ---
+        self.utils = Utils(
+            context=self.context,
+            info_handler=self.info_handler,
+            preform_message=self.preform_message,
+            get_realized_pnl=self.mx_client.get_realized_pnl,
+            chat_id=self.chat_id
+        )
+        self.pos_setup = PositionVarsSetup(
+            context=self.context,
+            info_handler=self.info_handler
+        )
+
+        # --- Торговые контролы ---
+        self.entry = EntryControl(
+            context=self.context,
+            info_handler=self.info_handler,
+            mx_client=self.mx_client,
+            preform_message=self.preform_message,
+            utils=self.utils,
+            direction=self.direction,
+            chat_id=self.chat_id
+        )
+        self.exit = ExitControl(
+            context=self.context,
+            info_handler=self.info_handler,
+            mx_client=self.mx_client,
+            preform_message=self.preform_message,
+            direction=self.direction,
+            chat_id=self.chat_id
+        )
+        self.sync = Synchronizer(
+            context=self.context,
+            info_handler=self.info_handler,
+            set_pos_defaults=self.pos_setup.set_pos_defaults,
+            pnl_report=self.utils.pnl_report,
+            mx_client=self.mx_client,
+            preform_message=self.preform_message,
+            positions_update_frequency=POSITIONS_UPDATE_FREQUENCY,
+            reconcile_frequency=POSITIONS_RECONCILE_FREQUENCY,
+            exit=self.exit,
+            use_cache=USE_CACHE,
+            chat_id=self.chat_id
+        )
+        # позиции и fill'ы -- из приватного ws, REST остается медленной сверкой
+        self.sync.position_stream = self.order_stream
+        self.order_stream.position_handler = self.sync.on_position_push
+        self.order_stream.deal_handler = self.sync.on_deal_push
+
+        self.tp_control = TPControl(
+            context=self.context,
+            info_handler=self.info_handler,
+            mx_client=self.mx_client,
+            preform_message=self.preform_message,
+            utils=self.utils,
+            direction=self.direction,
+            tp_control_timeout=TP_CONTROL_TIMEOUT,
+            chat_id=self.chat_id
+        )
+
+    async def start_positions_flow(self):
+        restored = {}
+        if USE_CACHE and self.journal is None:
+            # восстановление из журнала -- до первого цикла синхронизации
+            self.journal = PositionJournal(
+                context=self.context,
+                info_handler=self.info_handler,
+                prefix=f"pos_journal_{self.chat_id}"
+            )
+            restored = await asyncio.to_thread(self.journal.load) or {}
+            self.journal.start()
+        if not await self.rehydrate(restored):
+            # биржа недоступна -- стартуем с состоянием журнала, Synchronizer сверит его позже
+            self.context.pos_loaded_cache = restored
+        if not self.positions_task or self.positions_task.done():
+            self.positions_task = asyncio.create_task(self.sync.positions_flow_manager())
+
+    async def rehydrate(self, restored: Dict[str, dict]) -> bool:
+        """
+        Теплый рестарт: открытые позиции, затем по каждой -- лимитки, триггер-ордера и исполненные ордера
+        ее символа с момента открытия (все страницы, символы параллельно); по ним восстанавливаются книга
+        ордеров, tp_prices, progress и sl_id (поверх состояния журнала), и сразу поднимается TP/SL контроль.
+        False -- биржа не ответила.
+        """
+        started = time.perf_counter()
+        positions = await self.mx_client.fetch_positions(strict=True)
+        if positions is None:
+            self.info_handler.debug_error_notes("[REHYDRATE] open positions unavailable [%s]", self.chat_id)
+            return False
+
+        pos_type = position_type(self.direction)
+        positions = [
+            position for position in positions
+            if position.get("symbol") and safe_int(position.get("positionType")) == pos_type and safe_float(position.get("holdVol"))
+        ]
+        history_from = int((time.time() - REHYDRATE_HISTORY_WINDOW) * 1000)
+        orders_by_symbol = await asyncio.gather(*(
+            asyncio.gather(
+                self.mx_client.fetch_open_orders(symbol=position["symbol"]),
+                self.mx_client.fetch_filled_orders(
+                    symbol=position["symbol"], start_time=safe_int(position.get("createTime")) or history_from
+                ),
+                self.mx_client.fetch_trigger_orders(symbol=position["symbol"]),
+            )
+            for position in positions
+        ))
+
+        user_cfg = self.context.users_configs[self.chat_id]
+        rehydrated, unmanaged = [], []
+        for position, (open_orders, filled_orders, trigger_orders) in zip(positions, orders_by_symbol):
+            symbol = position["symbol"]
+            symbol_data = restored.get(symbol)
+            if symbol_data:
+                self.context.position_vars[symbol] = symbol_data
+            if not self.pos_setup.set_pos_defaults(symbol, self.direction, self.instruments):
+                continue
+            symbol_data = self.context.position_vars[symbol]
+            pos_data = rebuild_position(
+                pos_data=symbol_data[self.direction],
+                position=position,
+                open_orders=open_orders or [],
+                filled_orders=filled_orders or [],
+                trigger_orders=trigger_orders,
+                user_cfg=user_cfg,
+                spec=symbol_data.get("spec", {}),
+                direction=self.direction,
+                known=symbol in restored,
+                complete=None not in (open_orders, filled_orders, trigger_orders),
+            )
+            if pos_data.preexisting:
+                unmanaged.append(symbol)
+            self._start_tp_control(symbol, f"{symbol}_{self.direction}", pos_data.params)
+            self.context.wake_symbol(symbol)
+            rehydrated.append(symbol)
+
+        dropped = [symbol for symbol in restored if symbol not in rehydrated]
+        self.info_handler.debug_info_notes(
+            "[REHYDRATE] %s: %d positions resumed %s (unmanaged %s), %d journal positions closed while offline %s, %.1f ms",
+            self.chat_id, len(rehydrated), rehydrated, unmanaged, len(dropped), dropped, (time.perf_counter() - started) * 1000,
+        )
+        return True
+
+    def _start_tp_control(self, symbol: str, debug_label: str, params: TradingParams):
+        """TP/SL контроль символа (одна задача на debug_label)."""
+        if debug_label not in self.tp_tasks or self.tp_tasks[debug_label].done():
+            self.tp_tasks[debug_label] = asyncio.create_task(
+                self.tp_control.tp_control_flow(
+                    symbol=symbol,
+                    symbol_data=self.context.position_vars[symbol],
+                    sign=1 if self.direction == "LONG" else -1,
+                    debug_label=debug_label,
+                    params=params,
+                )
+            )
+
+    async def handle_signal(
+        self,
+        symbol: str,
+        cap: float,
+        last_timestamp: int,
+        debug_label: str
+    ) -> None:
+        """Вход по сигналу на этом аккаунте (инструмент к этому моменту уже в реестре)."""
+        async with self.context.signal_lock(symbol):
+            tracer = self.context.tracer
+            tracer.mark(symbol, "dispatch")
+            # ==== Снимок финансовых настроек под этот сигнал (лестница TP -- по капе) ====
+            params = build_trading_params(self.context.users_configs[self.chat_id], cap=cap)
+            try:
+                # ==== Установка позиции по умолчанию ====
+                if not self.pos_setup.set_pos_defaults(symbol, self.direction, self.instruments):
+                    tracer.finish(symbol)
+                    return
+                tracer.mark(symbol, "set_pos_defaults")
+
+                # Ждём, пока первый апдейт позиций не произойдёт
+                if not self.sync._first_update_done:
+                    self.sync.request_refresh()
+                while not self.sync._first_update_done:
+                    await asyncio.sleep(0.1)
+
+                pos_data = self.context.position_vars[symbol][self.direction]
+
+                # Защита 1: уже в позиции (по данным биржи)
+                if pos_data.in_position:
+                    pos_data.preexisting = True
+                    self.info_handler.debug_info_notes(
+                        f"[handle_signal] Skip: already in_position {symbol} {self.direction} [{self.chat_id}]"
+                    )
+                    tracer.finish(symbol)
+                    return
+
+                pos_data.params = params
+
+                # ==== Отправка сигнала ====
+                self.preform_message(
+                    chat_id=self.chat_id,
+                    marker="signal",
+                    body={"symbol": symbol, "cur_time": last_timestamp},
+                    is_print=True
+                )
+
+                await self.entry.entry_template(
+                    symbol=symbol,
+                    cap=cap,
+                    debug_label=debug_label,
+                    params=params
+                )
+
+            finally:
+                # ==== TP Control ====
+                if symbol in self.context.position_vars:  # проверка, чтобы не было KeyError
+                    self._start_tp_control(symbol, debug_label, params)
+                else:
+                    print(f"[WARNING] TP control skipped: symbol {symbol} not in position_vars yet")
+
+    async def shutdown(self, debug: bool = True):
+        """Останавливает задачи аккаунта и закрывает его сессию/пул."""
+        tasks = [self.positions_task] + list(self.tp_tasks.values())
+        for task in tasks:
+            if task:
+                task.cancel()
+        for task in tasks:
+            if task:
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self.positions_task = None
+        self.tp_tasks.clear()
+
+        if self.journal:
+            await self.journal.close()
+            self.journal = None
+
+        if self.order_stream:
+            try:
+                await asyncio.wait_for(self.order_stream.disconnect(), timeout=5)
+            except Exception as e:
+                if debug:
+                    print(f"[ACCOUNT {self.chat_id}] order_stream.disconnect() error: {e}")
+            finally:
+                self.order_stream = None
+
+        if self.connector:
+            try:
+                await asyncio.wait_for(self.connector.shutdown_session(), timeout=5)
+            except Exception as e:
+                if debug:
+                    print(f"[ACCOUNT {self.chat_id}] connector.shutdown_session() error: {e}")
+            finally:
+                self.context.session = None
+                self.connector = None
+
+        if self.mx_client:
+            try:
+                await asyncio.wait_for(self.mx_client.close(), timeout=5)
+            except Exception as e:
+                if debug:
+                    print(f"[ACCOUNT {self.chat_id}] mx_client.close() error: {e}")
+
+        self.mx_client = None
+        self.sync = None
+        self.tp_control = None
+        self.utils = None
+        self.pos_setup = None
+        self.entry = None
+        self.exit = None
+        self.context.position_vars = {}
+
+
+async def start_accounts(
+    context: BotContext,
+    info_handler: ErrorHandler,
+    chat_ids: List[int],
+    instruments: InstrumentRegistry,
+    preform_message: Callable,
+    direction: str,
+) -> Dict[int, AccountRuntime]:
+    """Поднимает рантаймы аккаунтов параллельно. Не поднявшиеся аккаунты гасятся и в результат не попадают."""
+    runtimes = [
+        AccountRuntime(
+            context=context.account(chat_id),
+            info_handler=info_handler,
+            instruments=instruments,
+            preform_message=preform_message,
+            direction=direction,
+        )
+        for chat_id in chat_ids
+    ]
+    started: Dict[int, AccountRuntime] = {}
+    results = await asyncio.gather(*(runtime.start() for runtime in runtimes), return_exceptions=True)
+    for chat_id, runtime, result in zip(chat_ids, runtimes, results):
+        if isinstance(result, BaseException) or not runtime.started:
+            err_msg = f"[ERROR] Failed to start user context for chat_id {chat_id}: {result}"
+            info_handler.debug_error_notes(err_msg, is_print=True)
+            await runtime.shutdown()
+            context.accounts.pop(chat_id, None)
+            continue
+        started[chat_id] = runtime
+    return started
+
+
+async def fan_out_signal(
+    runtimes: Iterable[AccountRuntime],
+    instruments_updater: InstrumentsUpdater,
+    signal: Signal,
+    direction: str,
+) -> None:
+    """Сигнал -> вход на всех аккаунтах одновременно: аккаунт N не ждет REST-ответов аккаунта 1."""
+    symbol = signal.symbol
+    # новый листинг, которого еще нет в реестре, -- точечная подгрузка одного контракта (одна на все аккаунты)
+    await instruments_updater.ensure_symbol(symbol)
+    debug_label = f"{symbol}_{direction}"
+    runtimes = list(runtimes)
+    if runtimes:
+        # у каждого аккаунта свой трейс сигнала: первый закончивший не закрывает трейс остальным
+        runtimes[0].context.root.tracer.fork(symbol, [(runtime.chat_id, symbol) for runtime in runtimes])
+    await asyncio.gather(*(
+        runtime.handle_signal(
+            symbol=symbol,
+            cap=signal.cap,
+            last_timestamp=signal.ts_ms,
+            debug_label=debug_label
+        )
+        for runtime in runtimes
+    ))
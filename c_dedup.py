@@ -0,0 +1,46 @@
+import time
+from collections import OrderedDict
+from typing import *
+
+
+class DedupCache:
+    """
+    Ограниченный TTL/LRU-кэш увиденных ключей (message_id сигналов): O(1) проверка и вставка,
+    память не растет -- записи старше ttl и сверх max_size вытесняются с головы при каждой вставке.
+    Дубль сигнала старше SIGNAL_TIMEOUT и так отсекается как протухший, поэтому ttl >= SIGNAL_TIMEOUT
+    достаточно, чтобы один и тот же сигнал не сработал дважды.
+    """
+
+    __slots__ = ("ttl", "max_size", "_items", "_clock")
+
+    def __init__(self, ttl: float, max_size: int, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: "OrderedDict[Hashable, float]" = OrderedDict()  # key -> время вставки (по порядку вставки)
+        self._clock = clock
+
+    def _evict(self, now: float) -> None:
+        items = self._items
+        deadline = now - self.ttl
+        while items:
+            key, added = next(iter(items.items()))
+            if added > deadline and len(items) <= self.max_size:
+                break
+            items.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        added = self._items.get(key)
+        return added is not None and self._clock() - added < self.ttl
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, key: Hashable) -> bool:
+        """Запоминает ключ. True -- ключ новый, False -- уже был (дубль)."""
+        now = self._clock()
+        self._evict(now)
+        if key in self:
+            return False
+        self._items[key] = now
+        self._evict(now)
+        return True
@@ -0,0 +1,321 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from typing import *
+from a_config import JOURNAL_FLUSH_INTERVAL, JOURNAL_SCAN_INTERVAL, JOURNAL_FSYNC_INTERVAL, JOURNAL_COMPACT_BYTES
+from b_context import AccountContext
+from b_params import TradingParams
+from b_position import PositionState, MyOrder
+from c_log import ErrorHandler
+
+# Журнал позиций аккаунта (вместо pickle pos_cache.pkl):
+#   {prefix}.jsonl -- append-only, строка на изменение символа:
+#       {"seq": n, "ts": ms, "symbol": "X_USDT", "data": {"spec": {...}, "LONG": {...}}}  | "data": null -- позиция закрыта
+#   {prefix}.snapshot.json -- сжатие журнала: {"seq": n, "symbols": {symbol: data}}; записи журнала с seq <= n уже в нем
+# Пишет фоновый поток (fsync пачкой), event loop только сериализует изменившиеся символы в dict.
+
+# не переживают рестарт: флаги живого процесса
+_TRANSIENT_FIELDS = frozenset({"orders", "params", "pending", "reset_in_progress", "force_reset_flag"})
+_STATE_FIELDS = tuple(name for name in PositionState.__slots__ if name not in _TRANSIENT_FIELDS)
+_PARAMS_FIELDS = TradingParams.__slots__
+
+
+def state_to_dict(pos_data: PositionState) -> dict:
+    data = {name: getattr(pos_data, name) for name in _STATE_FIELDS}
+    data["tp_prices"] = list(pos_data.tp_prices)
+    data["orders"] = {
+        order.order_id: [order.idx, order.price, order.state] for order in pos_data.orders.orders.values()
+    }
+    params = pos_data.params
+    data["params"] = {name: getattr(params, name) for name in _PARAMS_FIELDS} if params else None
+    return data
+
+
+def state_from_dict(data: dict) -> PositionState:
+    pos_data = PositionState(**{name: data[name] for name in _STATE_FIELDS if name in data})
+    if pos_data.sl_id is not None:
+        pos_data.sl_id = tuple(pos_data.sl_id)
+    for order_id, (idx, price, state) in (data.get("orders") or {}).items():
+        pos_data.orders.orders[order_id] = MyOrder(order_id, idx, float(price) if price is not None else None, state)
+    params = data.get("params")
+    if params:
+        params = dict(params)
+        params["tp_levels"] = tuple(tuple(level) for level in params["tp_levels"])
+        params["tp_delays"] = tuple(params["tp_delays"])
+        pos_data.params = TradingParams(**params)
+    return pos_data
+
+
+def symbol_to_dict(symbol_data: Optional[dict]) -> Optional[dict]:
+    """Запись символа для журнала; None -- открытых позиций по символу нет (символ из журнала выбывает)."""
+    if not symbol_data:
+        return None
+    data = {}
+    for side, value in symbol_data.items():
+        if side == "spec":
+            continue
+        if isinstance(value, PositionState) and value.in_position:
+            data[side] = state_to_dict(value)
+    if not data:
+        return None
+    data["spec"] = symbol_data.get("spec")
+    return data
+
+
+def symbol_from_dict(data: dict) -> dict:
+    symbol_data = {side: state_from_dict(value) for side, value in data.items() if side != "spec"}
+    if data.get("spec"):
+        symbol_data["spec"] = data["spec"]
+    return symbol_data
+
+
+def truncate_torn_tail(path: str) -> int:
+    """
+    Обрезает журнал до последнего полного "\n" (крах посреди записи). Иначе дозапись после рестарта
+    приклеилась бы к обрывку, и при следующем чтении пропала бы вместе с ним. Возвращает число срезанных байт.
+    """
+    try:
+        with open(path, "rb+") as file:
+            size = file.seek(0, os.SEEK_END)
+            if not size:
+                return 0
+            end = size
+            while end > 0:
+                step = min(4096, end)
+                file.seek(end - step)
+                chunk = file.read(step)
+                pos = chunk.rfind(b"\n")
+                if pos != -1:
+                    end = end - step + pos + 1
+                    break
+                end -= step
+            if end == size:
+                return 0
+            file.truncate(end)
+            file.flush()
+            os.fsync(file.fileno())
+            return size - end
+    except FileNotFoundError:
+        return 0
+
+
+def read_journal(prefix: str) -> Tuple[int, Dict[str, dict]]:
+    """Снапшот + хвост журнала -> (последний seq, {symbol: data}). Битые строки (крах при записи) пропускаются."""
+    seq, symbols = 0, {}
+    try:
+        with open(f"{prefix}.snapshot.json", "r", encoding="utf-8") as file:
+            snapshot = json.load(file)
+        seq, symbols = snapshot["seq"], snapshot["symbols"]
+    except FileNotFoundError:
+        pass
+
+    try:
+        with open(f"{prefix}.jsonl", "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record["seq"] <= seq:
+                    continue
+                seq = record["seq"]
+                if record["data"] is None:
+                    symbols.pop(record["symbol"], None)
+                else:
+                    symbols[record["symbol"]] = record["data"]
+    except FileNotFoundError:
+        pass
+    return seq, symbols
+
+
+class JournalWriter:
+    """
+    Фоновый поток журнала: дописывает записи, fsync -- не чаще JOURNAL_FSYNC_INTERVAL (пачкой),
+    журнал больше JOURNAL_COMPACT_BYTES -- снапшот последних состояний (tmp + fsync + os.replace) и усечение журнала.
+    Ошибка диска (OSError) -- в лог, поток останавливается, новые записи не принимаются (failed).
+    """
+
+    def __init__(self, prefix: str, seq: int, symbols: Dict[str, dict], info_handler: ErrorHandler):
+        self.prefix = prefix
+        self.info_handler = info_handler
+        self.failed = False
+        self.journal_path = f"{prefix}.jsonl"
+        self.snapshot_path = f"{prefix}.snapshot.json"
+        self._latest = dict(symbols)  # текущее состояние -- для снапшота
+        self._seq = seq
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=f"journal-{os.path.basename(prefix)}", daemon=True)
+        self._thread.start()
+
+    def append(self, symbol: str, data: Optional[dict]):
+        if self.failed:
+            return
+        self._queue.put((symbol, data, int(time.time() * 1000)))
+
+    def close(self, timeout: float = 5.0):
+        """Дописывает очередь, fsync и останавливает поток."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _compact(self, file) -> Any:
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as tmp:
+            json.dump({"seq": self._seq, "symbols": self._latest}, tmp, separators=(",", ":"))
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._fsync_dir()
+        # снапшот уже на диске: крах до усечения не страшен -- при чтении записи с seq <= snapshot.seq пропускаются
+        file.close()
+        return open(self.journal_path, "w", encoding="utf-8")
+
+    def _fsync_dir(self):
+        if os.name != "posix":
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.snapshot_path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _run(self):
+        file = None
+        last_fsync = time.monotonic()
+        unsynced = False
+        stop = False
+        try:
+            file = open(self.journal_path, "a", encoding="utf-8")
+            while not stop:
+                # ждем записи, но не дольше срока отложенного fsync
+                try:
+                    item = self._queue.get(timeout=JOURNAL_FSYNC_INTERVAL if unsynced else None)
+                except queue.Empty:
+                    item = False
+
+                lines = []
+                while item:
+                    symbol, data, ts = item
+                    self._seq += 1
+                    if data is None:
+                        self._latest.pop(symbol, None)
+                    else:
+                        self._latest[symbol] = data
+                    lines.append(json.dumps({"seq": self._seq, "ts": ts, "symbol": symbol, "data": data}, separators=(",", ":")))
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                stop = item is None
+
+                if lines:
+                    file.write("\n".join(lines) + "\n")
+                    file.flush()
+                    unsynced = True
+
+                if unsynced and (stop or time.monotonic() - last_fsync >= JOURNAL_FSYNC_INTERVAL):
+                    os.fsync(file.fileno())
+                    last_fsync = time.monotonic()
+                    unsynced = False
+                    if file.tell() >= JOURNAL_COMPACT_BYTES:
+                        file = self._compact(file)
+        except OSError as e:
+            self.failed = True
+            self.info_handler.debug_error_notes(
+                "[JOURNAL] %s: write failed, journal stopped (positions are no longer recorded): %r", self.prefix, e
+            )
+            # очередь больше никто не разбирает -- освобождаем
+            try:
+                while True:
+                    self._queue.get_nowait()
+            except queue.Empty:
+                pass
+        finally:
+            if file is not None:
+                try:
+                    file.close()
+                except OSError:
+                    pass
+
+
+class PositionJournal:
+    """
+    Журнал позиций аккаунта. Изменения метят wake-точки (context.wake_symbol / mark_dirty), раз в
+    JOURNAL_FLUSH_INTERVAL изменившиеся символы сериализуются и уходят в журнал только при отличии от
+    последней записи; раз в JOURNAL_SCAN_INTERVAL -- страховочный проход по всем символам.
+    """
+
+    def __init__(self, context: AccountContext, info_handler: ErrorHandler, prefix: str):
+        self.context = context
+        self.info_handler = info_handler
+        self.prefix = prefix
+        self.writer: Optional[JournalWriter] = None
+        self.task: Optional[asyncio.Task] = None
+        self._written: Dict[str, dict] = {}  # symbol -> последняя записанная data
+        info_handler.wrap_foreign_methods(self)
+
+    def load(self) -> Dict[str, dict]:
+        """Восстановление после рестарта: {symbol: symbol_data} c PositionState. Запускает поток записи."""
+        started = time.perf_counter()
+        torn = truncate_torn_tail(f"{self.prefix}.jsonl")
+        if torn:
+            self.info_handler.debug_error_notes("[JOURNAL] %s: dropped torn last record (%d bytes)", self.prefix, torn)
+        seq, symbols = read_journal(self.prefix)
+        self._written = symbols
+        self.writer = JournalWriter(self.prefix, seq, symbols, self.info_handler)
+        restored = {symbol: symbol_from_dict(data) for symbol, data in symbols.items()}
+        self.info_handler.debug_info_notes(
+            "[JOURNAL] %s: restored %d symbols (seq %d) in %.1f ms",
+            self.prefix, len(restored), seq, (time.perf_counter() - started) * 1000,
+        )
+        return restored
+
+    def start(self):
+        if self.writer is None:
+            self.load()
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self._flush_loop())
+
+    def flush(self, symbols: Iterable[str]):
+        if self.writer.failed:
+            return
+        position_vars = self.context.position_vars
+        for symbol in symbols:
+            data = symbol_to_dict(position_vars.get(symbol))
+            if data != self._written.get(symbol):
+                if data is None:
+                    self._written.pop(symbol, None)
+                else:
+                    self._written[symbol] = data
+                self.writer.append(symbol, data)
+
+    async def _flush_loop(self):
+        dirty = self.context.dirty_symbols
+        last_scan = time.monotonic()
+        while not self.context.stop_bot and not self.context.stop_bot_iteration:
+            await asyncio.sleep(JOURNAL_FLUSH_INTERVAL)
+            symbols = set(dirty)
+            dirty.clear()
+            if time.monotonic() - last_scan >= JOURNAL_SCAN_INTERVAL:
+                symbols.update(self.context.position_vars)
+                symbols.update(self._written)
+                last_scan = time.monotonic()
+            if symbols:
+                self.flush(symbols)
+
+    async def close(self):
+        """Последний проход по всем символам и остановка потока (fsync хвоста)."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.writer:
+            self.flush(set(self.context.position_vars) | set(self._written))
+            await asyncio.to_thread(self.writer.close)
+            self.writer = None
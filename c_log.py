@@ -1,81 +1,190 @@
 from datetime import datetime
 import pytz
 import inspect
-from types import FunctionType, MethodType, BuiltinFunctionType
-from pprint import pformat
-from a_config import TIME_ZONE
+import json
+import queue
+import reprlib
+import sys
+import threading
+import time
+from types import FunctionType, BuiltinFunctionType
+from typing import *
+from a_config import TIME_ZONE, LOG_FILE, LOG_JSON, LOG_QUEUE_MAX, LOG_REPR_MAX
 import traceback
 
 
-TZ_LOCATION = pytz.timezone(TIME_ZONE)               
+TZ_LOCATION = pytz.timezone(TIME_ZONE)
 
 def log_time():
     now = datetime.now(TZ_LOCATION)
     return now.strftime("%Y-%m-%d %H:%M:%S")
 
 
+# repr аргументов для лога исключений: ограничен по длине и глубине (BotContext, большие dict/list не раскрываются целиком)
+_arg_repr = reprlib.Repr()
+_arg_repr.maxlevel = 2
+_arg_repr.maxdict = _arg_repr.maxlist = _arg_repr.maxtuple = _arg_repr.maxset = 8
+_arg_repr.maxstring = _arg_repr.maxother = LOG_REPR_MAX
+_arg_repr.maxlong = 40
+
+
+def bounded_repr(obj: Any) -> str:
+    try:
+        return _arg_repr.repr(obj)
+    except Exception as e:
+        return f"<repr failed: {type(e).__name__}>"
+
+
+class _LogRecord(NamedTuple):
+    ts: float                                         # time.time() на момент вызова
+    level: str
+    msg: str
+    args: tuple                                       # msg % args -- в потоке логгера
+    fields: dict                                      # доп. поля JSON-записи
+    exc: Optional[traceback.TracebackException]       # стек форматируется в потоке логгера
+
+
+class LogWriter:
+    """
+    Фоновый поток логгера. Горячий путь (event loop) только кладет запись в очередь;
+    время, %-подстановка, стек и JSON собираются здесь. Очередь переполнена -- запись
+    отбрасывается (со счетчиком), вызывающий не ждет никогда.
+    """
+
+    def __init__(self, path: Optional[str] = LOG_FILE, as_json: bool = LOG_JSON, maxsize: int = LOG_QUEUE_MAX):
+        self.path = path
+        self.as_json = as_json
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._dropped = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, record: _LogRecord):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._dropped += 1  # гонка с потоком безвредна: счетчик приблизительный
+
+    def close(self, timeout: float = 2.0):
+        """Дописывает очередь и останавливает поток (перед os._exit: daemon-поток иначе теряет хвост)."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _render(self, record: _LogRecord) -> str:
+        try:
+            msg = record.msg % record.args if record.args else record.msg
+        except Exception:
+            msg = f"{record.msg} {record.args!r}"
+        when = datetime.fromtimestamp(record.ts, TZ_LOCATION).strftime("%Y-%m-%d %H:%M:%S")
+        stack = "".join(record.exc.format()) if record.exc else None
+
+        if not self.as_json:
+            line = f"{msg} Time: {when}[{record.level}]"
+            return f"{line}\nStack:\n{stack}" if stack else line
+
+        entry = {"ts": round(record.ts, 3), "time": when, "level": record.level, "msg": msg}
+        if record.fields:
+            entry.update(record.fields)
+        if stack:
+            entry["stack"] = stack
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+    def _run(self):
+        out = open(self.path, "a", encoding="utf-8", buffering=1) if self.path else sys.stdout
+        stop = False
+        try:
+            while not stop:
+                lines = []
+                record = self._queue.get()
+                # пачкой, что уже накопилось -- одна запись в поток вместо N
+                while record is not None:
+                    lines.append(self._render(record))
+                    if len(lines) >= 256:
+                        break
+                    try:
+                        record = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                stop = record is None
+
+                if self._dropped:
+                    dropped, self._dropped = self._dropped, 0
+                    lines.append(self._render(_LogRecord(time.time(), "ERROR", "log queue full: %d records dropped", (dropped,), {}, None)))
+                if lines:
+                    out.write("\n".join(lines) + "\n")
+                    out.flush()
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+
 class Total_Logger:
-    def __init__(self): 
+    def __init__(self):
         self.debug_err_list: list = []
         self.debug_info_list: list = []
+        self.writer = LogWriter()
 
-    # debug    
-    def debug_error_notes(self, data: str, is_print: bool=True):
-        data += f" Time: {log_time()}" + "[ERROR]"
-        # self.debug_err_list.append(data)
-        # if is_print:
-        print(data)
+    def _emit(self, level: str, data: str, args: tuple, fields: dict, exc: Optional[traceback.TracebackException] = None):
+        self.writer.put(_LogRecord(time.time(), level, data, args, fields, exc))
 
-    def debug_info_notes(self, data: str, is_print: bool=True):
-        data += f" Time: {log_time()}" + "[INFO]"
-        # self.debug_info_list.append(data)
-        # if is_print:
-        print(data)
+    # debug
+    # data -- готовая строка либо %-шаблон: аргументы подставляются в потоке логгера (ленивое форматирование).
+    # fields -- структурные поля JSON-записи (symbol=..., chat_id=...).
+    def debug_error_notes(self, data: str, *args, is_print: bool=True, **fields):
+        self._emit("ERROR", data, args, fields)
 
-    def _log_decor_notes(self, ex, is_print: bool=True):
-        """Логирование исключений с указанием точного места ошибки."""
-        exception_message = str(ex)
-        stack = inspect.trace()
+    def debug_info_notes(self, data: str, *args, is_print: bool=True, **fields):
+        self._emit("INFO", data, args, fields)
 
-        if stack:
-            last_frame = stack[-1]
-            file_name = last_frame.filename
-            line_number = last_frame.lineno
-            func_name = last_frame.function
+    def close(self):
+        self.writer.close()
 
-            message = f"Error in '{func_name}' at {file_name}, line {line_number}: {exception_message}"
+    def _log_decor_notes(self, ex, is_print: bool=True):
+        """Логирование исключений с указанием точного места ошибки."""
+        tb = ex.__traceback__
+        if tb is not None:
+            while tb.tb_next is not None:
+                tb = tb.tb_next
+            code = tb.tb_frame.f_code
+            self._emit(
+                "ERROR", "Error in '%s' at %s, line %d: %s", (code.co_name, code.co_filename, tb.tb_lineno, str(ex)), {}
+            )
         else:
-            message = f"Error: {exception_message}"
-        # if is_print:
-        print(message)
-        # self.debug_err_list.append(message)
+            self._emit("ERROR", "Error: %s", (str(ex),), {})
 
     async def _async_log_exception(self, ex):
         """Асинхронное логирование без блокировок."""
         self._log_decor_notes(ex)
 
+    def _log_wrapped_exception(self, kind: str, func, ex: Exception, args: tuple, kwargs: dict):
+        # repr аргументов снимается сейчас (объекты дальше меняются), но с потолком длины;
+        # стек -- без чтения исходников (lookup_lines=False), строки подтянет поток логгера
+        arg_str = bounded_repr({"args": args, "kwargs": kwargs})
+        exc = traceback.TracebackException.from_exception(ex, lookup_lines=False)
+        self._emit(
+            "ERROR", "[%s ERROR] %s -> %s\nArgs:\n%s", (kind, func.__qualname__, str(ex), arg_str),
+            {"func": func.__qualname__, "exc_type": type(ex).__name__}, exc
+        )
+
     def total_exception_decor(self, func):
         """Универсальный и безопасный декоратор логирования исключений с контекстом."""
         async def async_wrapper(*args, **kwargs):
             try:
                 return await func(*args, **kwargs)
             except Exception as ex:
-                arg_str = pformat({"args": args, "kwargs": kwargs})
-                stack = "".join(traceback.format_exc())
-                self.debug_error_notes(
-                    f"[ASYNC ERROR] {func.__qualname__} -> {ex}\nArgs:\n{arg_str}\nStack:\n{stack}"
-                )
+                self._log_wrapped_exception("ASYNC", func, ex, args, kwargs)
                 return None
 
         def sync_wrapper(*args, **kwargs):
             try:
                 return func(*args, **kwargs)
             except Exception as ex:
-                arg_str = pformat({"args": args, "kwargs": kwargs})
-                stack = "".join(traceback.format_exc())
-                self.debug_error_notes(
-                    f"[SYNC ERROR] {func.__qualname__} -> {ex}\nArgs:\n{arg_str}\nStack:\n{stack}"
-                )
+                self._log_wrapped_exception("SYNC", func, ex, args, kwargs)
                 return None
 
         return async_wrapper if inspect.iscoroutinefunction(func) else sync_wrapper
@@ -87,31 +196,32 @@ class ErrorHandler(Total_Logger):
 
     def wrap_foreign_methods(self, obj, exclude: list[str] = None):
         """
-        Оборачивает все методы объекта obj декоратором total_exception_decor,
-        кроме методов в списке exclude.
+        Оборачивает методы класса obj декоратором total_exception_decor -- один раз на класс
+        (обертки живут в классе, экземпляры биндят их как обычные методы: без замыканий на экземпляр).
+        Не оборачиваются: магические методы, exclude и горячие методы из атрибута класса _hot_path --
+        их исключения уходят в (обернутый) вызывающий метод.
         """
-        exclude = exclude or []
+        cls = obj.__class__
+        if cls.__dict__.get("_exc_wrapped"):
+            return
+        skip = set(exclude or ()) | set(cls.__dict__.get("_hot_path", ()))
 
-        for name, attr in obj.__class__.__dict__.items():
-            if name.startswith("__") or name in exclude:
+        for name, attr in list(cls.__dict__.items()):
+            if name.startswith("__") or name in skip:
                 continue  # пропускаем магические методы и исключения
 
-            original = getattr(obj, name)
-
-            if hasattr(original, "_is_wrapped"):
-                continue
-
-            if isinstance(attr, staticmethod):
+            if isinstance(attr, (staticmethod, classmethod)):
                 func = attr.__func__
+                if hasattr(func, "_is_wrapped"):
+                    continue
                 wrapped_func = self.total_exception_decor(func)
                 wrapped_func._is_wrapped = True
-                setattr(obj, name, staticmethod(wrapped_func))
-            elif isinstance(attr, classmethod):
-                func = attr.__func__
-                wrapped_func = self.total_exception_decor(func)
+                setattr(cls, name, type(attr)(wrapped_func))
+            elif isinstance(attr, (FunctionType, BuiltinFunctionType)):
+                if hasattr(attr, "_is_wrapped"):
+                    continue
+                wrapped_func = self.total_exception_decor(attr)
                 wrapped_func._is_wrapped = True
-                setattr(obj, name, classmethod(wrapped_func))
-            elif isinstance(attr, (FunctionType, MethodType, BuiltinFunctionType)):
-                wrapped_func = self.total_exception_decor(original)
-                wrapped_func._is_wrapped = True
-                setattr(obj, name, wrapped_func)
\ No newline at end of file
+                setattr(cls, name, wrapped_func)
+
+        cls._exc_wrapped = True
@@ -0,0 +1,208 @@
+from typing import *
+from a_config import REHYDRATE_PRICE_TOLERANCE
+from b_params import TradingParams, build_trading_params
+from b_position import PositionState, MyOrders, ORDER_STATE_ACTIVE
+from c_utils import safe_float, safe_int, to_human_digit
+
+# Восстановление состояния позиции по данным биржи после рестарта (AccountRuntime.rehydrate):
+# позиция + открытые лимитки (TP-лестница) + исполненные лимитки (пройденные уровни) + триггер-ордера (SL).
+
+ORDER_STATE_FILLED = 3
+MARKET_ORDER_TYPES = (5, 6)  # рыночный / конвертация рыночного в лимит -- не TP
+
+
+def close_side(direction: str) -> int:
+    """Сторона закрывающего ордера MEXC: 4 -- Close Long, 2 -- Close Short."""
+    return 4 if direction == "LONG" else 2
+
+
+def position_type(direction: str) -> int:
+    return 1 if direction == "LONG" else 2
+
+
+def ladder_targets(entry_price: float, params: TradingParams, sign: int, price_precision: Optional[int]) -> Dict[int, float]:
+    """Цены уровней TP так же, как их считает TPControl.tp_factory: idx -> цена."""
+    targets = {}
+    for idx, (indent, _) in enumerate(params.tp_levels, start=1):
+        price = entry_price * (1 + sign * indent / 100)
+        targets[idx] = to_human_digit(round(price, price_precision)) if price_precision is not None else price
+    return targets
+
+
+def ladder_from_orders(entry_price: float, levels: List[Tuple[float, float]], sign: int) -> Tuple[Tuple[float, float], ...]:
+    """
+    Лестница (отступ %, объем %) по ордерам биржи -- [(цена, контракты)] в порядке уровней.
+    Объем -- доля от остатка, как в TPControl.tp_factory (последний уровень забирает остаток).
+    """
+    remaining = sum(vol for _, vol in levels)
+    ladder = []
+    for price, vol in levels:
+        indent = round(sign * (price / entry_price - 1) * 100, 4)
+        ladder.append((indent, round(vol / remaining * 100, 4) if remaining > 0 else 100.0))
+        remaining -= vol
+    return tuple(ladder)
+
+
+def match_level(price: float, targets: Dict[int, float]) -> Optional[int]:
+    """Уровень лестницы для цены ордера; None -- ордер не из лестницы (ручной и т.п.)."""
+    best_idx, best_diff = None, None
+    for idx, target in targets.items():
+        diff = abs(price - float(target))
+        if best_diff is None or diff < best_diff:
+            best_idx, best_diff = idx, diff
+    if best_idx is None or best_diff > float(targets[best_idx]) * REHYDRATE_PRICE_TOLERANCE:
+        return None
+    return best_idx
+
+
+def _belongs(order: dict, symbol: str, side: int, position: dict) -> bool:
+    """Ордер закрывает именно эту позицию: символ, сторона, positionId (если биржа его отдала) или время."""
+    if order.get("symbol") != symbol or safe_int(order.get("side")) != side:
+        return False
+    pos_id, order_pos_id = position.get("positionId"), order.get("positionId")
+    if pos_id and order_pos_id:
+        return str(pos_id) == str(order_pos_id)
+    return safe_int(order.get("createTime"), 0) >= safe_int(position.get("createTime"), 0)
+
+
+def _filled_prefix(rows: List[Tuple[dict, int]], ranked: List[float]) -> bool:
+    """Исполненные лимитки -- ближайшие к входу уровни подряд (лестница исполняется по порядку); иначе в истории дыра."""
+    filled = {safe_float(order.get("price"), 0.0) for order, state in rows if state == ORDER_STATE_FILLED}
+    return all(price in filled for price in ranked[:len(filled)])
+
+
+def _closes_accounted(rows: List[Tuple[dict, int]], position: dict) -> bool:
+    """Закрытый объем позиции (closeVol) покрыт исполненными лимитками выборки; иначе часть исполнений в нее не попала."""
+    if position.get("closeVol") is None:
+        return True
+    filled_vol = sum(
+        safe_float(order.get("dealVol"), 0.0) or safe_float(order.get("vol"), 0.0)
+        for order, state in rows if state == ORDER_STATE_FILLED
+    )
+    return safe_float(position.get("closeVol"), 0.0) <= filled_vol * (1 + REHYDRATE_PRICE_TOLERANCE) + 1e-9
+
+
+def _restore_sl(pos_data: PositionState, trigger_orders: Optional[List[dict]], symbol: str, side: int):
+    """SL: последний не сработавший триггер на закрытие. trigger_orders=None (биржа не отдала) -- sl_id журнала."""
+    if trigger_orders is None:
+        return
+    stops = [o for o in trigger_orders if o.get("symbol") == symbol and safe_int(o.get("side")) == side]
+    if stops:
+        stop = max(stops, key=lambda o: safe_int(o.get("createTime"), 0))
+        pos_data.sl_id = (str(stop.get("id")), safe_float(stop.get("triggerPrice")))
+    else:
+        pos_data.sl_id = None
+
+
+def _unmanaged(
+    pos_data: PositionState, user_cfg: dict, trigger_orders: Optional[List[dict]], symbol: str, side: int
+) -> PositionState:
+    """Лестницу не восстановить надежно: позиция без нашей книги ордеров, preexisting -- TP/SL не трогаем."""
+    pos_data.orders = MyOrders()
+    pos_data.params = pos_data.params or build_trading_params(user_cfg)
+    pos_data.tp_prices = []
+    pos_data.progress = 0
+    _restore_sl(pos_data, trigger_orders, symbol, side)
+    pos_data.preexisting = True
+    pos_data.tp_initiated = True
+    pos_data.sl_initiated = True
+    pos_data.force_reset_flag = False
+    pos_data.reset_in_progress = False
+    return pos_data
+
+
+def rebuild_position(
+    pos_data: PositionState,
+    position: dict,
+    open_orders: List[dict],
+    filled_orders: List[dict],
+    trigger_orders: Optional[List[dict]],
+    user_cfg: dict,
+    spec: dict,
+    direction: str,
+    known: bool,
+    complete: bool = True
+) -> PositionState:
+    """
+    Сводит состояние позиции (pos_data -- из журнала или свежее) с биржей:
+    книга ордеров, tp_prices, progress и sl_id -- по ордерам биржи; params -- снимок сигнала из журнала,
+    иначе лестница восстанавливается по тем же ордерам (ladder_from_orders), прочее -- из настроек user_cfg.
+    known=False (позиции нет в журнале, TP-лимиток нет) -- позиция не наша: preexisting, лестницу не ставим.
+    complete=False (или closeVol позиции больше исполненных лимиток) -- ордера символа получены не полностью: книга ордеров остается из журнала, а без снимка
+    лестницы уровни не угадываем -- позиция тоже preexisting (TP/SL не трогаем).
+    """
+    symbol = position["symbol"]
+    side = close_side(direction)
+    sign = 1 if direction == "LONG" else -1
+
+    hold_price = safe_float(position.get("holdAvgPrice"), 0.0)
+    pos_data.entry_price = pos_data.entry_price or safe_float(position.get("openAvgPrice"), 0.0) or hold_price
+    pos_data.hold_price = hold_price
+    pos_data.contracts = safe_float(position.get("holdVol"), 0.0, abs_val=True)
+    pos_data.vol_assets = pos_data.contracts * safe_float(spec.get("contract_size"), 1.0)
+    pos_data.leverage = safe_int(position.get("leverage"), 1, abs_val=True)
+    pos_data.c_time = pos_data.c_time or safe_int(position.get("createTime")) or None
+    pos_data.in_position = True
+    pos_data.pending_open = False
+
+    # --- книга ордеров: лимитки лестницы (активные и исполненные) ---
+    rows = [
+        (order, state)
+        for orders_list, state in ((open_orders, ORDER_STATE_ACTIVE), (filled_orders, ORDER_STATE_FILLED))
+        for order in orders_list
+        if _belongs(order, symbol, side, position) and safe_int(order.get("orderType")) not in MARKET_ORDER_TYPES
+    ]
+    complete = complete and _closes_accounted(rows, position)
+    # уровень ордера: из журнала; иначе по лестнице снимка сигнала (params из журнала);
+    # снимка нет (лестница сигнала зависела от капы) -- по порядку цен закрывающих лимиток
+    journal_orders = pos_data.orders.orders
+    if pos_data.params is not None:
+        targets = ladder_targets(pos_data.entry_price, pos_data.params, sign, spec.get("price_precision"))
+        level_of = lambda price: match_level(price, targets)
+    else:
+        ranked = sorted({safe_float(order.get("price"), 0.0) for order, _ in rows}, reverse=direction == "SHORT")
+        if not complete or not _filled_prefix(rows, ranked):
+            return _unmanaged(pos_data, user_cfg, trigger_orders, symbol, side)
+        level_of = lambda price: ranked.index(price) + 1
+
+    if complete:
+        orders = MyOrders()
+        for order, state in rows:
+            order_id = str(order.get("orderId"))
+            price = safe_float(order.get("price"), 0.0)
+            known_order = journal_orders.get(order_id)
+            idx = known_order.idx if known_order and known_order.idx else level_of(price)
+            if idx is None:
+                continue
+            orders.placed(order_id, idx, price)
+            orders.on_state(order_id, state)
+    else:
+        # выборка биржи неполная -- книга ордеров журнала как есть (по снимку сигнала)
+        orders = pos_data.orders
+    pos_data.orders = orders
+    if pos_data.params is None:
+        volumes = {}
+        for order, _ in rows:
+            price = safe_float(order.get("price"), 0.0)
+            volumes[price] = volumes.get(price, 0.0) + (safe_float(order.get("dealVol"), 0.0) or safe_float(order.get("vol"), 0.0))
+        levels = [(price, volumes[price]) for price in ranked]
+        pos_data.params = build_trading_params(user_cfg, tp_levels=ladder_from_orders(pos_data.entry_price, levels, sign))
+
+    levels = {}
+    for order in orders.orders.values():
+        if order.idx is not None:
+            levels.setdefault(order.idx, order.price)
+    pos_data.tp_prices = [levels[idx] for idx in sorted(levels)]
+
+    front = orders.filled_front(direction)
+    pos_data.progress = front.idx if front else 0
+
+    _restore_sl(pos_data, trigger_orders, symbol, side)
+
+    known = known or bool(orders)
+    pos_data.preexisting = not known
+    pos_data.tp_initiated = pos_data.tp_initiated or bool(orders)
+    pos_data.sl_initiated = pos_data.sl_initiated or pos_data.sl_id is not None
+    pos_data.force_reset_flag = False
+    pos_data.reset_in_progress = False
+    return pos_data
@@ -0,0 +1,222 @@
+import asyncio
+import multiprocessing as mp
+import pickle
+from multiprocessing.connection import Connection
+from typing import *
+from a_config import *
+from b_context import BotContext
+from c_log import ErrorHandler
+from API.TG.tg_parser import Signal
+
+# IPC:
+#   родитель -> шард (signal_conn, send_bytes): pickle(Signal); пустые байты -- стоп
+#   шард -> родитель (status_conn, send):      ("ready", [chat_id, ...]) | ("open", bool)
+STOP_MARKER = b""
+
+
+def attach_reader(conn: Connection, recv: Callable[[], Any], on_message: Callable[[Any], None]) -> Callable[[], None]:
+    """
+    Подписывает on_message на входящие сообщения conn. На selector-loop -- без потоков (loop.add_reader),
+    на Proactor (Windows) -- через поток. Закрытый канал приходит в on_message как None.
+    Возвращает функцию отписки.
+    """
+    loop = asyncio.get_running_loop()
+    fd = conn.fileno()
+
+    def _drain():
+        try:
+            while conn.poll():
+                on_message(recv())
+        except (EOFError, OSError):
+            loop.remove_reader(fd)
+            on_message(None)
+
+    try:
+        loop.add_reader(fd, _drain)
+        return lambda: loop.remove_reader(fd)
+    except NotImplementedError:
+        async def _pump():
+            while True:
+                try:
+                    msg = await asyncio.to_thread(recv)
+                except (EOFError, OSError):
+                    on_message(None)
+                    return
+                on_message(msg)
+
+        task = asyncio.create_task(_pump())
+        return task.cancel
+
+
+def shard_main(
+    shard_id: int,
+    users_configs: Dict[int, dict],
+    direction: str,
+    signal_conn: Connection,
+    status_conn: Connection,
+):
+    """Точка входа процесса-шарда (spawn): свой event loop, свои MexcClient/MxFuturesOrderWS на аккаунт."""
+    asyncio.run(_shard_loop(shard_id, users_configs, direction, signal_conn, status_conn))
+
+
+async def _shard_loop(
+    shard_id: int,
+    users_configs: Dict[int, dict],
+    direction: str,
+    signal_conn: Connection,
+    status_conn: Connection,
+):
+    # поздний импорт: main сам импортирует c_shard
+    from main import Core
+    from API.TG.tg_notifier import TelegramNotifier
+
+    core = Core(shard_workers=0)
+    core.direction = direction
+    context = core.context
+    context.users_configs.update(users_configs)
+    for chat_id in users_configs:
+        context.queues_msg[chat_id] = []
+    core.notifier = TelegramNotifier(bot=core.bot, context=context, info_handler=core.info_handler)
+
+    def on_signal(payload: Optional[bytes]):
+        if not payload:  # стоп или родитель умер
+            context.stop_bot = True
+            return
+        context.signal_queue.put_nowait(pickle.loads(payload))
+
+    async def report_open_positions():
+        last = None
+        while not context.stop_bot:
+            has_open = context.has_open_positions()
+            if has_open != last:
+                status_conn.send(("open", has_open))
+                last = has_open
+            await asyncio.sleep(MAIN_CYCLE_FREQUENCY)
+
+    detach = attach_reader(signal_conn, signal_conn.recv_bytes, on_signal)
+    status_task = None
+    try:
+        started = core._start_usual_context() and await core._start_local()
+        status_conn.send(("ready", list(core.accounts) if started else []))
+        if started:
+            status_task = asyncio.create_task(report_open_positions())
+            await core._signal_loop()
+    finally:
+        context.stop_bot = True
+        detach()
+        if status_task:
+            status_task.cancel()
+        await core._shutdown_iteration(debug=False)
+        await core.bot.session.close()
+        core.info_handler.close()
+        status_conn.close()
+        signal_conn.close()
+
+
+class ShardPool:
+    """
+    Аккаунты по процессам-шардам (SHARD_WORKERS): каждый шард -- отдельный процесс со своим event loop,
+    где крутится обычный Core без Telegram-watcher'а. Основной процесс разбирает сигнал и
+    рассылает его шардам одним pickle по Pipe; подпись, JSON и форматирование отчетов
+    масштабируются по ядрам.
+    """
+
+    def __init__(self, context: BotContext, info_handler: ErrorHandler, workers: int):
+        info_handler.wrap_foreign_methods(self)
+        self.context = context
+        self.info_handler = info_handler
+        self.workers = workers
+        self._procs: List[mp.Process] = []
+        self._signal_conns: List[Connection] = []
+        self._status_conns: List[Connection] = []
+        self._detach: List[Callable[[], None]] = []
+        self._ready: Dict[int, asyncio.Future] = {}
+
+    def _on_status(self, shard_id: int, msg: Optional[tuple]):
+        ready = self._ready.get(shard_id)
+        if msg is None:
+            # процесс шарда завершился
+            self.context.remote_open_positions.pop(shard_id, None)
+            if ready and not ready.done():
+                ready.set_result([])
+            if not self.context.stop_bot and not self.context.stop_bot_iteration:
+                self.info_handler.debug_error_notes(f"[SHARD {shard_id}] worker exited", is_print=True)
+            return
+
+        kind, payload = msg
+        if kind == "ready" and ready and not ready.done():
+            ready.set_result(payload)
+        elif kind == "open":
+            self.context.remote_open_positions[shard_id] = payload
+
+    async def start(self, chat_ids: List[int], direction: str) -> bool:
+        """Раскладывает аккаунты по шардам (round-robin) и ждет их готовности. True -- поднялся хоть один аккаунт."""
+        workers = min(self.workers, len(chat_ids))
+        if not workers:
+            return False
+
+        spawn = mp.get_context("spawn")
+        loop = asyncio.get_running_loop()
+        for shard_id in range(workers):
+            configs = {chat_id: self.context.users_configs[chat_id] for chat_id in chat_ids[shard_id::workers]}
+            signal_recv, signal_send = spawn.Pipe(duplex=False)
+            status_recv, status_send = spawn.Pipe(duplex=False)
+            proc = spawn.Process(
+                target=shard_main,
+                args=(shard_id, configs, direction, signal_recv, status_send),
+                name=f"shard-{shard_id}",
+                daemon=True,
+            )
+            proc.start()
+            # концы шарда в родителе не нужны: иначе EOF о падении шарда не придет
+            signal_recv.close()
+            status_send.close()
+
+            self._procs.append(proc)
+            self._signal_conns.append(signal_send)
+            self._status_conns.append(status_recv)
+            self._ready[shard_id] = loop.create_future()
+            self._detach.append(attach_reader(
+                status_recv, status_recv.recv, lambda msg, shard_id=shard_id: self._on_status(shard_id, msg)
+            ))
+
+        await asyncio.wait(list(self._ready.values()), timeout=SHARD_START_TIMEOUT)
+        started = 0
+        for shard_id, ready in self._ready.items():
+            accounts = ready.result() if ready.done() else []
+            started += len(accounts)
+            print(f"[SHARD {shard_id}] accounts started: {accounts}")
+        return started > 0
+
+    def broadcast(self, signal: Signal):
+        """Рассылает сигнал всем шардам: один pickle, send_bytes в каждый Pipe."""
+        payload = pickle.dumps(signal, protocol=pickle.HIGHEST_PROTOCOL)
+        for shard_id, conn in enumerate(self._signal_conns):
+            try:
+                conn.send_bytes(payload)
+            except (BrokenPipeError, OSError) as e:
+                self.info_handler.debug_error_notes(f"[SHARD {shard_id}] broadcast error: {e}")
+
+    async def stop(self, timeout: float = 10.0):
+        """Стоп-маркер шардам, ожидание их shutdown'а; не успевшие -- terminate."""
+        for conn in self._signal_conns:
+            try:
+                conn.send_bytes(STOP_MARKER)
+            except (BrokenPipeError, OSError):
+                pass
+
+        await asyncio.gather(*(asyncio.to_thread(proc.join, timeout) for proc in self._procs))
+        for proc in self._procs:
+            if proc.is_alive():
+                proc.terminate()
+
+        for detach in self._detach:
+            detach()
+        for conn in self._signal_conns + self._status_conns:
+            conn.close()
+        self._procs.clear()
+        self._signal_conns.clear()
+        self._status_conns.clear()
+        self._detach.clear()
+        self._ready.clear()
+        self.context.remote_open_positions.clear()
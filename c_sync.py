@@ -5,12 +5,16 @@ from typing import *
 from b_context import BotContext
 from c_log import ErrorHandler
 from API.MX.mx import MexcClient
-from c_utils import FileManager, to_human_digit, safe_float, safe_int, safe_round
+from c_utils import to_human_digit, safe_float, safe_int, safe_round
 from TRADING.exit import ExitControl
-from copy import deepcopy   
+from b_position import PositionState
+from b_params import build_trading_params
 
 
 class Synchronizer:
+    # горячие методы без обертки total_exception_decor (исключения -- у обернутого вызывающего)
+    _hot_path = ("unpack_position_info", "on_position_push", "on_deal_push", "request_refresh", "_stream_alive")
+
     def __init__(
         self,
         context: BotContext,
@@ -20,6 +24,7 @@ class Synchronizer:
         mx_client: MexcClient,
         preform_message: Callable,
         positions_update_frequency: float,
+        reconcile_frequency: float,
         exit: ExitControl,
         use_cache: bool,
         chat_id: str
@@ -31,6 +36,7 @@ class Synchronizer:
         self.mx_client = mx_client
         self.preform_message = preform_message
         self.positions_update_frequency = positions_update_frequency
+        self.reconcile_frequency = reconcile_frequency
         self.exit = exit
         self.use_cache = use_cache
         self._update_lock = asyncio.Lock()
@@ -38,23 +44,29 @@ class Synchronizer:
         self.chat_id = chat_id        
         self._first_update_done = False
 
+        # --- push-синхронизация (MxFuturesOrderWS) ---
+        self.position_stream = None                        # стрим, от которого приходят пуши позиций
+        self._pushes: Dict[Tuple[str, str], dict] = {}     # (symbol, pos_side) -> последний пуш
+        self._rest_requested = False
+        self._wakeup = asyncio.Event()
+
         info_handler.wrap_foreign_methods(self)
 
-    async def reset_if_needed(self, pos_data: dict, symbol: str, pos_side: str):
+    async def reset_if_needed(self, pos_data: PositionState, symbol: str, pos_side: str):
         """Сбрасывает позицию, если она закрыта на бирже или форс-флаг"""
         # guard: если уже идет сброс — пропускаем
-        if pos_data.get("_reset_in_progress"):
+        if pos_data.reset_in_progress:
             self.info_handler.debug_error_notes(f"[reset_if_needed] already in progress for {symbol}/{pos_side}")
             return
 
-        pos_data["_reset_in_progress"] = True
+        pos_data.reset_in_progress = True
         try:
             label = f"{symbol}_{pos_side}"
             # cur_price = await self.mx_client.get_fair_price(symbol)
 
-            if pos_data.get("in_position"):
+            if pos_data.in_position:
                 # debounce PnL: не слать дважды в короткий промежуток
-                last_pnl_ts = pos_data.get("_last_pnl_ts", 0)
+                last_pnl_ts = pos_data.last_pnl_ts
                 now_ts = int(time.time() * 1000)
                 # если последний отчет был менее 3 секунд назад — пропустить
                 if now_ts - last_pnl_ts > 3000:
@@ -66,7 +78,7 @@ class Synchronizer:
                         cur_price=None,
                         label=label
                     )
-                    pos_data["_last_pnl_ts"] = now_ts
+                    pos_data.last_pnl_ts = now_ts
                 else:
                     self.info_handler.debug_info_notes(f"[reset_if_needed] skip duplicate pnl for {symbol}/{pos_side}")
 
@@ -85,7 +97,7 @@ class Synchronizer:
                 instruments_data=None,
                 reset_flag=True
             )
-            pos_data["_reset_in_progress"] = False
+            pos_data.reset_in_progress = False
 
     @staticmethod
     def unpack_position_info(position: dict) -> dict:
@@ -125,31 +137,31 @@ class Synchronizer:
         contracts = safe_float(info.get("contracts"))
         leverage = safe_int(info.get("leverage"), 1)
 
-        pos_data = symbol_data.get(pos_side, {})
+        pos_data: PositionState = symbol_data[pos_side]
 
-        if not pos_data.get("in_position"):
+        if not pos_data.in_position:
+            self.context.tracer.mark(symbol, "position_sync")
             cur_time = int(time.time() * 1000)
-            pos_data["c_time"] = cur_time
+            pos_data.c_time = cur_time
 
             spec = symbol_data.get("spec", {})
             price_precision = safe_int(spec.get("price_precision"), 2)
             contract_size = safe_float(spec.get("contract_size"), 1.0)
 
-            pos_data["entry_price"] = hold_price
-            pos_data["vol_assets"] = contracts * contract_size
+            pos_data.entry_price = hold_price
+            pos_data.vol_assets = contracts * contract_size
 
             sign = -1 if pos_side == "SHORT" else 1
-            self.fin_settings = self.context.users_configs[self.chat_id]["config"]["fin_settings"]
+            params = pos_data.params or build_trading_params(self.context.users_configs[self.chat_id])
             tp_price_levels = [
                 hold_price * (1 + sign * safe_float(x[0]) / 100)
-                for x in self.fin_settings.get("tp_levels_gen")
-                if isinstance(x, (list, tuple)) and len(x) > 0
+                for x in params.tp_levels
             ]
 
             sl_price = None
             
-            if self.fin_settings.get("sl") is not None:
-                sl_raw = hold_price * (1 - sign * abs(safe_float(self.fin_settings.get("sl"))) / 100)
+            if params.sl is not None:
+                sl_raw = hold_price * (1 - sign * abs(safe_float(params.sl)) / 100)
                 sl_price = to_human_digit(safe_round(sl_raw, price_precision))
 
             body = {
@@ -167,14 +179,17 @@ class Synchronizer:
                 is_print=True
             )
 
-        pos_data.update({
-            "hold_price": hold_price,
-            "contracts": contracts,
-            "in_position": True,
-            "leverage": leverage
-        })
+        pos_data.hold_price = hold_price
+        pos_data.contracts = contracts
+        pos_data.in_position = True
+        pos_data.leverage = leverage
 
-    async def update_positions(self, target_symbols: Set[str], positions: List[Dict]):
+    async def update_positions(
+            self,
+            target_symbols: Set[str],
+            positions: List[Dict],
+            pos_sides: Tuple[str, ...] = ("LONG", "SHORT")
+        ):
         """Обновляет локальные позиции по данным с биржи"""
         # предотвращаем параллельный вход
         async with self._update_lock:
@@ -190,14 +205,14 @@ class Synchronizer:
                 # проход по всем символам и позициям LONG/SHORT
                 for symbol in target_symbols:
                     symbol_data = self.context.position_vars.get(symbol, {})
-                    for pos_side in ("LONG", "SHORT"):
-                        pos_data = symbol_data.get(pos_side, {})
-                        if not pos_data:
+                    for pos_side in pos_sides:
+                        pos_data: Optional[PositionState] = symbol_data.get(pos_side)
+                        if pos_data is None:
                             continue
 
                         active_pos = active_positions.get((symbol, pos_side))
                         contracts = active_pos.get("contracts", 0.0) if active_pos else 0.0
-                        force_reset_flag = pos_data.get("force_reset_flag", False)
+                        force_reset_flag = pos_data.force_reset_flag
 
                         if contracts > 0:
                             self.update_active_position(
@@ -214,6 +229,8 @@ class Synchronizer:
                                 pos_side=pos_side
                             )
 
+                        self.context.wake_symbol(symbol)
+
                 if not self._first_update_done:
                     self._first_update_done = True
                     self.info_handler.debug_info_notes("[update_positions] First update done, flag set")
@@ -221,6 +238,39 @@ class Synchronizer:
             except Exception as e:
                 self.info_handler.debug_error_notes(f"[update_positions Error]: {e}")
 
+    def on_position_push(self, position: dict):
+        """Колбэк стрима push.personal.position: копим последний пуш по (symbol, side) и будим цикл."""
+        info = self.unpack_position_info(position)
+        if not info["symbol"] or not info["pos_side"]:
+            return
+        self._pushes[(info["symbol"], info["pos_side"])] = position
+        self._wakeup.set()
+
+    def on_deal_push(self, deal: dict):
+        """Колбэк стрима push.personal.order.deal: был fill -- сверяемся с REST без ожидания таймера."""
+        self.request_refresh()
+
+    def request_refresh(self):
+        """Внеочередная REST-сверка позиций."""
+        self._rest_requested = True
+        self._wakeup.set()
+
+    def _stream_alive(self) -> bool:
+        return bool(self.position_stream and self.position_stream.is_connected)
+
+    async def apply_position_pushes(self, pushes: Dict[Tuple[str, str], dict]):
+        """Применяет накопленные пуши позиций через общий update_positions."""
+        for (symbol, pos_side), position in pushes.items():
+            if symbol not in self.context.position_vars:
+                continue
+            # state 3 -- позиция закрыта; holdVol=0 -- тоже закрыта
+            is_closed = safe_int(position.get("state")) == 3 or not safe_float(position.get("holdVol"))
+            await self.update_positions(
+                target_symbols={symbol},
+                positions=[] if is_closed else [position],
+                pos_sides=(pos_side,)
+            )
+
     async def refresh_positions_state(self):
         """Обновляет позиции для всех стратегий"""
         try:
@@ -242,41 +292,42 @@ class Synchronizer:
         except Exception as e:
             self.info_handler.debug_error_notes(f"[Unexpected Error] Failed to refresh positions: {e}")
 
-    async def positions_flow_manager(self, cache_file_manager: FileManager):
-        """Цикл обновления позиций и синхронизации кэша"""
-        # print("Цикл обновления позиций и синхронизации кэша")
+    async def positions_flow_manager(self):
+        """Цикл обновления позиций (состояние пишет в журнал c_journal.PositionJournal по wake-точкам)"""
+        # print("Цикл обновления позиций")
 
         if self.use_cache and self.context.pos_loaded_cache:
+            # позиции, восстановленные из журнала
             for symbol, data in self.context.pos_loaded_cache.items():
-                self.context.position_vars[symbol] = deepcopy(data)
+                self.context.position_vars[symbol] = data
             self.context.pos_loaded_cache = None
 
-        cache_update_interval = 5.0
-        last_cache_time = time.monotonic()
+        last_rest_time = 0.0
 
-        cycle = 0
         while not self.context.stop_bot and not self.context.stop_bot_iteration:
-            cycle += 1
-            await asyncio.sleep(self.positions_update_frequency)
-
+            # пока жив ws -- REST только как редкая сверка; без ws -- прежний частый поллинг
+            rest_interval = self.reconcile_frequency if self._stream_alive() else self.positions_update_frequency
+            # внеочередная сверка -- не чаще positions_update_frequency
+            min_gap = self.positions_update_frequency if self._rest_requested else rest_interval
+            timeout = max(0.0, last_rest_time + min_gap - time.monotonic())
             try:
-                # print(f"[SYNC] → цикл {cycle}, refresh_positions_state() вызов")
-                await self.refresh_positions_state()
-                # print(f"[SYNC] ← цикл {cycle}, position_vars.keys: {list(self.context.position_vars.keys())}")
-
-            except Exception as e:
-                print(f"[SYNC][ERROR] refresh_positions_state: {e}")
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
 
-            now = time.monotonic()
+            if self._pushes:
+                pushes, self._pushes = self._pushes, {}
+                try:
+                    await self.apply_position_pushes(pushes)
+                except Exception as e:
+                    print(f"[SYNC][ERROR] apply_position_pushes: {e}")
 
-            # обновление кэша
-            if self.use_cache and (now - last_cache_time >= cache_update_interval):
+            since_rest = time.monotonic() - last_rest_time
+            if since_rest >= rest_interval or (self._rest_requested and since_rest >= self.positions_update_frequency):
+                self._rest_requested = False
                 try:
-                    await cache_file_manager.write_cache(
-                        data_dict=self.context.position_vars,
-                        file_name="pos_cache.pkl"
-                    )
-                    # print(f"[SYNC] cache_file_manager.write_cache вызван (цикл {cycle})")
+                    await self.refresh_positions_state()
                 except Exception as e:
-                    print(f"[SYNC][ERROR] write_cache: {e}")
-                last_cache_time = now
+                    print(f"[SYNC][ERROR] refresh_positions_state: {e}")
+                last_rest_time = time.monotonic()
@@ -0,0 +1,160 @@
+import itertools
+import time
+from collections import deque
+from typing import *
+
+
+# спаны сигнального пути в порядке прохождения (для отчета)
+SIGNAL_SPANS = (
+    "parse",             # сообщение разобрано (symbol, cap)
+    "dispatch",          # handle_signal начал выполняться
+    "set_pos_defaults",  # заготовка позиции готова
+    "fair_price",        # цена для расчета контрактов получена (ws-кэш или REST)
+    "order_send",        # рыночный ордер уходит в make_order
+    "order_response",    # ответ биржи на make_order
+    "position_sync",     # Synchronizer увидел fill (update_active_position)
+    "tp_armed",          # TP-лестница выставлена
+)
+
+
+class Trace:
+    __slots__ = ("trace_id", "symbol", "t0", "spans")
+
+    def __init__(self, trace_id: str, symbol: Optional[str], t0: float):
+        self.trace_id = trace_id
+        self.symbol = symbol
+        self.t0 = t0
+        self.spans: Dict[str, float] = {}  # span -> sec от t0
+
+
+class LatencyTracer:
+    """
+    Трейсинг латентности сигнала: trace id на сигнал, монотонные отметки спанов (time.perf_counter)
+    от прихода channel_post до выставленной TP-лестницы. По каждому спану копится окно последних
+    samples значений -- из него считаются перцентили для /metrics.
+    Компоненты ниже Core знают только symbol, поэтому отметки делаются по ключу активного трейса:
+    symbol -- до раздачи сигнала аккаунтам, (chat_id, symbol) -- после fork (см. AccountTracer).
+    Спаны аккаунтов копятся в общие окна: на сигнал по выборке с каждого аккаунта, max/p99 -- худший аккаунт.
+    """
+
+    def __init__(self, max_samples: int = 1000, max_traces: int = 50):
+        self._ids = itertools.count(1)
+        self._active: Dict[Hashable, Trace] = {}               # symbol | (chat_id, symbol) -> активный трейс
+        self._pending: Dict[str, Trace] = {}                   # trace_id -> трейс до привязки к symbol
+        self._samples: Dict[str, Deque[float]] = {}
+        self._recent: Deque[Trace] = deque(maxlen=max_traces)  # завершенные трейсы
+        self.max_samples = max_samples
+
+    def start(self, t0: Optional[float] = None) -> str:
+        """Новый трейс (символ еще неизвестен -- до парсинга). Возвращает trace id."""
+        trace_id = f"sig-{next(self._ids)}"
+        self._pending[trace_id] = Trace(trace_id, None, time.perf_counter() if t0 is None else t0)
+        return trace_id
+
+    def bind(self, trace_id: Optional[str], symbol: str) -> None:
+        """Привязывает трейс к символу: дальше отметки ставятся через mark(symbol, ...)."""
+        trace = self._pending.pop(trace_id, None) if trace_id else None
+        if trace is None:
+            return
+        trace.symbol = symbol
+        previous = self._active.get(symbol)
+        if previous is not None:
+            self._recent.append(previous)
+        self._active[symbol] = trace
+
+    def fork(self, symbol: str, keys: Iterable[Tuple[int, str]]) -> None:
+        """
+        Раздача сигнала аккаунтам: трейс символа -> своя копия (с уже пройденными спанами) на каждый
+        ключ (chat_id, symbol). Дальше аккаунт отмечает и закрывает только свой трейс.
+        """
+        trace = self._active.pop(symbol, None)
+        if trace is None:
+            return
+        for key in keys:
+            copy = Trace(f"{trace.trace_id}/{key[0]}", trace.symbol, trace.t0)
+            copy.spans = dict(trace.spans)
+            previous = self._active.get(key)
+            if previous is not None:
+                self._recent.append(previous)
+            self._active[key] = copy
+
+    def drop(self, trace_id: Optional[str]) -> None:
+        """Сигнал отброшен (не распарсился / дубль / протух)."""
+        if trace_id:
+            self._pending.pop(trace_id, None)
+
+    def mark(self, key: Hashable, span: str) -> None:
+        """Отметка спана активного трейса ключа (повторная отметка того же спана игнорируется)."""
+        trace = self._active.get(key)
+        if trace is None or span in trace.spans:
+            return
+        elapsed = time.perf_counter() - trace.t0
+        trace.spans[span] = elapsed
+        samples = self._samples.get(span)
+        if samples is None:
+            samples = self._samples[span] = deque(maxlen=self.max_samples)
+        samples.append(elapsed)
+
+    def finish(self, key: Hashable, span: Optional[str] = None) -> None:
+        """Финальная отметка и закрытие трейса ключа."""
+        if span:
+            self.mark(key, span)
+        trace = self._active.pop(key, None)
+        if trace is not None:
+            self._recent.append(trace)
+
+    @staticmethod
+    def _percentile(ordered: List[float], p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    def percentiles(self, span: str, points: Tuple[float, ...] = (50, 90, 99)) -> Optional[Dict[str, float]]:
+        samples = self._samples.get(span)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        result = {f"p{int(p)}": self._percentile(ordered, p) for p in points}
+        result["max"] = ordered[-1]
+        result["n"] = len(ordered)
+        return result
+
+    def report(self) -> str:
+        """Текст для Telegram /metrics: перцентили по спанам (мс от прихода сигнала) и последний трейс."""
+        lines = ["⏱ Латентность сигнала (мс от channel_post):"]
+        spans = list(SIGNAL_SPANS) + sorted(s for s in self._samples if s not in SIGNAL_SPANS)
+        for span in spans:
+            stats = self.percentiles(span)
+            if not stats:
+                continue
+            lines.append(
+                f"• {span}: p50 {stats['p50'] * 1000:.1f} | p90 {stats['p90'] * 1000:.1f} | "
+                f"p99 {stats['p99'] * 1000:.1f} | max {stats['max'] * 1000:.1f} (n={stats['n']})"
+            )
+        if len(lines) == 1:
+            lines.append("нет данных")
+
+        last = self._recent[-1] if self._recent else next(reversed(self._active.values()), None)
+        if last is not None:
+            steps = " → ".join(f"{s} {t * 1000:.1f}" for s, t in sorted(last.spans.items(), key=lambda x: x[1]))
+            lines.append(f"\nПоследний {last.trace_id} [{last.symbol}]: {steps or '-'}")
+        return "\n".join(lines)
+
+
+class AccountTracer:
+    """
+    Трейсер аккаунта (AccountContext.tracer): тот же интерфейс по symbol, но трейс -- (chat_id, symbol)
+    в общем LatencyTracer, поэтому аккаунты одного сигнала не закрывают трейсы друг друга.
+    """
+    __slots__ = ("root", "chat_id")
+
+    def __init__(self, root: LatencyTracer, chat_id: int):
+        self.root = root
+        self.chat_id = chat_id
+
+    def mark(self, symbol: str, span: str) -> None:
+        self.root.mark((self.chat_id, symbol), span)
+
+    def finish(self, symbol: str, span: Optional[str] = None) -> None:
+        self.root.finish((self.chat_id, symbol), span)
+
+    def report(self) -> str:
+        return self.root.report()
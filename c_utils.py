@@ -1,15 +1,15 @@
 from typing import *
 from a_config import *
 from b_context import BotContext
+from b_position import PositionState
 from c_log import ErrorHandler, TZ_LOCATION
+from API.MX.instruments import build_spec
 # import math
 import random
 from datetime import datetime
 from decimal import Decimal, getcontext
 import time
 import asyncio
-import pickle
-import os
 # import json
 
 getcontext().prec = 28  # точность Decimal
@@ -178,6 +178,17 @@ def sleep_generator(tp_len):
         # print(f"#{idx}: sleep {pause:.2f} сек")
 
     return sorted(sleep_list)
+
+def tp_pacing_delays(tp_len: int) -> List[float]:
+    """
+    Политика разнесения TP-лимиток по времени (TP_PACING=True):
+    задержка старта каждого уровня -- накопленные паузы sleep_generator.
+    """
+    delays, acc = [], 0.0
+    for pause in [0.0] + sleep_generator(tp_len)[:-1]:
+        acc += pause
+        delays.append(acc)
+    return delays
         
 def parse_range_key(rk: str) -> tuple[int, float]:
     """Преобразует строку диапазона в кортеж чисел (min, max)"""
@@ -263,21 +274,7 @@ class Utils:
         if not symbol_data:
             return None
 
-        # обработка maxLeverage
-        raw_leverage = symbol_data.get("maxLeverage")
-        try:
-            max_leverage = int(float(raw_leverage)) if raw_leverage is not None else None
-        except (ValueError, TypeError):
-            max_leverage = None
-
-        return {
-            "contract_precision": symbol_data.get("volScale", 3),
-            "price_precision": symbol_data.get("priceScale", 2),
-            "contract_size": float(symbol_data.get("contractSize", 1)),
-            "price_unit": float(symbol_data.get("priceUnit", 0.01)),
-            "vol_unit": float(symbol_data.get("volUnit", 1)),
-            "max_leverage": max_leverage
-        }
+        return build_spec(symbol_data)
         
     def contract_calc(
         self,
@@ -372,12 +369,12 @@ class Utils:
         self,
         symbol: str,
         pos_side: str,
-        pos_data: dict,
+        pos_data: PositionState,
         cur_price: float,
         label: str
     ):
         cur_time = int(time.time() * 1000)
-        start_time = pos_data.get("c_time")
+        start_time = pos_data.c_time
 
         realized_pnl = await self.get_realized_pnl(
             symbol=symbol,
@@ -409,37 +406,3 @@ class Utils:
             body=body,
             is_print=True
         )
-
-
-class FileManager:
-    def __init__(self, info_handler: ErrorHandler):   
-        info_handler.wrap_foreign_methods(self)
-        self.info_handler = info_handler
-
-    async def cache_exists(self, file_name="cache.pkl"):
-        """Проверяет, существует ли файл и не пустой ли он."""
-        return await asyncio.to_thread(lambda: os.path.isfile(file_name) and os.path.getsize(file_name) > 0)
-
-    async def load_cache(self, file_name="cache.pkl"):
-        """Читает данные из pickle-файла."""
-        def _load():
-            with open(file_name, "rb") as file:
-                return pickle.load(file)
-        try:
-            return await asyncio.to_thread(_load)
-        except (FileNotFoundError, EOFError):
-            return {}
-        except Exception as e:
-            self.info_handler.debug_error_notes(f"Unexpected error while reading {file_name}: {e}")
-            return {}        
-
-    def _write_pickle(self, data, file_name):
-        with open(file_name, "wb") as file:
-            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
-
-    async def write_cache(self, data_dict, file_name="cache.pkl"):
-        """Сохраняет данные в pickle-файл."""
-        try:
-            await asyncio.to_thread(self._write_pickle, data_dict, file_name)
-        except Exception as e:
-            self.info_handler.debug_error_notes(f"Error while caching data: {e}")
\ No newline at end of file
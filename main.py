@@ -3,23 +3,18 @@ import time
 from typing import *
 from a_config import *
 from b_context import BotContext
-from b_constructor import PositionVarsSetup
-from b_network import NetworkManager
-from API.TG.tg_parser import TgBotWatcherAiogram
+from API.TG.tg_parser import TgBotWatcherAiogram, Signal
 from API.TG.tg_notifier import TelegramNotifier
-from API.TG.tg_buttons import TelegramUserInterface
-from API.MX.mx import MexcClient
-from API.MX.streams import MxFuturesOrderWS
-from API.MX.mx_bypass.api import MexcFuturesAPI
-from TRADING.entry import EntryControl
-from TRADING.exit import ExitControl
-from TRADING.tp import TPControl
+from API.TG.tg_buttons import TelegramUserInterface, validate_user_config
+from API.MX.streams import MxTickerWS
+from API.MX.instruments import InstrumentRegistry, InstrumentsUpdater
 from aiogram import Bot, Dispatcher
 import json
 
-from c_sync import Synchronizer
-from c_log import ErrorHandler, log_time
-from c_utils import Utils, FileManager, validate_direction, tp_levels_generator
+from c_account import AccountRuntime, start_accounts, fan_out_signal
+from c_shard import ShardPool
+from c_log import ErrorHandler
+from c_utils import validate_direction
 import traceback
 import os
 
@@ -48,7 +43,7 @@ def save_to_json(data: Optional[dict], filename="data.json"):
 
 
 class Core:
-    def __init__(self):
+    def __init__(self, shard_workers: int = SHARD_WORKERS):
         self.context = BotContext()
         self.info_handler = ErrorHandler()
         self.bot = Bot(token=TG_BOT_TOKEN)
@@ -56,204 +51,113 @@ class Core:
         self.tg_watcher = None
         self.notifier = None
         self.tg_interface = None  # позже инициализируем
-        self.positions_task = None
-        self.tp_tasks = {}
+        self.service_task = None
+        self.instruments_task = None
+        self.accounts: Dict[int, AccountRuntime] = {}  # chat_id -> рантайм аккаунта
+        self.price_stream = None
+        self.instruments_updater = None
+        self.shard_workers = shard_workers  # 0 -- все аккаунты в этом процессе
+        self.shards: Optional[ShardPool] = None
 
         self.base_symbol = SYMBOL + "_" + QUOTE_ASSET if SYMBOL is not None else None
         self.direction = DIRECTION.strip().upper()
         self.context.pos_loaded_cache = {}
-        self.instruments_data = {}        
+        self.instruments = InstrumentRegistry()
 
     def _start_usual_context(self):
         if not validate_direction(self.direction):
             return False     
-           
-        if USE_CACHE:
-            self.cache_file_manager = FileManager(info_handler=self.info_handler)
 
         return True
 
-    async def _start_user_context(self, chat_id: int):
-        """Инициализация юзер-контекста (сессии, клиентов, стримов и контролов)"""
-
-        user_context = self.context.users_configs[chat_id]
-        mexc_cfg = user_context.get("config", {}).get("MEXC", {})
-
-        proxy_url  = mexc_cfg.get("proxy_url")
-        api_key    = mexc_cfg.get("api_key")
-        api_secret = mexc_cfg.get("api_secret")
-        u_id       = mexc_cfg.get("u_id")
-
-        # print("♻️ Пересоздаём user_context сессию")
-
-        # --- Чистим старый connector ---
-        if hasattr(self, "connector") and self.connector:
-            await self.connector.shutdown_session()
-            self.connector = None
-
-        # --- Создаём новый connector ---
-        self.connector = NetworkManager(
-            context=self.context,
-            info_handler=self.info_handler,
-            proxy_url=proxy_url
-        )
-        self.connector.start_ping_loop()
-
-        # --- MEXC client ---
-        self.mx_client = MexcClient(
+    async def _start_accounts(self) -> None:
+        """Поднимает рантаймы всех настроенных аккаунтов параллельно; стрим цен и каталог инструментов -- общие."""
+        chat_ids = [chat_id for chat_id, cfg in self.context.users_configs.items() if validate_user_config(cfg)]
+        self.accounts = await start_accounts(
             context=self.context,
-            connector=self.connector,
             info_handler=self.info_handler,
-            api_key=api_key,
-            api_secret=api_secret,
-            token=u_id,
+            chat_ids=chat_ids,
+            instruments=self.instruments,
+            preform_message=self.notifier.preform_message,
+            direction=self.direction,
         )
+        if not self.accounts:
+            return
+        first = next(iter(self.accounts.values()))
+        proxy_url = self.context.users_configs[first.chat_id].get("config", {}).get("MEXC", {}).get("proxy_url")
 
-        # --- Order stream ---
-        self.order_stream = MxFuturesOrderWS(
-            api_key=api_key,
-            api_secret=api_secret,
-            context=self.context,
-            info_handler=self.info_handler,
-            proxy_url=proxy_url
-        )
-        asyncio.create_task(self.order_stream.start())  # запускаем только новый
+        # --- Price stream (публичный, один на все аккаунты: кэш цен для входа без REST fair_price) ---
+        if USE_PRICE_STREAM:
+            self.price_stream = MxTickerWS(
+                context=self.context,
+                info_handler=self.info_handler,
+                proxy_url=proxy_url,
+                ws_url=MEXC_WS_URL
+            )
+            asyncio.create_task(self.price_stream.start(debug=False))
 
-        # --- Вспомогалки ---
-        self.utils = Utils(
+        # --- Каталог инструментов (общий, тянется клиентом первого аккаунта) ---
+        self.instruments_updater = InstrumentsUpdater(
             context=self.context,
-            info_handler=self.info_handler,
-            preform_message=self.notifier.preform_message,
-            get_realized_pnl=self.mx_client.get_realized_pnl,
-            chat_id=chat_id
+            registry=self.instruments,
+            mx_client=first.mx_client,
+            info_handler=self.info_handler
         )
-        # print(self.utils)
 
-        self.pos_setup = PositionVarsSetup(
-            context=self.context,
-            info_handler=self.info_handler,
-            parse_precision=self.utils.parse_precision
-        )
+        # --- Заворачиваем внешние методы в обработчик ошибок ---
+        self.info_handler.wrap_foreign_methods(self)
 
-        # --- Торговые контролы ---
-        self.entry = EntryControl(
-            context=self.context,
-            info_handler=self.info_handler,
-            mx_client=self.mx_client,
-            preform_message=self.notifier.preform_message,
-            utils=self.utils,
-            direction=self.direction,
-            chat_id=chat_id
-        )
+    async def _start_local(self) -> bool:
+        """Аккаунты, каталог инструментов, синхронизация позиций и отчеты -- в текущем процессе."""
+        # --- Аккаунты: свой рантайм на каждого пользователя ---
+        await self._start_accounts()
+        if not self.accounts:
+            self.info_handler.debug_error_notes("[ERROR] No account started, iteration stopped", is_print=True)
+            return False
 
-        self.exit = ExitControl(
-            context=self.context,
-            info_handler=self.info_handler,
-            mx_client=self.mx_client,
-            preform_message=self.notifier.preform_message,
-            direction=self.direction,
-            chat_id=chat_id
-        )
+        # --- Инструменты: снапшот с диска для быстрого старта, затем фоновое условное обновление ---
+        try:
+            initial_delay = 0.0
+            if not len(self.instruments) and await self.instruments_updater.load_snapshot():
+                print(f"[DEBUG] Instruments loaded from snapshot: {len(self.instruments)} items")
+                # реестр уже наполнен -- первый сетевой рефреш не блокирует старт
+            elif not len(self.instruments):
+                await self.instruments_updater.refresh()
+                print(f"[DEBUG] Instruments fetched: {len(self.instruments)} items")
+                initial_delay = self.instruments_updater.interval
+            if not len(self.instruments):
+                self.info_handler.debug_error_notes("[ERROR] Failed to fetch instruments: empty registry", is_print=True)
 
-        self.sync = Synchronizer(
-            context=self.context,
-            info_handler=self.info_handler,
-            set_pos_defaults=self.pos_setup.set_pos_defaults,
-            pnl_report=self.utils.pnl_report,
-            mx_client=self.mx_client,
-            preform_message=self.notifier.preform_message,
-            positions_update_frequency=POSITIONS_UPDATE_FREQUENCY,
-            exit=self.exit,
-            use_cache=USE_CACHE,
-            chat_id=chat_id
-        )
+        except Exception as e:
+            self.info_handler.debug_error_notes(f"[ERROR] Failed to fetch instruments: {e}", is_print=True)
 
-        self.tp_control = TPControl(
-            context=self.context,
-            info_handler=self.info_handler,
-            mx_client=self.mx_client,
-            preform_message=self.notifier.preform_message,
-            utils=self.utils,
-            direction=self.direction,
-            tp_control_frequency=TP_CONTROL_FREQUENCY,
-            chat_id=chat_id
-        )
+        if not self.instruments_task or self.instruments_task.done():
+            self.instruments_task = asyncio.create_task(self.instruments_updater.run(initial_delay=initial_delay))
 
-        # --- Заворачиваем внешние методы в обработчик ошибок ---
-        self.info_handler.wrap_foreign_methods(self)
+        # --- Запуск наблюдателей (в процессе-шарде сигналы приходят по IPC, watcher'а нет) ---
+        if self.tg_watcher:
+            self.tg_watcher.register_handler(tag=TEG_ANCHOR)
+        # --- Запускаем positions_flow_manager каждого аккаунта (с восстановлением из журнала) ---
+        await asyncio.gather(*(runtime.start_positions_flow() for runtime in self.accounts.values()))
 
-    async def handle_signal(
-        self,
-        chat_id,
-        symbol: str,
-        cap: float,
-        last_timestamp: str,
-        debug_label: str,
-        lock
-    ) -> None:
-        
-        async with lock:
-            try:
-                # ==== Финансовые настройки пользователя ====
-                fin_settings = self.context.users_configs[chat_id]["config"]["fin_settings"]
-
-                # Генерируем новые tp_levels
-                new_tp_levels = tp_levels_generator(
-                    cap=cap,
-                    tp_order_volume=fin_settings.get("tp_order_volume"),
-                    tp_cap_dep=fin_settings["tp_levels"]
-                )
-                fin_settings["tp_levels_gen"] = new_tp_levels
-
-                # ==== Установка позиции по умолчанию ====
-                if not self.pos_setup.set_pos_defaults(symbol, self.direction, self.instruments_data):
-                    return
-
-                # Ждём, пока первый апдейт позиций не произойдёт
-                while not self.sync._first_update_done:
-                    # self.info_handler.debug_info_notes(f"[handle_signal] Waiting for first positions update for {symbol}")
-                    await asyncio.sleep(0.1)
-
-                pos_data = self.context.position_vars.get(symbol, {}).get(self.direction, {})
-
-                # Защита 1: уже в позиции (по данным биржи)
-                if pos_data.get("in_position"):
-                    pos_data["preexisting"] = True
-                    self.info_handler.debug_info_notes(
-                        f"[handle_signal] Skip: already in_position {symbol} {self.direction}"
-                    )
-                    return
-
-                # ==== Отправка сигнала ====
-                signal_body = {"symbol": symbol, "cur_time": last_timestamp}
-                self.notifier.preform_message(
-                    chat_id=chat_id,
-                    marker="signal",
-                    body=signal_body,
-                    is_print=True
-                )
+        await asyncio.gather(*(runtime.context.orders_updated_event.wait() for runtime in self.accounts.values()))
+        for runtime in self.accounts.values():
+            runtime.context.orders_updated_event.clear()
+        print("[DEBUG] Order update event cleared, entering main signal loop")
 
-                await self.entry.entry_template(
-                    symbol=symbol,
-                    cap=cap,
-                    debug_label=debug_label
-                )
+        # --- Фоновое обслуживание: отчёты в TG и обновление инструментов ---
+        if not self.service_task or self.service_task.done():
+            self.service_task = asyncio.create_task(self._service_loop())
+        return True
 
-            finally:
-                # ==== TP Control ====
-                symbol_data = self.context.position_vars.get(symbol)
-                if symbol_data:  # проверка, чтобы не было KeyError
-                    if debug_label not in self.tp_tasks or self.tp_tasks[debug_label].done():
-                        self.tp_tasks[debug_label] = asyncio.create_task(
-                            self.tp_control.tp_control_flow(
-                                symbol=symbol,
-                                symbol_data=symbol_data,
-                                sign=1 if self.direction == "LONG" else -1,
-                                debug_label=debug_label,
-                            )
-                        )
-                else:
-                    print(f"[WARNING] TP control skipped: symbol {symbol} not in position_vars yet")
+    async def _start_shards(self) -> bool:
+        """Аккаунты по процессам-шардам: здесь остаются только Telegram и рассылка сигналов по IPC."""
+        chat_ids = [chat_id for chat_id, cfg in self.context.users_configs.items() if validate_user_config(cfg)]
+        self.shards = ShardPool(context=self.context, info_handler=self.info_handler, workers=self.shard_workers)
+        if not await self.shards.start(chat_ids, self.direction):
+            self.info_handler.debug_error_notes("[ERROR] No shard started, iteration stopped", is_print=True)
+            return False
+        return True
 
     async def _run_iteration(self) -> None:
         """Одна итерация торговли (от старта до стопа)."""
@@ -266,151 +170,68 @@ class Core:
             return
         print("[DEBUG] Usual context initialized successfully")
 
-        # --- Перебор пользователей ---
-        for num, (chat_id, user_cfg) in enumerate(self.context.users_configs.items(), start=1):
-            # print(f"[DEBUG] Processing user {num} | chat_id: {chat_id}")
-            
-            if num > 1:
-                self.info_handler.debug_info_notes(
-                    f"Бот настроен только для одного пользователя! "
-                    f"Для текущего chat_id: {chat_id} опция торговли недоступна. {log_time()}"
+        # --- Аккаунты: в этом процессе либо по процессам-шардам (SHARD_WORKERS) ---
+        started = await (self._start_shards() if self.shard_workers else self._start_local())
+        if not started:
+            self.context.stop_bot_iteration = True
+            return
+
+        await self._signal_loop()
+
+    async def _signal_loop(self) -> None:
+        """Главный цикл: ждём сигнал из очереди, без поллинга."""
+        while not self.context.stop_bot_iteration and not self.context.stop_bot:
+            try:
+                signal = await asyncio.wait_for(
+                    self.context.signal_queue.get(),
+                    timeout=MAIN_CYCLE_FREQUENCY
                 )
+            except asyncio.TimeoutError:
                 continue
 
             try:
-                # --- Запуск контекста пользователя ---
-                # print(f"[DEBUG] Starting user context for chat_id: {chat_id}")
-                await self._start_user_context(chat_id=chat_id)
-
-                # --- Дебаг MEXC настройки ---
-                user_config: Dict[str, Any] = self.context.users_configs.get(chat_id, {})
-                mexc_cfg: Dict[str, Any] = user_config.get("config", {}).get("MEXC", {})
-                # print(f"[DEBUG] MEXC config for user {chat_id}: {mexc_cfg}")
-
-                required_keys = ["api_key", "api_secret", "u_id", "proxy_url"]
-                for key in required_keys:
-                    if key not in mexc_cfg or mexc_cfg[key] is None:
-                        print(f"[WARNING] MEXC {key} not set for user {chat_id}")
-
+                self._process_signal_item(signal)
             except Exception as e:
-                err_msg = f"[ERROR] Failed to start user context for chat_id {chat_id}: {e}"
+                err_msg = f"[ERROR] main loop: {e}\n" + traceback.format_exc()
                 self.info_handler.debug_error_notes(err_msg, is_print=True)
-                continue
 
-        # --- Получаем инструменты с биржи ---
-        try:
-            self.instruments_data = await self.mx_client.get_instruments()
-            if self.instruments_data:
-                print(f"[DEBUG] Instruments fetched: {len(self.instruments_data)} items")
-            else:
-                self.info_handler.debug_error_notes(f"[ERROR] Failed to fetch instruments: {e}", is_print=True)
+    def _process_signal_item(self, signal: Optional[Signal]) -> None:
+        """Получает готовый Signal из очереди (разобран в tg-хендлере) и сразу запускает handle_signal."""
+        if not signal:
+            return
 
-        except Exception as e:
-            self.info_handler.debug_error_notes(f"[ERROR] Failed to fetch instruments: {e}", is_print=True)
-        # return
-
-        # --- Запуск наблюдателей ---
-        self.tg_watcher.register_handler(tag=TEG_ANCHOR)
-        if not USE_CACHE:
-            self.cache_file_manager = {}
-        # --- Запускаем positions_flow_manager ---
-        if not self.positions_task or self.positions_task.done():
-            self.positions_task = asyncio.create_task(
-                self.sync.positions_flow_manager(cache_file_manager=self.cache_file_manager)
+        # Актуальность -- повторно: сигнал мог пролежать в очереди, пока итерация стартовала / ждала START
+        diff_sec = time.time() - signal.ts_ms / 1000
+        if diff_sec >= SIGNAL_TIMEOUT:
+            self.info_handler.debug_info_notes(
+                "[CORE] Stale signal, skipping: %s message_id=%s (%.1f s)", signal.symbol, signal.message_id, diff_sec
             )
+            self.context.tracer.finish(signal.symbol)
+            return
 
-        await self.context.orders_updated_event.wait()
-        self.context.orders_updated_event.clear()
-        print("[DEBUG] Order update event cleared, entering main signal loop")
+        if not self.context.tg_timing_cache.add(signal.message_id):
+            return
+
+        if self.base_symbol and signal.symbol != self.base_symbol:
+            self.context.tracer.finish(signal.symbol)
+            return
 
-        instrume_update_interval = 5.0
-        last_instrume_time = time.monotonic()
+        if self.shards:
+            self.shards.broadcast(signal)
+        else:
+            asyncio.create_task(fan_out_signal(self.accounts.values(), self.instruments_updater, signal, self.direction))
 
+    async def _service_loop(self) -> None:
+        """Фоновые задачи итерации, вынесенные из сигнального пути: отчёты в TG."""
         while not self.context.stop_bot_iteration and not self.context.stop_bot:
             try:
-                signal_tasks_val = self.context.message_cache[-SIGNAL_PROCESSING_LIMIT:] if self.context.message_cache else None
-                if not signal_tasks_val:
-                    await asyncio.sleep(MAIN_CYCLE_FREQUENCY)
-                    continue
-
-                for signal_item in signal_tasks_val:
-                    if not signal_item:
-                        continue
-
-                    message, last_timestamp = signal_item
-                    if not (message and last_timestamp):
-                        print("[DEBUG] Invalid signal item, skipping")
-                        continue
-
-                    msg_key = f"{last_timestamp}_{hash(message)}"
-                    if msg_key in self.context.tg_timing_cache:
-                        continue
-                    self.context.tg_timing_cache.add(msg_key)
-
-                    parsed_msg, all_present = self.tg_watcher.parse_tg_message(message)
-                    # print(parsed_msg)
-                    if not all_present:
-                        print(f"[DEBUG] Parse error: {parsed_msg}")
-                        continue
-
-                    symbol = parsed_msg.get("symbol")
-                    cap = parsed_msg.get("cap")
-                    debug_label = f"{symbol}_{self.direction}"
-                    if self.base_symbol and symbol != self.base_symbol:
-                        continue
-
-                    diff_sec = time.time() - (last_timestamp / 1000)
-
-                    for num, (chat_id, user_cfg) in enumerate(self.context.users_configs.items(), start=1):
-                        if num > 1:
-                            continue
-                        if diff_sec < SIGNAL_TIMEOUT:
-
-                            # если замок уже существует для msg_key, пропускаем
-                            if msg_key in self.context.signal_locks:
-                                continue
-
-                            # создаём замок и оставляем его навсегда
-                            cur_lock = self.context.signal_locks[msg_key] = asyncio.Lock()
-
-                            asyncio.create_task(self.handle_signal(
-                                chat_id=chat_id,
-                                symbol=symbol,
-                                cap=cap,
-                                last_timestamp=last_timestamp,
-                                debug_label=debug_label,
-                                lock=cur_lock
-                            ))
-
-
+                for chat_id in list(self.accounts):
+                    await self.notifier.send_report_batches(chat_id=chat_id, batch_size=1)
             except Exception as e:
-                err_msg = f"[ERROR] main loop: {e}\n" + traceback.format_exc()
+                err_msg = f"[ERROR] service loop reports: {e}\n" + traceback.format_exc()
                 self.info_handler.debug_error_notes(err_msg, is_print=True)
 
-            finally:
-                try:
-                    for num, (chat_id, user_cfg) in enumerate(self.context.users_configs.items(), start=1):
-                        if num > 1:
-                            continue
-                        await self.notifier.send_report_batches(chat_id=chat_id, batch_size=1)
-                except Exception as e:
-                    err_msg = f"[ERROR] main finally block: {e}\n" + traceback.format_exc()
-                    self.info_handler.debug_error_notes(err_msg, is_print=True)
-
-                now = time.monotonic()
-
-                # обновление кэша
-                if now - last_instrume_time >= instrume_update_interval:
-                    try:
-                        self.instruments_data = await self.mx_client.get_instruments()
-                        if not self.instruments_data:
-                            self.info_handler.debug_error_notes(f"[ERROR] Failed to fetch instruments: {e}", is_print=True)
-
-                    except Exception as e:
-                        self.info_handler.debug_error_notes(f"[ERROR] Failed to fetch instruments: {e}", is_print=True)
-                    last_instrume_time = now
-
-                await asyncio.sleep(MAIN_CYCLE_FREQUENCY)
+            await asyncio.sleep(MAIN_CYCLE_FREQUENCY)
 
     async def run_forever(self, debug: bool = True):
         """Основной перезапускаемый цикл Core."""
@@ -482,55 +303,48 @@ class Core:
     async def _shutdown_iteration(self, debug: bool = True):
         """Закрывает итерационные ресурсы и обнуляет инстансы."""
 
-        # --- Остановка цикла positions_flow_manager ---
-        if self.positions_task:
-            self.positions_task.cancel()
+        # --- Остановка фонового обслуживания ---
+        if self.service_task:
+            self.service_task.cancel()
             try:
-                await self.positions_task
+                await self.service_task
             except asyncio.CancelledError:
-                if debug:
-                    print("[CORE] positions_flow_manager cancelled")
-            self.positions_task = None
+                pass
+            self.service_task = None
 
-        # --- Order stream ---
-        if getattr(self, "order_stream", None):
+        # --- Обновление инструментов ---
+        if self.instruments_task:
+            self.instruments_task.cancel()
             try:
-                await asyncio.wait_for(self.order_stream.disconnect(), timeout=5)
-            except Exception as e:
-                if debug:
-                    print(f"[CORE] order_stream.disconnect() error: {e}")
-            finally:
-                self.order_stream = None
+                await self.instruments_task
+            except asyncio.CancelledError:
+                pass
+            self.instruments_task = None
 
-        # --- Connector ---
-        if getattr(self, "connector", None):
+        # --- Price stream ---
+        if getattr(self, "price_stream", None):
+            self.price_stream.stop()
             try:
-                await asyncio.wait_for(self.connector.shutdown_session(), timeout=5)
+                await asyncio.wait_for(self.price_stream.disconnect(), timeout=5)
             except Exception as e:
                 if debug:
-                    print(f"[CORE] connector.shutdown_session() error: {e}")
+                    print(f"[CORE] price_stream.disconnect() error: {e}")
             finally:
-                self.context.session = None
-                self.connector = None
+                self.price_stream = None
+                self.context.price_cache.clear()
 
-        for key, task in list(self.tp_tasks.items()):
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
-        self.tp_tasks.clear()
+        # --- Процессы-шарды ---
+        if self.shards:
+            await self.shards.stop()
+            self.shards = None
 
-        # --- Сброс прочих ссылок ---
-        self.mx_client = None
-        self.sync = None
-        self.tp_control = None
-        self.utils = None
-        self.pos_setup = None
-        self.entry = None
-        self.exit = None
+        # --- Аккаунты: задачи, стримы, сессии, HTTP-пулы ---
+        runtimes, self.accounts = list(self.accounts.values()), {}
+        await asyncio.gather(*(runtime.shutdown(debug=debug) for runtime in runtimes), return_exceptions=True)
+        self.context.accounts.clear()
 
-        self.context.position_vars = {}
+        # --- Сброс прочих ссылок ---
+        self.instruments_updater = None
 
         # if debug:
         #     print("[CORE] Iteration shutdown complete")
@@ -546,6 +360,7 @@ async def main():
         print("♻️ Cleaning up iteration")
         instance.context.stop_bot = True
         await instance._shutdown_iteration()
+        instance.info_handler.close()
 
 if __name__ == "__main__":
     # жёсткое убийство через Ctrl+C / kill
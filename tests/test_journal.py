@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+from b_position import PositionState
+from c_journal import PositionJournal, read_journal
+from c_log import ErrorHandler
+
+
+def _position(entry_price: float) -> dict:
+    return {"LONG": PositionState(in_position=True, entry_price=entry_price), "spec": {"price_precision": 4}}
+
+
+def _session(prefix: str, info_handler: ErrorHandler, write: dict) -> dict:
+    """Старт процесса: восстановление журнала, запись изменившихся символов, штатная остановка."""
+    context = SimpleNamespace(position_vars={}, dirty_symbols=set(), stop_bot=False, stop_bot_iteration=False)
+    journal = PositionJournal(context, info_handler, prefix)
+    restored = journal.load()
+    context.position_vars.update(restored)
+    context.position_vars.update(write)
+    journal.flush(write)
+    asyncio.run(journal.close())
+    return restored
+
+
+def test_crash_restart_write_restart(tmp_path):
+    prefix = str(tmp_path / "pos_journal_1")
+    info_handler = ErrorHandler()
+    try:
+        _session(prefix, info_handler, {"A_USDT": _position(1.0), "B_USDT": _position(2.0)})
+
+        # крах посреди записи: в журнале обрывок без "\n"
+        with open(f"{prefix}.jsonl", "a", encoding="utf-8") as file:
+            file.write('{"seq": 3, "ts": 1, "symbol": "B_US')
+
+        restored = _session(prefix, info_handler, {"C_USDT": _position(3.0)})
+        assert set(restored) == {"A_USDT", "B_USDT"}
+
+        restored = _session(prefix, info_handler, {})
+        assert set(restored) == {"A_USDT", "B_USDT", "C_USDT"}
+        assert restored["C_USDT"]["LONG"].entry_price == 3.0
+
+        with open(f"{prefix}.jsonl", "r", encoding="utf-8") as file:
+            assert file.read().endswith("\n")
+        seq, symbols = read_journal(prefix)
+        assert seq == 3 and set(symbols) == {"A_USDT", "B_USDT", "C_USDT"}
+    finally:
+        info_handler.close()